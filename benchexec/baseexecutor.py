@@ -18,11 +18,13 @@ from benchexec import util
 sys.dont_write_bytecode = True  # prevent creation of .pyc files
 
 
-def add_basic_executor_options(argument_parser):
-    """Add some basic options for an executor to an argparse argument_parser."""
+def add_basic_executor_options(argument_parser, args_required=True):
+    """Add some basic options for an executor to an argparse argument_parser.
+    @param args_required: whether the command line to run is mandatory
+    """
     argument_parser.add_argument(
         "args",
-        nargs="+",
+        nargs="+" if args_required else "*",
         metavar="ARG",
         help='command line to run (prefix with "--" to ensure all arguments are treated correctly)',
     )
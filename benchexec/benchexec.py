@@ -64,6 +64,14 @@ class BenchExec(object):
         self.setup_logging()
 
         self.executor = self.load_executor()
+        if self.config.stream_runs and not self.executor.__name__.endswith(
+            ".localexecution"
+        ):
+            sys.exit("Option --stream-runs is supported only for local execution.")
+        if self.config.sample_interval and not self.executor.__name__.endswith(
+            ".localexecution"
+        ):
+            sys.exit("Option --sample-interval is supported only for local execution.")
 
         returnCode = 0
         for arg in self.config.files:
@@ -165,6 +173,14 @@ class BenchExec(object):
             """,
         )
 
+        parser.add_argument(
+            "--no-task-cache",
+            dest="no_task_cache",
+            action="store_true",
+            help="Do not read or write the cache of parsed task-definition files "
+            "in the output directory.",
+        )
+
         parser.add_argument(
             "--description-file",
             help="""
@@ -282,6 +298,31 @@ class BenchExec(object):
             "(-1 to disable, default value: 20 MB).",
         )
 
+        parser.add_argument(
+            "--capture-output",
+            dest="capture_output",
+            action="store_true",
+            help="Read the tool output through a pipe and keep in memory only the part "
+            "that remains after shrinking it to --maxLogfileSize, "
+            "instead of writing all of it to the logfile and reading it back "
+            "(has no effect if the size of logfiles is not limited).",
+        )
+
+        parser.add_argument(
+            "--sample-interval",
+            dest="sample_interval",
+            type=float,
+            metavar="SECONDS",
+            help="""
+                Record the resource usage (CPU time, memory, I/O, and pressure)
+                of each run in this interval into a CSV file next to its logfile,
+                which is referenced from the result XML and can be plotted
+                with table-generator --plot-samples.
+                The interval is increased automatically if sampling takes more
+                than 1%% of the wall time of a run.
+            """,
+        )
+
         parser.add_argument(
             "--filesCountLimit",
             type=int,
@@ -303,6 +344,56 @@ class BenchExec(object):
             """,
         )
 
+        parser.add_argument(
+            "--prepare-runs",
+            dest="prepare_runs",
+            action="store_true",
+            help="""
+                Prepare the cgroups and the temporary directory of the next run
+                of each parallel slot while the current run is executing,
+                which reduces the setup time between runs.
+            """,
+        )
+
+        parser.add_argument(
+            "--schedule-by-duration",
+            dest="schedule_by_duration",
+            action="store_true",
+            help="""
+                Execute the runs of each run set in the order of their wall time
+                in the most recent existing results of the same benchmark,
+                starting with the longest runs, such that fewer parallel slots
+                are idle at the end of the run set.
+            """,
+        )
+
+        parser.add_argument(
+            "--stream-runs",
+            dest="stream_runs",
+            action="store_true",
+            help="""
+                Create the runs of each run set only shortly before they are executed
+                and free most of their data after their results were written,
+                such that execution starts earlier and needs less memory
+                for benchmarks with many tasks.
+                Errors in task-definition files are reported only when the task is
+                reached, and such tasks are skipped.
+                Only supported for local execution.
+            """,
+        )
+
+        parser.add_argument(
+            "--overlap-run-sets",
+            dest="overlap_run_sets",
+            action="store_true",
+            help="""
+                Start the runs of the next run set as soon as all runs of the
+                current run set were started, instead of waiting until they finished.
+                Wall time and CPU time of each run set are then computed
+                from its runs, and energy of run sets is not measured.
+            """,
+        )
+
         parser.add_argument(
             "--commit",
             dest="commit",
@@ -467,6 +558,7 @@ def add_container_args(parser):
             help="disable use of containers for isolation of runs",
         )
         containerexecutor.add_basic_container_args(container_args)
+        containerexecutor.add_result_files_transfer_args(container_args)
 
 
 def parse_time_arg(s):
@@ -265,6 +265,52 @@ class Cgroups(ABC):
                         e.strerror,
                     )
 
+    def read_final_measurements(self):
+        """
+        Read all measurements of this cgroup at once
+        after all processes in it have terminated.
+        Because the values cannot change anymore at this point,
+        a single read of each value is sufficient.
+        @return a dict with the keys "cputime", "usage_per_cpu", "memory",
+            "oom_kill_count", "io" (a tuple of bytes read and written),
+            and "pressure-cpu-some", "pressure-memory-some", "pressure-io-some";
+            keys for unavailable subsystems are missing and values might be None
+        """
+        measurements = {}
+        if self.CPU in self:
+            measurements["cputime"] = self.read_cputime()
+            measurements["usage_per_cpu"] = self.read_usage_per_cpu()
+        if self.MEMORY in self:
+            measurements["memory"] = self.read_max_mem_usage()
+            measurements["oom_kill_count"] = self.read_oom_kill_count()
+        if self.IO in self:
+            measurements["io"] = self.read_io_stat()
+        measurements["pressure-cpu-some"] = self.read_cpu_pressure()
+        measurements["pressure-memory-some"] = self.read_mem_pressure()
+        measurements["pressure-io-some"] = self.read_io_pressure()
+        return measurements
+
+    def read_current_usage(self):
+        """
+        Read the current resource usage of this cgroup while processes are running,
+        e.g., for recording the usage over time.
+        @return a dict with the keys "cputime", "memory" (current usage),
+            "blkio-read", "blkio-write",
+            and "pressure-cpu-some", "pressure-memory-some", "pressure-io-some";
+            keys for unavailable subsystems are missing and values might be None
+        """
+        usage = {}
+        if self.CPU in self:
+            usage["cputime"] = self.read_cputime()
+        if self.MEMORY in self:
+            usage["memory"] = self.read_mem_usage()
+        if self.IO in self:
+            usage["blkio-read"], usage["blkio-write"] = self.read_io_stat()
+        usage["pressure-cpu-some"] = self.read_cpu_pressure()
+        usage["pressure-memory-some"] = self.read_mem_pressure()
+        usage["pressure-io-some"] = self.read_io_pressure()
+        return usage
+
     @abstractmethod
     def read_cputime(self):
         """
@@ -277,6 +323,11 @@ class Cgroups(ABC):
     def read_max_mem_usage(self):
         pass
 
+    @abstractmethod
+    def read_mem_usage(self):
+        """Read the current memory usage of this cgroup in bytes."""
+        pass
+
     @abstractmethod
     def read_mem_pressure(self):
         pass
@@ -367,6 +418,9 @@ class _DummyCgroups(Cgroups):
     def read_max_mem_usage(self):
         pass
 
+    def read_mem_usage(self):
+        pass
+
     def read_mem_pressure(self):
         pass
 
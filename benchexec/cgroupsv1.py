@@ -506,6 +506,13 @@ class CgroupsV1(Cgroups):
 
         return None
 
+    def read_mem_usage(self):
+        # Same as for read_max_mem_usage(): RAM+Swap if possible
+        memUsageFile = "memsw.usage_in_bytes"
+        if not self.has_value(self.MEMORY, memUsageFile):
+            memUsageFile = "usage_in_bytes"
+        return int(self.get_value(self.MEMORY, memUsageFile))
+
     def read_mem_pressure(self):
         return None
 
@@ -246,6 +246,41 @@ def _force_open_read(filename):
         return open(filename, "rt")
 
 
+def _parse_cputime(cpu_stat_lines):
+    """Get the cputime in seconds from the lines of cpu.stat."""
+    for line in cpu_stat_lines:
+        k, v = line.split(" ", 1)
+        if k == "usage_usec":
+            # TODO switch to Decimal together with all other float values
+            return int(v) / 1_000_000
+    return None
+
+
+def _parse_pressure(pressure_lines):
+    """Get the total "some" stall time in seconds from the lines of *.pressure."""
+    for line in pressure_lines:
+        if line.startswith("some "):
+            for item in line.split(" ")[1:]:
+                k, v = item.split("=")
+                if k == "total":
+                    return Decimal(v) / 1_000_000
+    return None
+
+
+def _parse_io_stat(io_stat_lines):
+    """Get the number of bytes read and written from the lines of io.stat."""
+    bytes_read = 0
+    bytes_written = 0
+    for io_line in io_stat_lines:
+        dev_no, *stats = io_line.split(" ")
+        for s in stats:
+            if s.startswith("rbytes="):
+                bytes_read += int(s.split("=")[1])
+            elif s.startswith("wbytes="):
+                bytes_written += int(s.split("=")[1])
+    return bytes_read, bytes_written
+
+
 def kill_all_tasks_in_cgroup(cgroup):
     tasksFile = cgroup / "cgroup.procs"
 
@@ -532,12 +567,73 @@ class CgroupsV2(Cgroups):
 
         kill_all_tasks_in_cgroup(self.path)
 
+    def read_final_measurements(self):
+        # All files are in our own cgroup, so we can read them in one go.
+        files = util.read_files_in_directory(
+            self.path,
+            [
+                "cpu.stat",
+                "memory.peak",
+                "io.stat",
+                "cpu.pressure",
+                "memory.pressure",
+                "io.pressure",
+            ],
+        )
+        measurements = {}
+        if self.CPU in self:
+            measurements["cputime"] = _parse_cputime(
+                files.get("cpu.stat", "").splitlines()
+            )
+            measurements["usage_per_cpu"] = self.read_usage_per_cpu()
+        if self.MEMORY in self:
+            # Was only added in Linux 5.19
+            peak = files.get("memory.peak")
+            measurements["memory"] = int(peak) if peak else None
+            measurements["oom_kill_count"] = self.read_oom_kill_count()
+        if self.IO in self:
+            measurements["io"] = _parse_io_stat(files.get("io.stat", "").splitlines())
+        for subsystem in ["cpu", "memory", "io"]:
+            measurements[f"pressure-{subsystem}-some"] = _parse_pressure(
+                files.get(subsystem + ".pressure", "").splitlines()
+            )
+        return measurements
+
+    def read_current_usage(self):
+        # Like read_final_measurements(), this reads all files in one go,
+        # which keeps the overhead of periodic sampling low.
+        files = util.read_files_in_directory(
+            self.path,
+            [
+                "cpu.stat",
+                "memory.current",
+                "io.stat",
+                "cpu.pressure",
+                "memory.pressure",
+                "io.pressure",
+            ],
+        )
+        usage = {}
+        if self.CPU in self:
+            usage["cputime"] = _parse_cputime(files.get("cpu.stat", "").splitlines())
+        if self.MEMORY in self:
+            current = files.get("memory.current")
+            usage["memory"] = int(current) if current else None
+        if self.IO in self:
+            usage["blkio-read"], usage["blkio-write"] = _parse_io_stat(
+                files.get("io.stat", "").splitlines()
+            )
+        for subsystem in ["cpu", "memory", "io"]:
+            usage[f"pressure-{subsystem}-some"] = _parse_pressure(
+                files.get(subsystem + ".pressure", "").splitlines()
+            )
+        return usage
+
     def read_cputime(self):
-        for k, v in self.get_key_value_pairs(self.CPU, "stat"):
-            if k == "usage_usec":
-                # TODO switch to Decimal together with all other float values
-                return int(v) / 1_000_000
-        return None
+        return _parse_cputime(self.get_file_lines(self.CPU, "stat"))
+
+    def read_mem_usage(self):
+        return int(self.get_value(self.MEMORY, "current"))
 
     def read_max_mem_usage(self):
         # Was only added in Linux 5.19
@@ -546,13 +642,8 @@ class CgroupsV2(Cgroups):
         return None
 
     def _read_pressure_stall_information(self, subsystem):
-        for line in open(self.path / (subsystem + ".pressure")):
-            if line.startswith("some "):
-                for item in line.split(" ")[1:]:
-                    k, v = item.split("=")
-                    if k == "total":
-                        return Decimal(v) / 1_000_000
-        return None
+        with open(self.path / (subsystem + ".pressure")) as f:
+            return _parse_pressure(f)
 
     def read_mem_pressure(self):
         return self._read_pressure_stall_information("memory")
@@ -573,16 +664,7 @@ class CgroupsV2(Cgroups):
         return util.parse_int_list(self.get_value(self.CPUSET, "mems.effective"))
 
     def read_io_stat(self):
-        bytes_read = 0
-        bytes_written = 0
-        for io_line in self.get_file_lines(self.IO, "stat"):
-            dev_no, *stats = io_line.split(" ")
-            for s in stats:
-                if s.startswith("rbytes="):
-                    bytes_read += int(s.split("=")[1])
-                elif s.startswith("wbytes="):
-                    bytes_written += int(s.split("=")[1])
-        return bytes_read, bytes_written
+        return _parse_io_stat(self.get_file_lines(self.IO, "stat"))
 
     def has_tasks(self):
         return self._has_tasks(self.path)
@@ -15,10 +15,12 @@ import fcntl
 import logging
 import os
 import resource  # noqa: F401 @UnusedImport necessary to eagerly import this module
+import select
 import signal
 import socket
 import struct
 import sys
+import threading
 
 from benchexec import libc
 from benchexec import seccomp
@@ -30,6 +32,8 @@ __all__ = [
     "activate_network_interface",
     "duplicate_mount_hierarchy",
     "determine_directory_mode",
+    "MountPlan",
+    "get_mount_plan",
     "get_mount_points",
     "remount_with_additional_flags",
     "make_overlay_mount",
@@ -382,7 +386,7 @@ def activate_network_interface(iface):
         sock.close()
 
 
-def duplicate_mount_hierarchy(mount_base, temp_base, work_base, dir_modes):
+def duplicate_mount_hierarchy(mount_base, temp_base, work_base, dir_modes, plan=None):
     """
     Setup a copy of the system's mount hierarchy below a specified directory,
     and apply all specified directory modes (e.g., read-only access or hidden)
@@ -392,7 +396,12 @@ def duplicate_mount_hierarchy(mount_base, temp_base, work_base, dir_modes):
     @param temp_base: the base directory for all temporary files
     @param work_base: the base directory for all overlayfs work files
     @param dir_modes: the directory modes to apply (without mount_base prefix)
+    @param plan: an optional MountPlan for dir_modes (cf. get_mount_plan())
     """
+    if plan is None:
+        plan = MountPlan(dir_modes, mount_points=[])
+    assert plan.dir_modes == dir_modes
+
     # Create a copy of all mountpoints.
     # Setting MS_PRIVATE flag discouples the new mounts from the original mounts,
     # i.e., mounts we do are not seen outside the mount namespace,
@@ -408,31 +417,14 @@ def duplicate_mount_hierarchy(mount_base, temp_base, work_base, dir_modes):
     # unchanged during run execution.
     make_bind_mount(b"/", mount_base, recursive=True, private=True)
 
-    # Ensure each special dir is a mountpoint such that the next loop covers it.
     for special_dir in dir_modes.keys():
-        if special_dir == b"/":
-            continue  # handled above
+        if special_dir != b"/":
+            # Ensure special_dir exists even if we mount a hidden dir as parent.
+            os.makedirs(temp_base + special_dir, exist_ok=True)
 
+    # Ensure each special dir is a mountpoint such that the next loop covers it.
+    for special_dir in plan.special_dirs_to_bind:
         mount_path = mount_base + special_dir
-        temp_path = temp_base + special_dir
-        # Ensure special_dir exists even if we mount a hidden dir as parent.
-        os.makedirs(temp_path, exist_ok=True)
-
-        mode = determine_directory_mode(dir_modes, special_dir)
-        parent_mode = determine_directory_mode(dir_modes, os.path.dirname(special_dir))
-        if mode == parent_mode:
-            # If special_dir is not a mountpoint, we do not need to do anything for it,
-            # it will automatically inherit the same directory mode as its parent.
-            # If special_dir is a mountpoint, it will be covered by the loop below
-            # anyway. In none of the two cases this loop needs to mark special_dir as
-            # mountpoint. This avoids useless creation of nested overlay instances.
-            logging.debug(
-                "Skipping directory mount for %s "
-                "because parent already has same mode.",
-                special_dir,
-            )
-            continue
-
         try:
             make_bind_mount(mount_path, mount_path)
         except OSError as e:
@@ -453,49 +445,19 @@ def duplicate_mount_hierarchy(mount_base, temp_base, work_base, dir_modes):
         if not util.path_is_below(full_mountpoint, mount_base):
             continue
         mountpoint = full_mountpoint[len(mount_base) :] or b"/"
-        mode = determine_directory_mode(dir_modes, mountpoint, fstype)
+        target, mode = plan.get_mount_mode(mountpoint, fstype)
         if not mode:
             continue
 
-        if not os.path.exists(mountpoint):
-            # Mountpoint either does not exist or is in an inaccessible directory.
-            # The former is safe to ignore, but the latter needs to be handled
-            # because something could relax the permissions later on, making mountpoint
-            # accessible in the container without the proper directory mode.
-            missing_dir = mountpoint
-            parent = os.path.dirname(missing_dir)
-            while not os.path.exists(parent):
-                missing_dir = parent
-                parent = os.path.dirname(missing_dir)
-            if os.access(parent, os.X_OK):
-                # Not a permission problem, missing_dir really does not exist.
-                logging.debug(
-                    "Ignoring hiden mount '%s' because '%s' does not exist.",
-                    mountpoint.decode(),
-                    missing_dir.decode(),
-                )
-                continue
-            else:
-                # missing_dir could exist or not, permissions on parent hide it.
-                # We cannot mount something over it, but the inaccessible parent is
-                # useless in the container anyway, so we can just hide all of parent,
-                # which safely hides mountpoint even if permissions of parent get
-                # relaxed outside of the container.
-                logging.debug(
-                    "Marking inaccessible directory '%s' as hidden "
-                    "because it contains a mountpoint at '%s'",
-                    parent.decode(),
-                    mountpoint.decode(),
-                )
-                # Creating the following directory will make mountpoint appear as
-                # empty directory in the container. This is useful because otherwise the
-                # kernel will show a mountpoint for a non-existing directory.
-                # This makes nesting containers work better (common example is
-                # /sys/kernel/debug/tracing).
-                os.makedirs(temp_base + mountpoint, exist_ok=True)
-                # Let the rest of this loop iteration actually hide parent.
-                mountpoint = parent
-                mode = DIR_HIDDEN
+        if target != mountpoint:
+            # Creating the following directory will make mountpoint appear as
+            # empty directory in the container. This is useful because otherwise the
+            # kernel will show a mountpoint for a non-existing directory.
+            # This makes nesting containers work better (common example is
+            # /sys/kernel/debug/tracing).
+            os.makedirs(temp_base + mountpoint, exist_ok=True)
+            # Let the rest of this loop iteration actually hide the parent.
+            mountpoint = target
         else:
             logging.debug("Mounting '%s' as %s", mountpoint.decode(), mode)
 
@@ -582,6 +544,16 @@ def determine_directory_mode(dir_modes, path, fstype=None):
     From a high-level mapping of desired directory modes, determine the actual mode
     for a given directory.
     """
+    return _check_directory_mode(
+        path, _determine_directory_mode(dir_modes, path, fstype)
+    )
+
+
+def _determine_directory_mode(dir_modes, path, fstype):
+    """
+    Like determine_directory_mode(), but without the checks that depend on the
+    current state of the file system (cf. _check_directory_mode()).
+    """
     if fstype == b"proc":
         # proc is necessary for the grandchild to read PID, will be replaced later.
         return DIR_READ_ONLY
@@ -628,18 +600,192 @@ def determine_directory_mode(dir_modes, path, fstype=None):
         )
         return DIR_READ_ONLY
 
-    if result_mode == DIR_OVERLAY and not os.path.isdir(path):
+    if result_mode == DIR_HIDDEN and parent_mode == DIR_HIDDEN:
+        # No need to recursively recreate mountpoints in hidden dirs.
+        return None
+    return result_mode
+
+
+def _check_directory_mode(path, mode):
+    """
+    Adjust a directory mode from _determine_directory_mode()
+    to the current state of the file system.
+    """
+    if mode == DIR_OVERLAY and not os.path.isdir(path):
         logging.debug(
             "Cannot use overlay mode for %s because it is not a directory. "
             "Using read-only mode instead. ",
             path.decode(),
         )
         return DIR_READ_ONLY
+    return mode
 
-    if result_mode == DIR_HIDDEN and parent_mode == DIR_HIDDEN:
-        # No need to recursively recreate mountpoints in hidden dirs.
-        return None
-    return result_mode
+
+class MountPlan(object):
+    """
+    The decisions of duplicate_mount_hierarchy() for a set of directory modes,
+    i.e., which special directories need to be bind mounted and which directory mode
+    needs to be applied to each mountpoint.
+    Computing these decisions is expensive if there are many mountpoints,
+    so the same plan can be reused for many containers as long as the mount table
+    does not change (cf. get_mount_plan()).
+    Mountpoints that are unknown to the plan are handled on demand.
+    Only decisions that depend on the mount table and the directory modes are cached,
+    checks of the file system (whether directories exist and are accessible)
+    are repeated whenever the plan is used, because directories can be created
+    or deleted without changing the mount table.
+    @param dir_modes: the directory modes to apply
+    @param mount_points: the mountpoints to plan for, by default all current ones
+    """
+
+    def __init__(self, dir_modes, mount_points=None):
+        self.dir_modes = dir_modes
+        self._mount_modes = {}
+        if mount_points is None:
+            mount_points = list(get_mount_points())
+
+        self._special_dirs = []  # special dir, its mode, and mode of its parent
+        for special_dir in dir_modes.keys():
+            if special_dir == b"/":
+                continue  # already a mountpoint
+
+            parent = os.path.dirname(special_dir)
+            self._special_dirs.append(
+                (
+                    special_dir,
+                    _determine_directory_mode(dir_modes, special_dir, None),
+                    _determine_directory_mode(dir_modes, parent, None),
+                )
+            )
+
+            # The bind mount will have the file system of the mountpoint it is in.
+            containing_mounts = [
+                mount
+                for mount in mount_points
+                if util.path_is_below(special_dir, mount[1])
+            ]
+            if containing_mounts:
+                fstype = max(containing_mounts, key=lambda mount: len(mount[1]))[2]
+                self._get_directory_mode(special_dir, fstype)
+
+        for _unused_source, mountpoint, fstype, _unused_options in mount_points:
+            self._get_directory_mode(mountpoint, fstype)
+
+    @property
+    def special_dirs_to_bind(self):
+        """The special directories that need to be made a mountpoint."""
+        special_dirs_to_bind = []
+        for special_dir, mode, parent_mode in self._special_dirs:
+            mode = _check_directory_mode(special_dir, mode)
+            parent_mode = _check_directory_mode(
+                os.path.dirname(special_dir), parent_mode
+            )
+            if mode == parent_mode:
+                # If special_dir is not a mountpoint, we do not need to do anything
+                # for it, it will automatically inherit the same directory mode as its
+                # parent. If special_dir is a mountpoint, it will be covered by the loop
+                # over all mountpoints anyway. In none of the two cases we need to mark
+                # special_dir as mountpoint.
+                # This avoids useless creation of nested overlay instances.
+                logging.debug(
+                    "Skipping directory mount for %s "
+                    "because parent already has same mode.",
+                    special_dir,
+                )
+                continue
+            special_dirs_to_bind.append(special_dir)
+        return special_dirs_to_bind
+
+    def get_mount_mode(self, mountpoint, fstype):
+        """
+        Determine how a mountpoint should be handled.
+        @return a tuple of the directory that should be mounted instead of mountpoint
+            (mountpoint itself or an inaccessible parent directory of it)
+            and its directory mode (None if nothing needs to be done)
+        """
+        return _check_mount_mode(
+            mountpoint, self._get_directory_mode(mountpoint, fstype)
+        )
+
+    def _get_directory_mode(self, mountpoint, fstype):
+        key = (mountpoint, fstype)
+        try:
+            return self._mount_modes[key]
+        except KeyError:
+            mode = self._mount_modes[key] = _determine_directory_mode(
+                self.dir_modes, mountpoint, fstype
+            )
+            return mode
+
+
+def _check_mount_mode(mountpoint, mode):
+    """
+    Determine how a mountpoint with a directory mode from _determine_directory_mode()
+    should be handled according to the current state of the file system
+    (cf. MountPlan.get_mount_mode()).
+    """
+    mode = _check_directory_mode(mountpoint, mode)
+    if mode and not os.path.exists(mountpoint):
+        # Mountpoint either does not exist or is in an inaccessible directory.
+        # The former is safe to ignore, but the latter needs to be handled
+        # because something could relax the permissions later on, making mountpoint
+        # accessible in the container without the proper directory mode.
+        missing_dir = mountpoint
+        parent = os.path.dirname(missing_dir)
+        while not os.path.exists(parent):
+            missing_dir = parent
+            parent = os.path.dirname(missing_dir)
+        if os.access(parent, os.X_OK):
+            # Not a permission problem, missing_dir really does not exist.
+            logging.debug(
+                "Ignoring hiden mount '%s' because '%s' does not exist.",
+                mountpoint.decode(),
+                missing_dir.decode(),
+            )
+            return (mountpoint, None)
+        else:
+            # missing_dir could exist or not, permissions on parent hide it.
+            # We cannot mount something over it, but the inaccessible parent is
+            # useless in the container anyway, so we can just hide all of parent,
+            # which safely hides mountpoint even if permissions of parent get
+            # relaxed outside of the container.
+            logging.debug(
+                "Marking inaccessible directory '%s' as hidden "
+                "because it contains a mountpoint at '%s'",
+                parent.decode(),
+                mountpoint.decode(),
+            )
+            return (parent, DIR_HIDDEN)
+    return (mountpoint, mode)
+
+
+_mount_plans = {}
+_mount_plans_lock = threading.Lock()
+_mount_table_poll = None
+_mountinfo_file = None
+
+
+def get_mount_plan(dir_modes):
+    """
+    Return a MountPlan for the given directory modes and the current mount table.
+    Plans are cached and reused until the mount table of this process changes,
+    which is detected by polling /proc/self/mountinfo (cf. man 5 proc).
+    """
+    global _mount_table_poll, _mountinfo_file
+    key = tuple(dir_modes.items())
+    with _mount_plans_lock:
+        if _mount_table_poll is None:
+            _mountinfo_file = open("/proc/self/mountinfo", "rb")
+            _mount_table_poll = select.poll()
+            _mount_table_poll.register(_mountinfo_file, select.POLLPRI)
+        elif _mount_table_poll.poll(0):
+            logging.debug("Mount table has changed, discarding mount plans.")
+            _mount_plans.clear()
+
+        plan = _mount_plans.get(key)
+        if plan is None:
+            plan = _mount_plans[key] = MountPlan(dir_modes)
+        return plan
 
 
 def get_mount_points():
@@ -11,7 +11,6 @@ import glob
 import logging
 import os
 import collections
-import shutil
 import pickle
 import select
 import signal
@@ -27,6 +26,7 @@ from benchexec import BenchExecException
 from benchexec.cgroups import Cgroups
 from benchexec import container
 from benchexec import libc
+from benchexec import resultfiles
 from benchexec import util
 from benchexec.container import (
     DIR_MODES,
@@ -189,6 +189,26 @@ def add_container_output_args(argument_parser):
         help="pattern for specifying which result files should be copied"
         " to the output directory (default: '.')",
     )
+    add_result_files_transfer_args(argument_parser)
+
+
+def add_result_files_transfer_args(argument_parser):
+    """Define command-line arguments for how result files are transferred.
+    @param argument_parser: an argparse parser instance
+    """
+    argument_parser.add_argument(
+        "--result-files-archive",
+        action="store_true",
+        help="write result files into a ZIP archive instead of a directory"
+        " (named like the output directory with '.zip' appended)",
+    )
+    argument_parser.add_argument(
+        "--result-files-threads",
+        metavar="N",
+        type=int,
+        default=1,
+        help="number of result files to copy in parallel (default: 1)",
+    )
 
 
 def handle_container_output_args(options, parser):
@@ -211,6 +231,19 @@ def handle_container_output_args(options, parser):
     return {"output_dir": output_dir, "result_files_patterns": result_files_patterns}
 
 
+def handle_result_files_transfer_args(options, parser=None):
+    """Handle the options specified by add_result_files_transfer_args().
+    @return: a dict that can be used as kwargs for the ContainerExecutor constructor
+    """
+    if options.result_files_threads < 1:
+        error_fn = parser.error if parser else sys.exit
+        error_fn("Number of threads for result files needs to be positive.")
+    return {
+        "result_files_archive": options.result_files_archive,
+        "result_files_threads": options.result_files_threads,
+    }
+
+
 def main(argv=None):
     """
     A simple command-line interface for the containerexecutor module of BenchExec.
@@ -270,6 +303,7 @@ def main(argv=None):
     logging.debug("This is containerexec %s.", __version__)
     container_options = handle_basic_container_args(options, parser)
     container_options["cgroup_access"] = options.cgroup_access
+    container_options.update(handle_result_files_transfer_args(options, parser))
     container_output_options = handle_container_output_args(options, parser)
 
     if options.root:
@@ -318,6 +352,8 @@ class ContainerExecutor(baseexecutor.BaseExecutor):
         container_system_config=True,
         container_tmpfs=True,
         cgroup_access=False,
+        result_files_archive=False,
+        result_files_threads=1,
         *args,
         **kwargs,
     ):
@@ -336,11 +372,18 @@ class ContainerExecutor(baseexecutor.BaseExecutor):
         @param cgroup_access:
             Whether to allow processes in the contain to access cgroups.
             Only supported on systems with cgroupsv2.
+        @param result_files_archive: Whether to write result files into a ZIP archive
+            (the output directory with ".zip" appended) instead of a directory.
+        @param result_files_threads: How many result files to transfer in parallel.
         """
         super(ContainerExecutor, self).__init__(*args, **kwargs)
         self._use_namespaces = use_namespaces
         if not use_namespaces:
             return
+        if result_files_threads < 1:
+            raise ValueError(f"Invalid number of threads {result_files_threads}.")
+        self._result_files_archive = result_files_archive
+        self._result_files_threads = result_files_threads
         self._container_tmpfs = container_tmpfs
         self._container_system_config = container_system_config
         self._uid = (
@@ -679,6 +722,12 @@ class ContainerExecutor(baseexecutor.BaseExecutor):
                 os.close(to_parent)
             # here Python will exec() the tool for us
 
+        # The mount plan is computed here such that it can be reused for later runs,
+        # the child inherits it from us.
+        mount_plan = (
+            container.get_mount_plan(self._dir_modes) if root_dir is None else None
+        )
+
         def child():
             """Setup everything inside the container,
             start the tool, and wait for result."""
@@ -739,6 +788,7 @@ class ContainerExecutor(baseexecutor.BaseExecutor):
                             output_dir if result_files_patterns else None,
                             memlimit,
                             memory_nodes,
+                            mount_plan,
                         )
 
                     # Marking this process as "non-dumpable" (no core dumps) also
@@ -1036,7 +1086,9 @@ class ContainerExecutor(baseexecutor.BaseExecutor):
 
         return grandchild_pid, wait_for_grandchild
 
-    def _setup_container_filesystem(self, temp_dir, output_dir, memlimit, memory_nodes):
+    def _setup_container_filesystem(
+        self, temp_dir, output_dir, memlimit, memory_nodes, mount_plan=None
+    ):
         """Setup the filesystem layout in the container.
         As first step, we create a copy of all existing mountpoints in mount_base,
         recursively, and as "private" mounts
@@ -1057,6 +1109,7 @@ class ContainerExecutor(baseexecutor.BaseExecutor):
 
         @param temp_dir:
             The base directory under which all our directories should be created.
+        @param mount_plan: an optional MountPlan for the directory modes
         """
         # All strings here are bytes to avoid issues
         # if existing mountpoints are invalid UTF-8.
@@ -1084,7 +1137,7 @@ class ContainerExecutor(baseexecutor.BaseExecutor):
 
         # Copy all mounts to mount_base and apply directory modes
         container.duplicate_mount_hierarchy(
-            mount_base, temp_base, work_base, self._dir_modes
+            mount_base, temp_base, work_base, self._dir_modes, mount_plan
         )
 
         # Now configure some special hard-coded cases
@@ -1186,60 +1239,49 @@ class ContainerExecutor(baseexecutor.BaseExecutor):
             base_dir = tool_output_dir
         else:
             base_dir = tool_output_dir + working_dir
-        file_count = 0
-
-        def transfer_file(abs_file):
-            assert abs_file.startswith(base_dir)
-
-            # We ignore (empty) directories, because we create them for hidden dirs etc.
-            # We ignore device nodes, because overlayfs creates them.
-            # We also ignore all other files (symlinks, fifos etc.),
-            # because they are probably irrelevant, and just handle regular files.
-            file = os.path.join("/", os.path.relpath(abs_file, base_dir))
-            if (
-                os.path.isfile(abs_file)
-                and not os.path.islink(abs_file)
-                and not container.is_container_system_config_file(file)
-            ):
-                target = output_dir + file
-
-                nonlocal file_count
-                file_count += 1
-                if file_count <= _MAX_RESULT_FILE_LOG_COUNT:
-                    logging.debug("Transferring output file %s to %s", abs_file, target)
-                    if file_count == _MAX_RESULT_FILE_LOG_COUNT:
-                        logging.debug(
-                            "%s output files transferred, "
-                            "further files will not be logged.",
-                            file_count,
-                        )
-
-                os.makedirs(os.path.dirname(target), exist_ok=True)
-                try:
-                    # move is more efficient than copy in case both abs_file and target
-                    # are on the same filesystem, and it avoids matching the file again
-                    # with the next pattern.
-                    shutil.move(abs_file, target)
-                except OSError as e:
-                    logging.warning("Could not retrieve output file '%s': %s", file, e)
 
+        # dict instead of set because order should be kept,
+        # files that match several patterns are transferred only once
+        files = {}
         for pattern in patterns:
             if os.path.isabs(pattern):
                 pattern = tool_output_dir + pattern
             else:
                 pattern = tool_output_dir + os.path.join(working_dir, pattern)
             # normalize pattern for preventing directory traversal attacks:
-            for abs_file in glob.iglob(os.path.normpath(pattern), recursive=True):
+            for abs_path in glob.iglob(os.path.normpath(pattern), recursive=True):
                 # We allow the user to match directories and transfer them recursively.
-                if os.path.isdir(abs_file):
-                    for root, _unused_dirs, files in os.walk(abs_file):
-                        for file in files:
-                            transfer_file(os.path.join(root, file))
-                else:
-                    transfer_file(abs_file)
-
+                # We ignore (empty) directories, because we create them for hidden dirs etc.
+                # We ignore device nodes, because overlayfs creates them.
+                # We also ignore all other files (symlinks, fifos etc.),
+                # because they are probably irrelevant, and just handle regular files.
+                for abs_file in resultfiles.find_regular_files(abs_path):
+                    assert abs_file.startswith(base_dir)
+                    file = os.path.relpath(abs_file, base_dir)
+                    if not container.is_container_system_config_file("/" + file):
+                        files[abs_file] = file
+
+        transfer = resultfiles.ResultFilesTransfer(
+            output_dir,
+            archive=self._result_files_archive,
+            threads=self._result_files_threads,
+        )
+        target = transfer.archive_file or output_dir
+        for file_count, (abs_file, file) in enumerate(files.items(), 1):
+            if file_count > _MAX_RESULT_FILE_LOG_COUNT:
+                logging.debug(
+                    "%s output files transferred, further files will not be logged.",
+                    _MAX_RESULT_FILE_LOG_COUNT,
+                )
+                break
+            logging.debug(
+                "Transferring output file %s to %s",
+                abs_file,
+                os.path.join(target, file),
+            )
+        transfer.transfer(list(files.items()))
         logging.debug(
-            "%s output files matched the patterns and were transferred.", file_count
+            "%s output files matched the patterns and were transferred.", len(files)
         )
 
 
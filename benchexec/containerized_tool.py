@@ -10,6 +10,7 @@ import contextlib
 import errno
 import functools
 import inspect
+import io
 import logging
 import multiprocessing
 import os
@@ -26,7 +27,6 @@ from benchexec import (
     util,
 )
 
-
 tool: tooladapter.CURRENT_BASETOOL = None
 
 
@@ -72,6 +72,24 @@ class ContainerizedTool(object):
         self._forward_call("close", [], {})
         self._pool.close()
 
+    def analyze_run(self, run, output, identifiers):
+        """
+        Determine the result of a run and extract values from its output
+        with a single call into the container.
+        This is equivalent to calling determine_result(run) (unless run is None)
+        and get_value_from_output(output, identifier) for each identifier,
+        but much cheaper for runs with many columns or large output:
+        there is only one round trip, and the output is transferred once
+        and as a single string instead of as a list of lines.
+        @return a tuple of the result of determine_result (or None)
+            and the list of extracted values
+        """
+        if run is None and not identifiers:
+            return None, []
+        if run is not None:
+            run = run._replace(output=None)
+        return self._pool.apply(_analyze_run, [run, output.text, identifiers])
+
     def _forward_call(self, method_name, args, kwargs):
         """Call given method indirectly on the tool instance in the container."""
         return self._pool.apply(_call_tool_func, [method_name, list(args), kwargs])
@@ -106,6 +124,20 @@ for member_name, member in inspect.getmembers(
     ContainerizedTool._add_proxy_function(member_name, member)
 
 
+def _analyze_run(run, output_text, identifiers):
+    """Implementation of ContainerizedTool.analyze_run() in the container."""
+    # The lines were read in text mode, so they are separated only by "\n".
+    lines = io.StringIO(output_text, newline="\n").readlines()
+    output = tooladapter.CURRENT_BASETOOL.RunOutput(lines)
+    tool_status = None
+    if run is not None:
+        tool_status = tool.determine_result(run._replace(output=output))
+    return (
+        tool_status,
+        [tool.get_value_from_output(output, identifier) for identifier in identifiers],
+    )
+
+
 def _init_worker_process():
     """Initial setup of worker process from multiprocessing module."""
 
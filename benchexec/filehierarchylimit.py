@@ -5,22 +5,45 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import errno
 import logging
 import os
+import stat
+import struct
 import threading
 import time
 
 from benchexec import container
+from benchexec import libc
 from benchexec import util
 
-_CHECK_INTERVAL_SECONDS = 60
+_CHECK_INTERVAL_SECONDS = 1
+_SCAN_INTERVAL_SECONDS = 60
 _DURATION_WARNING_THRESHOLD = 1
 
+_INOTIFY_EVENT = struct.Struct("iIII")  # struct inotify_event without name
+_INOTIFY_BUFFER_SIZE = 64 * 1024
+_INOTIFY_MASK = (
+    libc.IN_CREATE
+    | libc.IN_DELETE
+    | libc.IN_MOVED_FROM
+    | libc.IN_MOVED_TO
+    | libc.IN_ONLYDIR
+    | libc.IN_DONT_FOLLOW
+    | libc.IN_EXCL_UNLINK
+)
+
 
 class FileHierarchyLimitThread(threading.Thread):
     """
-    Thread that periodically checks whether a given file hierarchy exceeds some limits.
+    Thread that checks whether a given file hierarchy exceeds some limits.
     After this happens, the process is terminated.
+
+    The files in the hierarchy are tracked incrementally with inotify,
+    such that only files that were changed need to be inspected,
+    and the limits are checked every second.
+    If inotify cannot be used (e.g., because the limit on the number of watches
+    is reached), we fall back to scanning the whole hierarchy periodically.
     """
 
     def __init__(
@@ -43,6 +66,18 @@ class FileHierarchyLimitThread(threading.Thread):
         self._callback = callbackFn
         self._finished = threading.Event()
 
+        self._inotify_fd = None
+        self._inotify_mask = _INOTIFY_MASK
+        if files_size_limit:
+            # Consecutive modifications of the same file are merged into one event
+            # by the kernel, so this does not produce many events.
+            self._inotify_mask |= libc.IN_MODIFY
+        self._watched_dirs = {}  # watch descriptor -> path of directory
+        self._files = {}  # path -> size (0 if there is no size limit)
+        self._files_size = 0
+        self._changed_files = set()
+        self._needs_scan = True
+
     def _check_limit(self, files_count, files_size):
         if self._files_count_limit and files_count > self._files_count_limit:
             reason = "files-count"
@@ -62,47 +97,167 @@ class FileHierarchyLimitThread(threading.Thread):
         return reason
 
     def run(self):
-        while not self._finished.is_set():
-            self._finished.wait(_CHECK_INTERVAL_SECONDS)
-
-            files_count = 0
-            files_size = 0
-            start_time = time.monotonic()
-            for current_dir, _dirs, files in os.walk(self._path):
-                for file in files:
-                    abs_file = os.path.join(current_dir, file)
-                    file = "/" + os.path.relpath(file, self._path)
-                    # file has now the path as visible for tool
-                    if (
-                        not container.is_container_system_config_file(file)
-                        and os.path.isfile(abs_file)
-                        and not os.path.islink(abs_file)
-                    ):
-                        files_count += 1
-                        if self._files_size_limit:
-                            try:
-                                files_size += os.path.getsize(abs_file)
-                            except OSError:
-                                # possibly just deleted
-                                pass
-            if self._check_limit(files_count, files_size):
+        try:
+            try:
+                self._inotify_fd = libc.inotify_init1(
+                    libc.IN_NONBLOCK | libc.IN_CLOEXEC
+                )
+            except OSError as e:
+                logging.debug(
+                    "Cannot use inotify for enforcing file-hierarchy limits: %s", e
+                )
+            self._run()
+        finally:
+            if self._inotify_fd is not None:
+                os.close(self._inotify_fd)
+
+    def _run(self):
+        while True:
+            if self._needs_scan:
+                self._scan()
+            else:
+                for path in self._changed_files:
+                    self._update_file(path)
+            self._changed_files.clear()
+
+            if self._check_limit(len(self._files), self._files_size):
                 return
 
-            duration = time.monotonic() - start_time
+            if self._inotify_fd is not None:
+                if self._finished.wait(_CHECK_INTERVAL_SECONDS):
+                    return
+                self._read_events()
+            else:
+                if self._finished.wait(_SCAN_INTERVAL_SECONDS):
+                    return
+                self._needs_scan = True
+
+    def _scan(self):
+        """Rebuild the information about all files from scratch."""
+        start_time = time.monotonic()
+        self._needs_scan = False
+        self._watched_dirs.clear()
+        self._files.clear()
+        self._files_size = 0
+        self._add_directory(self._path)
 
-            logging.debug(
-                "FileHierarchyLimitThread for process %d: "
-                "files count: %d, files size: %d, scan duration %fs",
-                self._pid_to_kill,
-                files_count,
-                files_size,
+        duration = time.monotonic() - start_time
+        logging.debug(
+            "FileHierarchyLimitThread for process %d: "
+            "files count: %d, files size: %d, scan duration %fs",
+            self._pid_to_kill,
+            len(self._files),
+            self._files_size,
+            duration,
+        )
+        if duration > _DURATION_WARNING_THRESHOLD:
+            logging.warning(
+                "Scanning file hierarchy for enforcement of limits took %ds.",
                 duration,
             )
-            if duration > _DURATION_WARNING_THRESHOLD:
+
+    def _add_directory(self, path):
+        """Watch a directory (recursively) and add all files that it contains."""
+        directories = [path]
+        while directories:
+            current_dir = directories.pop()
+            # The watch is added before the directory is listed,
+            # such that we cannot miss files that are created concurrently.
+            # (os.walk() would list each directory before returning it.)
+            self._watch_directory(current_dir)
+            try:
+                with os.scandir(current_dir) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(entry.path)
+                        else:
+                            self._update_file(entry.path)
+            except OSError as e:
+                # possibly just deleted
+                logging.debug("Cannot list directory %s: %s", current_dir, e)
+
+    def _watch_directory(self, path):
+        if self._inotify_fd is None:
+            return
+        try:
+            wd = libc.inotify_add_watch(
+                self._inotify_fd, os.fsencode(path), self._inotify_mask
+            )
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
                 logging.warning(
-                    "Scanning file hierarchy for enforcement of limits took %ds.",
-                    duration,
+                    "Limit on number of inotify watches reached, "
+                    "falling back to periodically scanning file hierarchy "
+                    "for enforcement of file-hierarchy limits."
                 )
+                os.close(self._inotify_fd)
+                self._inotify_fd = None
+            else:
+                # possibly just deleted
+                logging.debug("Cannot watch directory %s: %s", path, e)
+        else:
+            self._watched_dirs[wd] = path
+
+    def _update_file(self, path):
+        """Update the information about one file from the file system."""
+        old_size = self._files.pop(path, None)
+        if old_size is not None:
+            self._files_size -= old_size
+
+        # file as visible for tool
+        file = "/" + os.path.relpath(path, self._path)
+        if container.is_container_system_config_file(file):
+            return
+        try:
+            file_stat = os.lstat(path)
+        except OSError:
+            return  # possibly just deleted
+        if stat.S_ISREG(file_stat.st_mode):
+            size = file_stat.st_size if self._files_size_limit else 0
+            self._files[path] = size
+            self._files_size += size
+
+    def _read_events(self):
+        """Read all pending inotify events and record which files were changed."""
+        while self._inotify_fd is not None:
+            try:
+                buf = os.read(self._inotify_fd, _INOTIFY_BUFFER_SIZE)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _cookie, length = _INOTIFY_EVENT.unpack_from(buf, offset)
+                offset += _INOTIFY_EVENT.size
+                name = buf[offset : offset + length].rstrip(b"\0")
+                offset += length
+                self._handle_event(wd, mask, os.fsdecode(name))
+            if len(buf) < _INOTIFY_BUFFER_SIZE // 2:
+                # Queue was drained, do not keep reading while the tool keeps
+                # producing events, otherwise we would never check the limits.
+                return
+
+    def _handle_event(self, wd, mask, name):
+        if mask & libc.IN_Q_OVERFLOW:
+            # Events were lost.
+            self._needs_scan = True
+            return
+        if mask & libc.IN_IGNORED:
+            # Watched directory was removed.
+            self._watched_dirs.pop(wd, None)
+            return
+        directory = self._watched_dirs.get(wd)
+        if directory is None or not name:
+            return
+
+        path = os.path.join(directory, name)
+        if mask & libc.IN_ISDIR:
+            if mask & libc.IN_MOVED_FROM:
+                # Paths of all files and watches below the directory have changed.
+                self._needs_scan = True
+            elif mask & (libc.IN_CREATE | libc.IN_MOVED_TO) and not self._needs_scan:
+                self._add_directory(path)
+        else:
+            self._changed_files.add(path)
 
     def cancel(self):
         self._finished.set()
@@ -11,6 +11,7 @@ import os
 import subprocess
 import signal
 import re
+import threading
 from benchexec.util import find_executable2
 from decimal import Decimal
 
@@ -19,6 +20,174 @@ DOMAIN_CORE = "core"
 DOMAIN_UNCORE = "uncore"
 DOMAIN_DRAM = "dram"
 
+POWERCAP_DIR = "/sys/class/powercap"
+
+# The counters wrap around after max_energy_range_uj microjoules, which is about
+# 262 kJ on current CPUs (more than 10 min even with 400 W),
+# so sampling them in this interval notices every wrap.
+RAPL_SAMPLING_INTERVAL = 10  # seconds
+
+_shared_rapl_meter = None
+_shared_rapl_meter_lock = threading.Lock()
+
+
+class _RaplCounter(object):
+    """One energy counter of a RAPL domain in the powercap file system."""
+
+    __slots__ = ["package", "domain", "energy_file", "max_range", "last", "total"]
+
+    def __init__(self, package, domain, zone_dir):
+        self.package = package
+        self.domain = domain
+        self.energy_file = os.path.join(zone_dir, "energy_uj")
+        with open(os.path.join(zone_dir, "max_energy_range_uj"), "rb") as f:
+            self.max_range = int(f.read())
+        self.last = self._read()
+        self.total = 0  # microjoules since creation of the counter
+
+    def _read(self):
+        with open(self.energy_file, "rb") as f:
+            return int(f.read())
+
+    def update(self):
+        value = self._read()
+        if value < self.last:
+            # counter wrapped around from max_range to 0
+            # (once, if sampled often enough)
+            self.total += self.max_range + 1 - self.last + value
+        else:
+            self.total += value - self.last
+        self.last = value
+
+
+class RaplEnergyMeter(object):
+    """
+    Reads the energy counters of Intel RAPL via the powercap file system
+    in-process. One instance can be shared by all measurements,
+    it samples the counters periodically in a background thread
+    such that wraparounds of the counters are handled also for long measurements.
+    """
+
+    def __init__(self, powercap_dir=POWERCAP_DIR, interval=RAPL_SAMPLING_INTERVAL):
+        """
+        @param powercap_dir: the directory with the powercap zones
+        @param interval: the time between two samples of the counters in seconds
+        """
+        self._counters = []
+        for zone in sorted(os.listdir(powercap_dir)):
+            if not re.match(r"intel-rapl:\d+$", zone):
+                continue  # only packages, subzones are handled below
+            zone_dir = os.path.join(powercap_dir, zone)
+            match = re.match(r"package-(\d+)$", _read_name(zone_dir))
+            if not match:
+                continue  # e.g., psys or one of several dies of a package
+            package = int(match.group(1))
+            self._counters.append(_RaplCounter(package, DOMAIN_PACKAGE, zone_dir))
+            for subzone in sorted(os.listdir(zone_dir)):
+                if subzone.startswith(zone + ":"):
+                    subzone_dir = os.path.join(zone_dir, subzone)
+                    domain = _read_name(subzone_dir)
+                    if domain in [DOMAIN_CORE, DOMAIN_UNCORE, DOMAIN_DRAM]:
+                        self._counters.append(
+                            _RaplCounter(package, domain, subzone_dir)
+                        )
+        if not self._counters:
+            raise OSError(f"No RAPL packages in {powercap_dir}")
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._interval = interval
+        self._thread = threading.Thread(
+            target=self._sample_periodically, name="RaplEnergyMeter", daemon=True
+        )
+        self._thread.start()
+
+    @classmethod
+    def get_shared(cls, interval=RAPL_SAMPLING_INTERVAL):
+        """
+        Return the RaplEnergyMeter that is shared by all measurements, or None.
+        @param interval: the sampling interval in seconds if the meter is created
+            by this call (otherwise the meter keeps its interval)
+        """
+        global _shared_rapl_meter
+        with _shared_rapl_meter_lock:
+            if _shared_rapl_meter is None:
+                try:
+                    _shared_rapl_meter = cls(interval=interval)
+                except OSError as e:
+                    logging.debug("Energy measurement with RAPL not available: %s", e)
+                    _shared_rapl_meter = False
+            return _shared_rapl_meter or None
+
+    def _sample_periodically(self):
+        while not self._stopped.wait(self._interval):
+            self.read()
+
+    def read(self):
+        """
+        Return the energy consumed since this meter was created,
+        as a dict from packages to dicts from domains to Joules.
+        The difference of the results of two calls is the energy consumed between.
+        """
+        energy = collections.defaultdict(dict)
+        with self._lock:
+            for counter in self._counters:
+                try:
+                    counter.update()
+                except OSError as e:
+                    logging.warning("Could not read energy counter: %s", e)
+                energy[counter.package][counter.domain] = counter.total
+        return {
+            package: {
+                domain: Decimal(total) / 1000000 for domain, total in domains.items()
+            }
+            for package, domains in energy.items()
+        }
+
+    def close(self):
+        """Stop the sampling thread."""
+        self._stopped.set()
+        self._thread.join()
+
+
+def _read_name(zone_dir):
+    with open(os.path.join(zone_dir, "name")) as f:
+        return f.read().strip()
+
+
+class RaplEnergyMeasurement(object):
+    """
+    A measurement of energy with a (shared) RaplEnergyMeter,
+    with the same interface as EnergyMeasurement.
+    """
+
+    def __init__(self, meter):
+        self._meter = meter
+        self._start_values = None
+
+    def start(self):
+        assert (
+            not self.is_running()
+        ), "Attempted to start an energy measurement while one was already running."
+        self._start_values = self._meter.read()
+
+    def stop(self):
+        """Return the energy consumed since start(), if the measurement was running."""
+        if not self.is_running():
+            return None
+        end_values = self._meter.read()
+        consumed_energy = collections.defaultdict(dict)
+        for package, domains in end_values.items():
+            for domain, value in domains.items():
+                consumed_energy[package][domain] = (
+                    value - self._start_values[package][domain]
+                )
+        self._start_values = None
+        return consumed_energy
+
+    def is_running(self):
+        return self._start_values is not None
+
 
 class EnergyMeasurement(object):
     def __init__(self, executable):
@@ -27,6 +196,14 @@ class EnergyMeasurement(object):
 
     @classmethod
     def create_if_supported(cls):
+        """
+        Return an energy measurement, which reads RAPL in-process if possible,
+        and otherwise uses cpu-energy-meter. Return None if neither is available.
+        """
+        meter = RaplEnergyMeter.get_shared()
+        if meter:
+            return RaplEnergyMeasurement(meter)
+
         executable = find_executable2("cpu-energy-meter")
         if executable is None:  # not available on current system
             logging.debug(
@@ -198,3 +198,28 @@ PR_GET_SECCOMP = 21
 PR_SET_SECCOMP = 22
 SUID_DUMP_DISABLE = 0
 SUID_DUMP_USER = 1
+
+inotify_init1 = _libc.inotify_init1
+"""Create an inotify instance."""
+inotify_init1.argtypes = [c_int]
+inotify_init1.errcheck = _check_errno
+
+inotify_add_watch = _libc.inotify_add_watch
+"""Add a watch for a file or directory to an inotify instance."""
+inotify_add_watch.argtypes = [c_int, c_char_p, c_uint32]  # fd, path, mask
+inotify_add_watch.errcheck = _check_errno
+
+# /usr/include/sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
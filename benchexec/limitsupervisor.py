@@ -0,0 +1,203 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Supervision of limits of concurrently executed runs by a single shared thread.
+
+Instead of one polling thread per run, all checks are registered in one
+LimitSupervisor, which keeps them in a priority queue ordered by the time
+of their next check and sleeps exactly until the next check is due.
+"""
+
+import heapq
+import itertools
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+
+from benchexec import util
+
+# Minimal interval between two checks of the same limit.
+# This is the precision (in wall time) with which limits are enforced.
+MIN_CHECK_INTERVAL = 0.05  # seconds
+
+_NO_LIMIT = 60 * 60 * 24 * 365 * 100  # dummy value for non-existing limits
+
+_shared_supervisor = None
+_shared_supervisor_lock = threading.Lock()
+
+
+def get_shared_supervisor():
+    """Return the LimitSupervisor of this process, starting it if necessary."""
+    global _shared_supervisor
+    with _shared_supervisor_lock:
+        if _shared_supervisor is None:
+            _shared_supervisor = LimitSupervisor()
+            _shared_supervisor.start()
+        return _shared_supervisor
+
+
+class LimitSupervisor(threading.Thread):
+    """
+    Daemon thread that executes the check() method of all registered checks
+    whenever they are due. check() gets the current time (from time.monotonic())
+    and returns the time of the next check or None if no further check is necessary.
+    All checks are executed while holding a lock that is also held by cancel(),
+    so after cancel() returns a check is guaranteed not to be executed anymore.
+    """
+
+    def __init__(self):
+        super(LimitSupervisor, self).__init__()
+        self.name = "LimitSupervisor-" + self.name
+        self.daemon = True
+        self._condition = threading.Condition()
+        self._queue = []  # heap of (due time, sequence number, check)
+        self._counter = itertools.count()  # for breaking ties in the heap
+
+    def add(self, check, due_time=None):
+        """Register a check that should be executed first at the given time."""
+        with self._condition:
+            self._schedule(check, time.monotonic() if due_time is None else due_time)
+            self._condition.notify()
+        return check
+
+    def _schedule(self, check, due_time):
+        check._due_time = due_time
+        heapq.heappush(self._queue, (due_time, next(self._counter), check))
+
+    def cancel(self, check):
+        """Unregister a check, after this method returns it will not be executed."""
+        with self._condition:
+            check._due_time = None
+
+    def run(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                while self._queue and self._queue[0][0] <= now:
+                    due_time, _, check = heapq.heappop(self._queue)
+                    if check._due_time != due_time:
+                        continue  # cancelled
+                    try:
+                        next_time = check.check(now)
+                    except BaseException:
+                        logging.exception("Error during check of %s", check)
+                        next_time = None
+                    if next_time is None:
+                        check._due_time = None
+                    else:
+                        self._schedule(check, max(next_time, now + MIN_CHECK_INTERVAL))
+                    now = time.monotonic()
+
+                timeout = self._queue[0][0] - now if self._queue else None
+                self._condition.wait(timeout)
+
+
+class TimeLimit(object):
+    """
+    Check that terminates a process when it has reached its CPU-time limit
+    or wall-time limit. After a limit was reached and the process was killed,
+    the attribute "overshoot" contains the amount of seconds by which the used
+    CPU time (or wall time, respectively) exceeded the limit at the time of the kill.
+    """
+
+    def __init__(
+        self,
+        cgroups,
+        hardtimelimit,
+        softtimelimit,
+        walltimelimit,
+        pid_to_kill,
+        cores,
+        callbackFn=lambda reason: None,
+        supervisor=None,
+    ):
+        if hardtimelimit or softtimelimit:
+            assert cgroups.CPU in cgroups
+        assert walltimelimit is not None
+
+        if cores:
+            self.cpuCount = len(cores)
+        else:
+            try:
+                self.cpuCount = multiprocessing.cpu_count()
+            except NotImplementedError:
+                self.cpuCount = 1
+
+        self.cgroups = cgroups
+        # set timelimits to large dummy value if no limit is given
+        self.timelimit = hardtimelimit or _NO_LIMIT
+        self.softtimelimit = softtimelimit or _NO_LIMIT
+        self.latestKillTime = time.monotonic() + walltimelimit
+        self.pid_to_kill = pid_to_kill
+        self.callback = callbackFn
+        self.overshoot = None
+        self._due_time = None
+        self._supervisor = supervisor or get_shared_supervisor()
+        self._supervisor.add(self)
+
+    def __str__(self):
+        return f"time limit of process {self.pid_to_kill}"
+
+    def _kill(self, reason, overshoot):
+        self.callback(reason)
+        self.overshoot = overshoot
+        util.kill_process(self.pid_to_kill)
+
+    def check(self, now):
+        if self.cgroups.CPU in self.cgroups:
+            try:
+                usedCpuTime = self.cgroups.read_cputime()
+            except ValueError:
+                # Sometimes the kernel produces strange values with linebreaks in them
+                return now + MIN_CHECK_INTERVAL
+        else:
+            usedCpuTime = 0
+        remainingCpuTime = self.timelimit - usedCpuTime
+        remainingSoftCpuTime = self.softtimelimit - usedCpuTime
+        remainingWallTime = self.latestKillTime - now
+        logging.debug(
+            "TimeLimit for process %s: used CPU time: %s, remaining CPU time: %s, "
+            "remaining soft CPU time: %s, remaining wall time: %s.",
+            self.pid_to_kill,
+            usedCpuTime,
+            remainingCpuTime,
+            remainingSoftCpuTime,
+            remainingWallTime,
+        )
+        if remainingCpuTime <= 0:
+            logging.debug(
+                "Killing process %s due to CPU time timeout.", self.pid_to_kill
+            )
+            self._kill("cputime", -remainingCpuTime)
+            return None
+        if remainingWallTime <= 0:
+            logging.warning(
+                "Killing process %s due to wall time timeout.", self.pid_to_kill
+            )
+            self._kill("walltime", -remainingWallTime)
+            return None
+
+        if remainingSoftCpuTime <= 0:
+            self.callback("cputime-soft")
+            # soft time limit violated, ask process to terminate
+            util.kill_process(self.pid_to_kill, signal.SIGTERM)
+            self.softtimelimit = self.timelimit
+            remainingSoftCpuTime = remainingCpuTime
+
+        # The CPU time cannot increase faster than the number of cores,
+        # so no limit can be reached before this time.
+        return now + min(
+            remainingCpuTime / self.cpuCount,
+            remainingSoftCpuTime / self.cpuCount,
+            remainingWallTime,
+        )
+
+    def cancel(self):
+        self._supervisor.cancel(self)
@@ -5,13 +5,16 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import bz2
+import collections
+import glob
 import logging
 import os
-import queue
 import resource
 import sys
 import threading
 import time
+from xml.etree import ElementTree
 
 from benchexec import BenchExecException
 from benchexec.cgroups import Cgroups
@@ -19,20 +22,26 @@ from benchexec import containerexecutor
 from benchexec import resources
 from benchexec.runexecutor import RunExecutor
 from benchexec.pqos import Pqos
+from benchexec.resctrl import ResctrlMonitor
 from benchexec import systeminfo
 from benchexec import tooladapter
 from benchexec import util
 from benchexec.intel_cpu_energy import EnergyMeasurement
 
-
 WORKER_THREADS = []
 STOPPED_BY_INTERRUPT = False
 
+# Number of runs per parallel slot that are taken in advance from their run set
+_LOOKAHEAD_PER_SLOT = 2
+
 
 def init(config, benchmark):
     config.containerargs = {}
     if config.container:
         config.containerargs = containerexecutor.handle_basic_container_args(config)
+        config.containerargs.update(
+            containerexecutor.handle_result_files_transfer_args(config)
+        )
         if config.containerargs["container_tmpfs"] and (
             config.filesCountLimit or config.filesSizeLimit
         ):
@@ -58,6 +67,12 @@ def execute_benchmark(benchmark, output_handler):
 
     logging.debug("I will use %s threads.", benchmark.num_of_threads)
 
+    if benchmark.config.stream_runs and benchmark.config.schedule_by_duration:
+        logging.warning(
+            "Ignoring --schedule-by-duration because runs are created lazily "
+            "in the order of their tasks with --stream-runs."
+        )
+
     if (
         benchmark.requirements.cpu_model
         or benchmark.requirements.cpu_cores != benchmark.rlimits.cpu_cores
@@ -133,32 +148,37 @@ def execute_benchmark(benchmark, output_handler):
             "and thus makes the performance unreliable."
         )
 
+    # one monitor for all runs, otherwise pqos_wrapper is started for each run
+    cache_monitor = None
+    if coreAssignment:
+        cache_monitor = ResctrlMonitor.create_if_supported(coreAssignment)
+
     throttle_check = systeminfo.CPUThrottleCheck()
     swap_check = systeminfo.SwapCheck()
 
     # iterate over run sets
-    for runSet in benchmark.run_sets:
-        if STOPPED_BY_INTERRUPT:
-            break
-
-        if not runSet.should_be_executed():
-            output_handler.output_for_skipping_run_set(runSet)
-
-        elif not runSet.runs:
-            output_handler.output_for_skipping_run_set(
-                runSet, "because it has no files"
-            )
-
-        else:
-            run_sets_executed += 1
-            _execute_run_set(
-                runSet,
+    if benchmark.config.overlap_run_sets:
+        # all run sets share the same workers
+        run_set_groups = [benchmark.run_sets]
+    else:
+        run_set_groups = [[runSet] for runSet in benchmark.run_sets]
+    try:
+        for run_sets in run_set_groups:
+            if STOPPED_BY_INTERRUPT:
+                break
+
+            run_sets_executed += _execute_run_sets(
+                run_sets,
                 benchmark,
                 output_handler,
                 coreAssignment,
                 memoryAssignment,
                 cpu_packages,
+                cache_monitor,
             )
+    finally:
+        if cache_monitor:
+            cache_monitor.close()
 
     if throttle_check.has_throttled():
         logging.warning(
@@ -176,30 +196,44 @@ def execute_benchmark(benchmark, output_handler):
     return 0
 
 
-def _execute_run_set(
-    runSet, benchmark, output_handler, coreAssignment, memoryAssignment, cpu_packages
+def _execute_run_sets(
+    run_sets,
+    benchmark,
+    output_handler,
+    coreAssignment,
+    memoryAssignment,
+    cpu_packages,
+    cache_monitor,
 ):
+    """
+    Execute the given run sets with a common set of workers.
+    If more than one run set is given, the runs of the next run set are started
+    as soon as all runs of the previous run sets have been started.
+    @return the number of executed run sets
+    """
+    overlap = len(run_sets) > 1
+    scheduler = _RunScheduler(
+        run_sets,
+        output_handler,
+        benchmark.num_of_threads,
+        benchmark.config.schedule_by_duration,
+    )
+    run_count = sum(runSet.run_count for runSet in scheduler.run_sets)
+    if not run_count:
+        # only skipped run sets, which the scheduler has already handled
+        return 0
+
     # get times before runSet
-    energy_measurement = EnergyMeasurement.create_if_supported()
+    energy_measurement = None
+    if not overlap:
+        energy_measurement = EnergyMeasurement.create_if_supported()
     ruBefore = resource.getrusage(resource.RUSAGE_CHILDREN)
     walltime_before = time.monotonic()
     if energy_measurement:
         energy_measurement.start()
 
-    output_handler.output_before_run_set(runSet)
-
-    # put all runs into a queue
-    for run in runSet.runs:
-        _Worker.working_queue.put(run)
-
-    # keep a counter of unfinished runs for the below assertion
-    unfinished_runs = len(runSet.runs)
-    unfinished_runs_lock = threading.Lock()
-
-    def run_finished():
-        nonlocal unfinished_runs
-        with unfinished_runs_lock:
-            unfinished_runs -= 1
+    if not overlap:
+        scheduler.start_next_run_set()
 
     if not containerexecutor.NATIVE_CLONE_CALLBACK_SUPPORTED:
         logging.debug(
@@ -210,41 +244,306 @@ def _execute_run_set(
         sys.setswitchinterval(1000)
 
     # create some workers
-    for i in range(min(benchmark.num_of_threads, unfinished_runs)):
+    result_handler = _ResultHandler(scheduler, benchmark.num_of_threads)
+    for i in range(min(benchmark.num_of_threads, run_count)):
         if STOPPED_BY_INTERRUPT:
             break
         cores = coreAssignment[i] if coreAssignment else None
         memBanks = memoryAssignment[i] if memoryAssignment else None
         WORKER_THREADS.append(
-            _Worker(benchmark, cores, memBanks, output_handler, run_finished)
+            _Worker(
+                benchmark,
+                cores,
+                memBanks,
+                output_handler,
+                scheduler,
+                result_handler,
+                cache_monitor,
+            )
         )
+    result_handler.close()
+
+    if overlap:
+        # finish run sets in their original order as soon as all their runs are done
+        for runSet in scheduler.finished_run_sets():
+            cputime = sum(run.values.get("cputime") or 0 for run in runSet.runs)
+            _finish_run_set(runSet, output_handler, scheduler, cputime)
 
     # wait until workers are finished (all tasks done or STOPPED_BY_INTERRUPT)
     for worker in WORKER_THREADS:
         worker.join()
-    assert unfinished_runs == 0 or STOPPED_BY_INTERRUPT
-
-    # get times after runSet
-    walltime_after = time.monotonic()
-    energy = energy_measurement.stop() if energy_measurement else None
-    usedWallTime = walltime_after - walltime_before
-    ruAfter = resource.getrusage(resource.RUSAGE_CHILDREN)
-    usedCpuTime = (ruAfter.ru_utime + ruAfter.ru_stime) - (
-        ruBefore.ru_utime + ruBefore.ru_stime
-    )
-    if energy and cpu_packages:
-        energy = {pkg: energy[pkg] for pkg in energy if pkg in cpu_packages}
+    result_handler.join()
+
+    if not overlap:
+        # get times after runSet
+        walltime_after = time.monotonic()
+        energy = energy_measurement.stop() if energy_measurement else None
+        usedWallTime = walltime_after - walltime_before
+        ruAfter = resource.getrusage(resource.RUSAGE_CHILDREN)
+        usedCpuTime = (ruAfter.ru_utime + ruAfter.ru_stime) - (
+            ruBefore.ru_utime + ruBefore.ru_stime
+        )
+        if energy and cpu_packages:
+            energy = {pkg: energy[pkg] for pkg in energy if pkg in cpu_packages}
+        for runSet in scheduler.finished_run_sets():
+            _finish_run_set(
+                runSet, output_handler, scheduler, usedCpuTime, usedWallTime, energy
+            )
 
     if not containerexecutor.NATIVE_CLONE_CALLBACK_SUPPORTED:
         sys.setswitchinterval(py_switch_interval)
 
+    return len(scheduler.run_sets)
+
+
+def _finish_run_set(
+    runSet, output_handler, scheduler, cputime, walltime=None, energy=None
+):
+    makespan, idle_time = scheduler.get_run_set_times(runSet)
+    logging.info(
+        "Run set %s took %.1fs until its last run finished, "
+        "parallel slots were idle for %.1fs (%.0f%%) of this time.",
+        runSet.index,
+        makespan,
+        idle_time,
+        100 * idle_time / (makespan * scheduler.slot_count) if makespan else 0,
+    )
+
     if STOPPED_BY_INTERRUPT:
         output_handler.set_error("interrupted", runSet)
     output_handler.output_after_run_set(
-        runSet, cputime=usedCpuTime, walltime=usedWallTime, energy=energy
+        runSet,
+        cputime=cputime,
+        walltime=makespan if walltime is None else walltime,
+        energy=energy,
     )
 
 
+def _get_previous_durations(benchmark, runSet):
+    """
+    Read the wall times of the runs of the given run set
+    from the most recent existing result file of the same benchmark.
+    @return a dict from the runs of the run set to their previous wall time
+    """
+    pattern = glob.escape(f"{benchmark.config.output_path}{benchmark.name}.") + "*"
+    pattern += glob.escape(
+        ".results." + (runSet.name + "." if runSet.name else "") + "xml"
+    )
+    result_files = glob.glob(pattern) + glob.glob(pattern + ".bz2")
+    result_files = [
+        f for f in result_files if not f.startswith(benchmark.output_base_name)
+    ]
+    if not result_files:
+        return {}
+    result_file = max(result_files, key=os.path.getmtime)
+
+    runs = {}
+    for run in runSet.runs:
+        # same as the identification of the run in the result file
+        name = (
+            util.relative_path(run.identifier, result_file)
+            if run.sourcefiles
+            else run.identifier
+        )
+        properties = " ".join(sorted(prop.name for prop in run.properties)) or None
+        runs[(name, properties)] = run
+
+    durations = {}
+    open_func = bz2.BZ2File if result_file.endswith(".bz2") else open
+    try:
+        with open_func(result_file, "rb") as f:
+            for _event, elem in ElementTree.iterparse(f):
+                if elem.tag != "run":
+                    continue
+                run = runs.get((elem.get("name"), elem.get("properties")))
+                for column in elem.findall("column"):
+                    if run and column.get("title") == "walltime":
+                        try:
+                            durations[run] = float(column.get("value").rstrip("s"))
+                        except ValueError:
+                            pass
+                elem.clear()
+    except (OSError, EOFError, ElementTree.ParseError) as e:
+        logging.warning("Could not read previous results from %s: %s", result_file, e)
+        return {}
+    logging.debug(
+        "Found wall times of %s runs of run set %s in %s.",
+        len(durations),
+        runSet.index,
+        result_file,
+    )
+    return durations
+
+
+def _sort_runs_by_duration(runs, durations):
+    """
+    Sort the given runs such that runs with the longest expected duration come first.
+    Runs without known duration are expected to take the average known duration.
+    """
+    if not durations:
+        return list(runs)
+    default_duration = sum(durations.values()) / len(durations)
+    return sorted(runs, key=lambda run: -durations.get(run, default_duration))
+
+
+class _RunScheduler(object):
+    """
+    Hands out the runs of one or more run sets to the workers.
+    Runs are handed out in the order of their run sets,
+    and within each run set either in the defined order or longest-first
+    based on the wall times of a previous execution of the same benchmark.
+    The next run set is started when all runs of the current run set
+    have been handed out, such that the workers that would otherwise be idle
+    during the tail of the current run set can continue with the next one.
+    Because all workers take their runs from here, a worker never waits
+    as long as there is any run left.
+    Only a few runs per parallel slot are taken from their run set in advance,
+    such that runs that are created lazily by the run set
+    are created only shortly before they are executed.
+    Furthermore, this class measures for each run set the makespan
+    (wall time from its start until its last run finished)
+    and the accumulated time during which parallel slots were idle.
+    """
+
+    def __init__(self, run_sets, output_handler, slot_count, sort_by_duration):
+        self.output_handler = output_handler
+        self.slot_count = slot_count
+        self.sort_by_duration = sort_by_duration
+        self._pending_run_sets = collections.deque(run_sets)
+        self._condition = threading.Condition()
+        self._queue = collections.deque()  # runs of current run set not handed out
+        self._lookahead = max(1, _LOOKAHEAD_PER_SLOT * slot_count)
+        self._run_set = None  # current run set
+        self._runs = None  # iterator over remaining runs of current run set
+        self._unfinished_runs = {}  # run set -> number of unfinished runs
+        self._start_times = {}  # run set -> start time
+        self._end_times = {}  # run set -> end time of last run
+        self._busy_intervals = []  # start and end time of each executed run
+        self._active_workers = 0
+
+        # run sets that will be executed, others are reported as skipped when reached
+        self.run_sets = [
+            runSet
+            for runSet in run_sets
+            if runSet.should_be_executed() and runSet.run_count
+        ]
+        if not self.run_sets:
+            self._skip_run_sets()
+
+    def _skip_run_sets(self):
+        """Report all run sets before the next executed run set as skipped."""
+        while self._pending_run_sets and self._pending_run_sets[0] not in self.run_sets:
+            runSet = self._pending_run_sets.popleft()
+            if not runSet.should_be_executed():
+                self.output_handler.output_for_skipping_run_set(runSet)
+            else:
+                self.output_handler.output_for_skipping_run_set(
+                    runSet, "because it has no files"
+                )
+
+    def start_next_run_set(self):
+        """Start the next run set, return False if there is none."""
+        with self._condition:
+            self._skip_run_sets()
+            if not self._pending_run_sets:
+                return False
+            runSet = self._pending_run_sets.popleft()
+
+            if self.sort_by_duration and not runSet.lazy_runs:
+                runs = _sort_runs_by_duration(
+                    runSet.runs, _get_previous_durations(runSet.benchmark, runSet)
+                )
+            else:
+                runs = runSet.create_runs()
+            self._run_set = runSet
+            self._runs = iter(runs)
+            # the run set is unfinished at least until all its runs were created
+            self._unfinished_runs[runSet] = 1
+
+            self.output_handler.output_before_run_set(runSet)
+            self._start_times[runSet] = time.monotonic()
+            self._fill_queue()
+            return True
+
+    def _fill_queue(self):
+        """Take runs from the current run set until the lookahead is reached."""
+        runSet = self._run_set
+        while self._runs is not None and len(self._queue) < self._lookahead:
+            run = next(self._runs, None)
+            if run is None:
+                self._runs = None
+                self._run_set_done(runSet, time.monotonic())
+                break
+            if runSet.lazy_runs:
+                self.output_handler.output_for_new_run(run)
+            self._queue.append(run)
+            self._unfinished_runs[runSet] += 1
+
+    def _run_set_done(self, runSet, end_time):
+        self._unfinished_runs[runSet] -= 1
+        if not self._unfinished_runs[runSet]:
+            self._end_times.setdefault(runSet, end_time)
+            self._condition.notify_all()
+
+    def next_run(self):
+        """Get the next run to execute, or None if there is none."""
+        with self._condition:
+            while not self._queue:
+                if STOPPED_BY_INTERRUPT or not self.start_next_run_set():
+                    return None
+            run = self._queue.popleft()
+            if not STOPPED_BY_INTERRUPT:
+                self._fill_queue()
+            return run
+
+    def run_finished(self, run, start_time, end_time):
+        with self._condition:
+            self._busy_intervals.append((start_time, end_time))
+            runSet = run.runSet
+            self._end_times[runSet] = max(self._end_times.get(runSet, 0), end_time)
+            self._run_set_done(runSet, end_time)
+
+    def worker_started(self):
+        with self._condition:
+            self._active_workers += 1
+
+    def worker_finished(self):
+        with self._condition:
+            self._active_workers -= 1
+            self._condition.notify_all()
+
+    def finished_run_sets(self):
+        """
+        Generate the started run sets in their order as soon as all their runs
+        have finished (or, if interrupted, as soon as all workers have finished).
+        """
+        for runSet in self.run_sets:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._unfinished_runs.get(runSet) == 0
+                    or not self._active_workers
+                )
+                if runSet not in self._start_times:
+                    return
+                self._end_times.setdefault(runSet, time.monotonic())
+            yield runSet
+
+    def get_run_set_times(self, runSet):
+        """
+        Return the makespan of a run set and the time during which
+        parallel slots were idle while the run set was executed.
+        """
+        with self._condition:
+            start = self._start_times[runSet]
+            end = self._end_times[runSet]
+            busy_time = sum(
+                max(0, min(end, run_end) - max(start, run_start))
+                for run_start, run_end in self._busy_intervals
+            )
+        makespan = end - start
+        return makespan, max(0, self.slot_count * makespan - busy_time)
+
+
 def stop():
     global STOPPED_BY_INTERRUPT
     STOPPED_BY_INTERRUPT = True
@@ -255,37 +554,132 @@ def stop():
         worker.stop()
 
 
-class _Worker(threading.Thread):
+class _ResultHandler(threading.Thread):
     """
-    A Worker is a deamonic thread, that takes jobs from the working_queue and runs them.
+    A daemonic thread that handles the results of executed runs
+    (result analysis by the tool-info module and output of the results),
+    such that the workers can start their next run immediately
+    instead of doing this themselves.
+    The results are handled one at a time in the order in which the runs finished,
+    so the output is the same as if the workers would handle them.
+    A run counts as finished for the scheduler only after its result was handled.
+    At most max_pending results are queued, further calls to submit() block
+    until the queue has room again, such that memory usage stays bounded.
+    The thread terminates after close() was called
+    and all workers have finished and all their results were handled.
     """
 
-    working_queue = queue.Queue()
+    def __init__(self, scheduler, max_pending):
+        threading.Thread.__init__(self)  # constuctor of superclass
+        self.scheduler = scheduler
+        self._condition = threading.Condition()
+        self._queue = collections.deque()  # pending results as callables
+        self._max_pending = max(max_pending, 1)
+        self._active_workers = 0
+        self._closed = False
+        self._terminated = False
+        self.setDaemon(True)
+
+        # such that the scheduler waits for us like for a worker
+        scheduler.worker_started()
+        self.start()
+
+    def worker_started(self):
+        with self._condition:
+            self._active_workers += 1
+
+    def worker_finished(self):
+        with self._condition:
+            self._active_workers -= 1
+            self._condition.notify_all()
+
+    def close(self):
+        """Declare that no further workers will be started."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def submit(self, handle_result):
+        with self._condition:
+            # do not block forever if this thread terminated due to an exception
+            self._condition.wait_for(
+                lambda: len(self._queue) < self._max_pending or self._terminated
+            )
+            self._queue.append(handle_result)
+            self._condition.notify_all()
+
+    def run(self):
+        try:
+            while True:
+                with self._condition:
+                    self._condition.wait_for(
+                        lambda: self._queue
+                        or (self._closed and not self._active_workers)
+                    )
+                    if not self._queue:
+                        return
+                    handle_result = self._queue.popleft()
+                    self._condition.notify_all()
+                handle_result()
+        finally:
+            with self._condition:
+                self._terminated = True
+                self._condition.notify_all()
+            self.scheduler.worker_finished()
+
+
+class _Worker(threading.Thread):
+    """
+    A Worker is a deamonic thread, that takes jobs from the scheduler and runs them.
+    """
 
     def __init__(
-        self, benchmark, my_cpus, my_memory_nodes, output_handler, run_finished_callback
+        self,
+        benchmark,
+        my_cpus,
+        my_memory_nodes,
+        output_handler,
+        scheduler,
+        result_handler,
+        cache_monitor=None,
     ):
         threading.Thread.__init__(self)  # constuctor of superclass
-        self.run_finished_callback = run_finished_callback
+        self.scheduler = scheduler
+        self.result_handler = result_handler
+        self.cache_monitor = cache_monitor
         self.benchmark = benchmark
         self.my_cpus = my_cpus
         self.my_memory_nodes = my_memory_nodes
         self.output_handler = output_handler
-        self.run_executor = RunExecutor(**benchmark.config.containerargs)
+        self.run_executor = RunExecutor(
+            prepare_runs=benchmark.config.prepare_runs,
+            **benchmark.config.containerargs,
+        )
         self.setDaemon(True)
 
+        scheduler.worker_started()
+        result_handler.worker_started()
         self.start()
 
     def run(self):
+        try:
+            self._execute_runs_from_queue()
+        finally:
+            self.run_executor.close()
+            self.scheduler.worker_finished()
+            self.result_handler.worker_finished()
+
+    def _execute_runs_from_queue(self):
         while not STOPPED_BY_INTERRUPT:
-            try:
-                currentRun = _Worker.working_queue.get_nowait()
-            except queue.Empty:
+            currentRun = self.scheduler.next_run()
+            if currentRun is None:
                 return
 
+            start_time = time.monotonic()
+            run_result = None
             try:
                 logging.debug('Executing run "%s"', currentRun.identifier)
-                self.execute(currentRun)
+                run_result = self.execute(currentRun)
                 logging.debug('Finished run "%s"', currentRun.identifier)
             except SystemExit as e:
                 logging.critical(e)
@@ -293,21 +687,43 @@ class _Worker(threading.Thread):
                 logging.critical(e)
             except BaseException:
                 logging.exception("Exception during run execution")
-            self.run_finished_callback()
-            _Worker.working_queue.task_done()
+            end_time = time.monotonic()
+
+            def handle(
+                run=currentRun,
+                run_result=run_result,
+                start_time=start_time,
+                end_time=end_time,
+            ):
+                try:
+                    if run_result is not None:
+                        self.handle_result(run, run_result)
+                except SystemExit as e:
+                    logging.critical(e)
+                except BenchExecException as e:
+                    logging.critical(e)
+                except BaseException:
+                    logging.exception("Exception during handling of run result")
+                self.scheduler.run_finished(run, start_time, end_time)
+
+            self.result_handler.submit(handle)
 
     def execute(self, run):
         """
         This function executes the tool with a sourcefile with options.
-        It also calls functions for output before and after the run.
+        It also calls functions for output before the run.
+        @return the result of the run, or None if the run was interrupted
         """
         self.output_handler.output_before_run(run)
         benchmark = self.benchmark
 
         args = run.cmdline()
         logging.debug("Command line of run is %s", args)
-        pqos = Pqos()
-        if self.my_cpus:
+        pqos = None
+        if self.cache_monitor:
+            self.cache_monitor.start_run(self.my_cpus)
+        elif self.my_cpus:
+            pqos = Pqos()
             pqos.start_monitoring([self.my_cpus])
         run_result = self.run_executor.execute_run(
             args,
@@ -323,10 +739,16 @@ class _Worker(threading.Thread):
             environments=benchmark.environment(),
             workingDir=benchmark.working_directory(),
             maxLogfileSize=benchmark.config.maxLogfileSize,
+            capture_output=benchmark.config.capture_output,
             files_count_limit=benchmark.config.filesCountLimit,
             files_size_limit=benchmark.config.filesSizeLimit,
+            samples_filename=run.samples_file,
+            sample_interval=benchmark.config.sample_interval,
         )
-        mon_data = pqos.stop_monitoring()
+        if self.cache_monitor:
+            mon_data = self.cache_monitor.stop_run(self.my_cpus)
+        else:
+            mon_data = pqos.stop_monitoring() if pqos else {}
         run_result.update(mon_data)
         if not mon_data:
             logging.debug(
@@ -343,16 +765,21 @@ class _Worker(threading.Thread):
                     os.remove(run.log_file)
             except OSError:
                 pass
-            return 1
+            return None
 
         if self.my_cpus:
             run_result["cpuCores"] = self.my_cpus
         if self.my_memory_nodes:
             run_result["memoryNodes"] = self.my_memory_nodes
+        return run_result
 
+    def handle_result(self, run, run_result):
+        """
+        Analyze the result of an executed run and call functions for output after it.
+        This is called by the result handler, not by the worker thread itself.
+        """
         run.set_result(run_result)
         self.output_handler.output_after_run(run)
-        return None
 
     def stop(self):
         # asynchronous call to runexecutor,
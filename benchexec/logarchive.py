@@ -0,0 +1,304 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Writer for the ZIP archive with the log files of a benchmark
+that can be used by many threads concurrently.
+
+Unlike zipfile.ZipFile, which compresses each file while holding the archive,
+the files are compressed in the calling thread (zlib releases the GIL),
+and only appending the already compressed data to the archive is serialized.
+The compressed data is buffered in memory only for small files,
+for larger files it is written to a temporary file next to the archive.
+The produced archives are regular ZIP files (with ZIP64 extensions if necessary)
+just like those written by zipfile.ZipFile, so all readers can handle them.
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+# Structures of the ZIP format, cf. https://pkware.cachefly.net/webdocs/APPNOTE/
+_LOCAL_FILE_HEADER = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_DIRECTORY_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_OF_CENTRAL_DIRECTORY = struct.Struct("<4s4H2LH")
+_ZIP64_END_OF_CENTRAL_DIRECTORY = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR = struct.Struct("<4sLQL")
+_ZIP64_EXTRA_HEADER = struct.Struct("<2H")
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP_FILECOUNT_LIMIT = 0xFFFF
+_VERSION_DEFLATE = 20
+_VERSION_ZIP64 = 45
+_SYSTEM_UNIX = 3
+_METHOD_DEFLATE = 8
+_FLAG_UTF8 = 0x800
+
+_CHUNK_SIZE = 1024 * 1024
+# Maximal size of compressed data that is buffered in memory for each file
+_MAX_BUFFER_SIZE = 1024 * 1024
+
+
+class _Entry(object):
+    """A compressed file that is ready to be appended to the archive."""
+
+    __slots__ = [
+        "name",
+        "flags",
+        "dos_time",
+        "dos_date",
+        "crc",
+        "compressed_size",
+        "file_size",
+        "external_attr",
+        "data",
+        "header_offset",
+    ]
+
+
+def _compress_file(filename, arcname, tmp_dir):
+    """
+    Compress a file into a new entry, whose data is a file object
+    that the caller needs to close.
+    @param tmp_dir: the directory for temporary files if data does not fit in memory
+    """
+    st = os.stat(filename)
+    entry = _Entry()
+
+    # same normalization and encoding of names as zipfile
+    arcname = os.path.normpath(os.path.splitdrive(arcname)[1])
+    arcname = arcname.lstrip(os.sep).replace(os.sep, "/")
+    try:
+        entry.name = arcname.encode("ascii")
+        entry.flags = 0
+    except UnicodeEncodeError:
+        entry.name = arcname.encode("utf-8")
+        entry.flags = _FLAG_UTF8
+
+    year, month, day, hour, minute, second = time.localtime(st.st_mtime)[:6]
+    if year < 1980:
+        year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+    entry.dos_time = hour << 11 | minute << 5 | second // 2
+    entry.dos_date = (year - 1980) << 9 | month << 5 | day
+    entry.external_attr = (st.st_mode & 0xFFFF) << 16
+
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    crc = 0
+    file_size = 0
+    data = tempfile.SpooledTemporaryFile(_MAX_BUFFER_SIZE, dir=tmp_dir)
+    try:
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                crc = zlib.crc32(chunk, crc)
+                file_size += len(chunk)
+                data.write(compressor.compress(chunk))
+        data.write(compressor.flush())
+        entry.compressed_size = data.tell()
+        data.seek(0)
+    except BaseException:
+        data.close()
+        raise
+    entry.crc = crc
+    entry.file_size = file_size
+    entry.data = data
+    return entry
+
+
+class LogArchiveWriter(object):
+    """
+    A ZIP archive to which files can be added concurrently from several threads.
+    The methods write(), namelist(), and close() behave like those of
+    zipfile.ZipFile in mode "w" with compression ZIP_DEFLATED.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._tmp_dir = os.path.dirname(os.path.abspath(filename))
+        self._file = open(filename, "wb")
+        self._lock = threading.Lock()
+        self._entries = []
+
+        # statistics about the time needed for each file (in seconds)
+        self._total_time = 0
+        self._max_time = 0
+        self._total_wait_time = 0
+
+    def write(self, filename, arcname):
+        """Compress the given file in the current thread and add it to the archive."""
+        start = time.monotonic()
+        entry = _compress_file(filename, arcname, self._tmp_dir)
+        try:
+            wait_start = time.monotonic()
+            with self._lock:
+                wait_end = time.monotonic()
+                assert self._file, "archive is already closed"
+                self._append(entry)
+                end = time.monotonic()
+                self._total_time += end - start
+                self._max_time = max(self._max_time, end - start)
+                self._total_wait_time += wait_end - wait_start
+        finally:
+            entry.data.close()
+            entry.data = None  # not needed anymore
+
+    def _append(self, entry):
+        entry.header_offset = self._file.tell()
+        extra = b""
+        version = _VERSION_DEFLATE
+        compressed_size = entry.compressed_size
+        file_size = entry.file_size
+        if file_size >= _ZIP64_LIMIT or compressed_size >= _ZIP64_LIMIT:
+            extra = _ZIP64_EXTRA_HEADER.pack(1, 16) + struct.pack(
+                "<2Q", file_size, compressed_size
+            )
+            version = _VERSION_ZIP64
+            compressed_size = file_size = _ZIP64_LIMIT
+        header = _LOCAL_FILE_HEADER.pack(
+            b"PK\003\004",
+            version,
+            0,
+            entry.flags,
+            _METHOD_DEFLATE,
+            entry.dos_time,
+            entry.dos_date,
+            entry.crc,
+            compressed_size,
+            file_size,
+            len(entry.name),
+            len(extra),
+        )
+        self._file.write(header)
+        self._file.write(entry.name)
+        self._file.write(extra)
+        shutil.copyfileobj(entry.data, self._file, _CHUNK_SIZE)
+        self._entries.append(entry)
+
+    def namelist(self):
+        with self._lock:
+            return [
+                entry.name.decode("utf-8" if entry.flags & _FLAG_UTF8 else "ascii")
+                for entry in self._entries
+            ]
+
+    def close(self):
+        """Write the central directory and close the archive."""
+        with self._lock:
+            if not self._file:
+                return
+            try:
+                self._write_central_directory()
+            finally:
+                self._file.close()
+                self._file = None
+
+    def get_statistics(self):
+        """
+        Return the number of archived files and the average and maximal time
+        that was necessary for archiving one file (in seconds),
+        as well as the average time spent waiting for other threads.
+        """
+        with self._lock:
+            count = len(self._entries)
+            if not count:
+                return 0, 0, 0, 0
+            return (
+                count,
+                self._total_time / count,
+                self._max_time,
+                self._total_wait_time / count,
+            )
+
+    def _write_central_directory(self):
+        start_of_central_directory = self._file.tell()
+        for entry in self._entries:
+            extra_values = []
+            file_size = entry.file_size
+            compressed_size = entry.compressed_size
+            header_offset = entry.header_offset
+            if file_size >= _ZIP64_LIMIT:
+                extra_values.append(file_size)
+                file_size = _ZIP64_LIMIT
+            if compressed_size >= _ZIP64_LIMIT:
+                extra_values.append(compressed_size)
+                compressed_size = _ZIP64_LIMIT
+            if header_offset >= _ZIP64_LIMIT:
+                extra_values.append(header_offset)
+                header_offset = _ZIP64_LIMIT
+
+            extra = b""
+            version = _VERSION_DEFLATE
+            if extra_values:
+                extra = _ZIP64_EXTRA_HEADER.pack(1, 8 * len(extra_values))
+                extra += struct.pack(f"<{len(extra_values)}Q", *extra_values)
+                version = _VERSION_ZIP64
+
+            header = _CENTRAL_DIRECTORY_HEADER.pack(
+                b"PK\001\002",
+                version,
+                _SYSTEM_UNIX,
+                version,
+                0,
+                entry.flags,
+                _METHOD_DEFLATE,
+                entry.dos_time,
+                entry.dos_date,
+                entry.crc,
+                compressed_size,
+                file_size,
+                len(entry.name),
+                len(extra),
+                0,
+                0,
+                0,
+                entry.external_attr,
+                header_offset,
+            )
+            self._file.write(header)
+            self._file.write(entry.name)
+            self._file.write(extra)
+
+        end_of_central_directory = self._file.tell()
+        count = len(self._entries)
+        size = end_of_central_directory - start_of_central_directory
+        offset = start_of_central_directory
+        if (
+            count >= _ZIP_FILECOUNT_LIMIT
+            or size > _ZIP64_LIMIT
+            or offset > _ZIP64_LIMIT
+        ):
+            self._file.write(
+                _ZIP64_END_OF_CENTRAL_DIRECTORY.pack(
+                    b"PK\006\006",
+                    _ZIP64_END_OF_CENTRAL_DIRECTORY.size - 12,
+                    _VERSION_ZIP64,
+                    _VERSION_ZIP64,
+                    0,
+                    0,
+                    count,
+                    count,
+                    size,
+                    offset,
+                )
+            )
+            self._file.write(
+                _ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR.pack(
+                    b"PK\006\007", 0, end_of_central_directory, 1
+                )
+            )
+            count = min(count, _ZIP_FILECOUNT_LIMIT)
+            size = min(size, _ZIP64_LIMIT)
+            offset = min(offset, _ZIP64_LIMIT)
+
+        self._file.write(
+            _END_OF_CENTRAL_DIRECTORY.pack(
+                b"PK\005\006", 0, 0, count, count, size, offset, 0
+            )
+        )
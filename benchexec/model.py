@@ -6,20 +6,25 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import collections.abc
+import concurrent.futures
+import functools
+import json
 import logging
+import multiprocessing
 import os
 import re
 import sys
+import tempfile
 import yaml
 from xml.etree import ElementTree
 
+from benchexec import __version__
 from benchexec import BenchExecException
 from benchexec import intel_cpu_energy
 from benchexec import result
 from benchexec import tooladapter
 from benchexec import util
 
-
 MEMLIMIT = "memlimit"
 TIMELIMIT = "timelimit"
 CORELIMIT = "cpuCores"
@@ -46,6 +51,14 @@ _WARNED_ABOUT_UNSUPPORTED_EXPECTED_RESULT_FILTER = False
 
 _TASK_DEF_VERSIONS = frozenset(["0.1", "1.0", "2.0"])
 
+# libyaml is much faster than the pure-Python parser, if available
+_YAML_SAFE_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+TASK_DEF_CACHE_FILE = ".benchexec-taskdefs.cache"
+_TASK_DEF_CACHE_VERSION = 1
+# Minimal number of task-definition files for parsing them in parallel processes
+_PARALLEL_LOADING_THRESHOLD = 200
+
 
 def substitute_vars(oldList, runSet=None, task_file=None):
     """
@@ -91,7 +104,7 @@ def load_task_definition_file(task_def_file):
     """Open and parse a task-definition file in YAML format."""
     try:
         with open(task_def_file) as f:
-            task_def = yaml.safe_load(f)
+            task_def = yaml.load(f, Loader=_YAML_SAFE_LOADER)
     except OSError as e:
         raise BenchExecException(f"Cannot open task-definition file: {e}")
     except yaml.YAMLError as e:
@@ -143,6 +156,208 @@ def handle_files_from_task_definition(patterns, task_def_file):
     return result
 
 
+def _load_task_definition_file_or_error(task_def_file):
+    """Like load_task_definition_file(), but return a pair of result and error."""
+    try:
+        return load_task_definition_file(task_def_file), None
+    except BenchExecException as e:
+        return None, e
+
+
+class TaskDefinitionLoader(object):
+    """
+    Loads the task-definition files of a benchmark.
+    Each file is parsed at most once even if it is used in several run sets,
+    and many files are parsed in parallel.
+    If a cache file is given, parsed task definitions are additionally stored in it
+    and reused by later executions as long as the task-definition file
+    has the same size and modification time.
+    Results of expanding file-name patterns and of stat calls are also cached,
+    so the file system is assumed to not change while the benchmark is loaded.
+    """
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self._task_defs = {}  # file name -> (task definition, error)
+        self._patterns = {}  # (pattern, base dir) -> list of file names
+        self._task_def_files = {}  # (file name, key) -> list of file names
+        self._stats = {}  # file name -> os.stat_result or None
+        self._cache_key = [_TASK_DEF_CACHE_VERSION, __version__]
+        self._cache = {}  # absolute file name -> [size, mtime, task definition]
+        self._changed = False
+
+        if not cache_file:
+            return
+        try:
+            with open(cache_file, "rt") as f:
+                cache = json.load(f)
+            if cache.get("key") == self._cache_key:
+                self._cache = cache["task_definitions"]
+            else:
+                logging.debug("Task-definition cache '%s' is outdated.", cache_file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logging.debug(
+                "Could not read task-definition cache '%s': %s", cache_file, e
+            )
+
+    def _stat(self, filename):
+        try:
+            return self._stats[filename]
+        except KeyError:
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                stat = None
+            self._stats[filename] = stat
+            return stat
+
+    def samefile(self, file1, file2):
+        """Like os.path.samefile(), but with cached stat calls."""
+        stat1 = self._stat(file1)
+        stat2 = self._stat(file2)
+        if stat1 is None or stat2 is None:
+            # let os.path.samefile produce the appropriate error
+            return os.path.samefile(file1, file2)
+        return os.path.samestat(stat1, stat2)
+
+    def expand_filename_pattern(self, pattern, base_dir):
+        """Like util.expand_filename_pattern(), but cached."""
+        key = (pattern, base_dir)
+        files = self._patterns.get(key)
+        if files is None:
+            files = self._patterns[key] = util.expand_filename_pattern(
+                pattern, base_dir
+            )
+        return list(files)
+
+    def get_files(self, task_def_file, task_def, key):
+        """
+        Return the files for a key like input_files of the given task definition
+        like handle_files_from_task_definition(), but cached.
+        """
+        cache_key = (task_def_file, key)
+        files = self._task_def_files.get(cache_key)
+        if files is None:
+            files = self._task_def_files[cache_key] = handle_files_from_task_definition(
+                task_def.get(key), task_def_file
+            )
+        return list(files)
+
+    def load(self, task_def_file):
+        """
+        Return the content of a task-definition file like load_task_definition_file().
+        The result must not be modified.
+        """
+        if task_def_file not in self._task_defs:
+            self.preload([task_def_file])
+        task_def, error = self._task_defs[task_def_file]
+        if error:
+            raise error
+        return task_def
+
+    def preload(self, task_def_files):
+        """
+        Load all of the given task-definition files that are not yet loaded,
+        in parallel if there are many of them.
+        Errors are not raised here but only when load() is called for the file.
+        """
+        missing = []
+        for task_def_file in dict.fromkeys(task_def_files):
+            if task_def_file in self._task_defs:
+                continue
+            task_def = self._get_from_cache(task_def_file)
+            if task_def is None:
+                missing.append(task_def_file)
+            else:
+                self._task_defs[task_def_file] = (task_def, None)
+        if not missing:
+            return
+
+        worker_count = min(os.cpu_count() or 1, 16)
+        if len(missing) >= _PARALLEL_LOADING_THRESHOLD and worker_count > 1:
+            logging.debug(
+                "Loading %d task-definition files with %d processes.",
+                len(missing),
+                worker_count,
+            )
+            # like table-generator, do not fork because the tool-info module
+            # may already have started threads (e.g., for running in a container)
+            with concurrent.futures.ProcessPoolExecutor(
+                worker_count, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                results = list(
+                    executor.map(
+                        _load_task_definition_file_or_error,
+                        missing,
+                        chunksize=max(1, len(missing) // (4 * worker_count)),
+                    )
+                )
+        else:
+            results = map(_load_task_definition_file_or_error, missing)
+
+        for task_def_file, (task_def, error) in zip(missing, results):
+            self._task_defs[task_def_file] = (task_def, error)
+            if not error:
+                self._add_to_cache(task_def_file, task_def)
+
+    def _get_from_cache(self, task_def_file):
+        entry = self._cache.get(os.path.abspath(task_def_file))
+        if not entry:
+            return None
+        stat = self._stat(task_def_file)
+        if stat and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+        return None
+
+    def _add_to_cache(self, task_def_file, task_def):
+        stat = self._stat(task_def_file)
+        if not self.cache_file or not stat:
+            return
+        try:
+            # only store task definitions that survive conversion to JSON unchanged
+            if json.loads(json.dumps(task_def)) != task_def:
+                return
+        except (TypeError, ValueError):
+            return
+        self._cache[os.path.abspath(task_def_file)] = [
+            stat.st_size,
+            stat.st_mtime_ns,
+            task_def,
+        ]
+        self._changed = True
+
+    def store(self):
+        """Write the cache file if new task definitions were loaded."""
+        if not self._changed:
+            return
+        cache_dir = os.path.dirname(self.cache_file) or os.curdir
+        tmp_file = None
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(
+                prefix=os.path.basename(self.cache_file) + ".", dir=cache_dir
+            )
+            with open(fd, "wt") as f:
+                json.dump(
+                    {"key": self._cache_key, "task_definitions": self._cache},
+                    f,
+                    separators=(",", ":"),
+                )
+            os.replace(tmp_file, self.cache_file)
+            self._changed = False
+        except OSError as e:
+            logging.debug(
+                "Could not write task-definition cache '%s': %s", self.cache_file, e
+            )
+            if tmp_file:
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
+
+
 def load_tool_info(tool_name: str, config):
     """
     Load the tool-info class.
@@ -285,7 +500,7 @@ class Benchmark(object):
         tool_name = rootTag.get("tool")
         if not tool_name:
             sys.exit("A tool needs to be specified in the benchmark definition file.")
-        (self.tool_module, self.tool) = load_tool_info(tool_name, config)
+        self.tool_module, self.tool = load_tool_info(tool_name, config)
         self.tool_name = self.tool.name()
         # will be set from the outside if necessary (may not be the case in SaaS environments)
         self.tool_version = None
@@ -421,12 +636,21 @@ class Benchmark(object):
             # default is "everything below current directory"
             self.result_files_patterns = ["."]
 
+        # task definitions are shared by all run sets
+        cache_file = None
+        if not getattr(config, "no_task_cache", False):
+            cache_file = os.path.join(
+                os.path.dirname(config.output_path), TASK_DEF_CACHE_FILE
+            )
+        self.task_definitions = TaskDefinitionLoader(cache_file)
+
         # get benchmarks
         self.run_sets = []
         for i, rundefinitionTag in enumerate(rootTag.findall("rundefinition")):
             self.run_sets.append(
                 RunSet(rundefinitionTag, self, i + 1, globalSourcefilesTags)
             )
+        self.task_definitions.store()
 
         if not self.run_sets:
             logging.warning(
@@ -539,12 +763,22 @@ class RunSet(object):
                 f"Benchmark file {benchmark.benchmark_file} has unsupported old format. "
                 f"Rename <sourcefiles> tags to <tasks>."
             )
+        # runs are created lazily during execution only if this run set is executed
+        self.lazy_runs = bool(
+            getattr(benchmark.config, "stream_runs", False)
+            and self.should_be_executed()
+        )
+        self._lazy_blocks = [] if self.lazy_runs else None
         self.blocks = self.extract_runs_from_xml(
             globalSourcefilesTags + rundefinitionTag.findall("tasks"),
             required_files_pattern,
             self.real_name,
         )
         self.runs = [run for block in self.blocks for run in block.runs]
+        # for lazily created runs, this is only an upper bound until all are created
+        self.run_count = len(self.runs) + sum(
+            len(identifiers) for (_, identifiers, _) in self._lazy_blocks or []
+        )
 
         names = [self.real_name]
         if len(self.blocks) == 1:
@@ -560,18 +794,21 @@ class RunSet(object):
         # For 'cloud-mode' the logfile is overridden before reading it,
         # so the result will be wrong and every measured value will be missing.
         if self.should_be_executed():
-            sourcefilesSet = set()
-            for run in self.runs:
-                base = os.path.basename(run.identifier)
-                if base in sourcefilesSet:
-                    logging.warning(
-                        "Input file with name '%s' appears twice in run definition. "
-                        "This could cause problems with equal logfile-names.",
-                        base,
-                    )
-                else:
-                    sourcefilesSet.add(base)
-            del sourcefilesSet
+            self._check_log_file_names(self.get_run_identifiers())
+
+    @staticmethod
+    def _check_log_file_names(identifiers):
+        sourcefilesSet = set()
+        for identifier in identifiers:
+            base = os.path.basename(identifier)
+            if base in sourcefilesSet:
+                logging.warning(
+                    "Input file with name '%s' appears twice in run definition. "
+                    "This could cause problems with equal logfile-names.",
+                    base,
+                )
+            else:
+                sourcefilesSet.add(base)
 
     def should_be_executed(self):
         return not self.benchmark.config.selected_run_definitions or any(
@@ -579,6 +816,36 @@ class RunSet(object):
             for run_definition in self.benchmark.config.selected_run_definitions
         )
 
+    def get_run_identifiers(self):
+        """
+        Return the identifiers of all runs of this run set.
+        If runs are created lazily, this includes the identifiers of tasks
+        for which no run will be created (because the property does not match).
+        """
+        identifiers = [run.identifier for run in self.runs]
+        for _, block_identifiers, _ in self._lazy_blocks or []:
+            identifiers.extend(block_identifiers)
+        return identifiers
+
+    def create_runs(self):
+        """
+        Generate the runs of this run set in their order.
+        If runs are created lazily, each run is created only when it is requested
+        and then appended to the list of runs of this run set and of its block.
+        Tasks for which no run can be created are skipped with an error message.
+        """
+        yield from list(self.runs)
+        while self._lazy_blocks:
+            block, _, create_runs = self._lazy_blocks[0]
+            for run in create_runs():
+                block.runs.append(run)
+                self.runs.append(run)
+                yield run
+            self._lazy_blocks.pop(0)
+            # cache the task definitions that were loaded for this block
+            self.benchmark.task_definitions.store()
+        self.run_count = len(self.runs)
+
     def extract_runs_from_xml(
         self, sourcefilesTagList, global_required_files_pattern, rundef_name
     ):
@@ -605,6 +872,7 @@ class RunSet(object):
 
             # get lists of filenames
             task_def_files = self.get_task_def_files_from_xml(sourcefilesTag, base_dir)
+            without_files = [tag.text for tag in sourcefilesTag.findall("withoutfile")]
 
             # get file-specific options for filenames
             fileOptions = util.get_list_from_xml(sourcefilesTag)
@@ -614,46 +882,29 @@ class RunSet(object):
             # the first sourcefile is a normal 'include'-file, we use its name as identifier
             # for logfile and result-category all other files are 'append'ed.
             appendFileTags = sourcefilesTag.findall("append")
-
-            currentRuns = []
-            for identifier in task_def_files:
-                if identifier.endswith(".yml"):
-                    if appendFileTags:
-                        raise BenchExecException(
-                            "Cannot combine <append> and task-definition files in the same <tasks> tag."
-                        )
-                    run = self.create_run_from_task_definition(
-                        identifier,
-                        fileOptions,
-                        local_propertytag,
-                        required_files_pattern,
-                    )
-                else:
-                    run = self.create_run_for_input_file(
-                        identifier,
-                        fileOptions,
-                        local_propertytag,
-                        required_files_pattern,
-                        appendFileTags,
-                    )
-                if run:
-                    currentRuns.append(run)
-
-            # add runs for cases without source files
-            for run in sourcefilesTag.findall("withoutfile"):
-                currentRuns.append(
-                    Run(
-                        run.text,
-                        [],
-                        None,
-                        fileOptions,
-                        self,
-                        local_propertytag,
-                        required_files_pattern,
-                    )
+            if appendFileTags and any(f.endswith(".yml") for f in task_def_files):
+                raise BenchExecException(
+                    "Cannot combine <append> and task-definition files in the same <tasks> tag."
                 )
 
-            blocks.append(SourcefileSet(sourcefileSetName, index, currentRuns))
+            create_runs = functools.partial(
+                self._create_runs,
+                task_def_files,
+                without_files,
+                fileOptions,
+                local_propertytag,
+                required_files_pattern,
+                appendFileTags,
+            )
+
+            if self.lazy_runs:
+                block = SourcefileSet(sourcefileSetName, index, [])
+                self._lazy_blocks.append(
+                    (block, task_def_files + without_files, create_runs)
+                )
+            else:
+                block = SourcefileSet(sourcefileSetName, index, list(create_runs()))
+            blocks.append(block)
 
         if self.benchmark.config.selected_sourcefile_sets:
             for selected in self.benchmark.config.selected_sourcefile_sets:
@@ -669,6 +920,60 @@ class RunSet(object):
                     )
         return blocks
 
+    def _create_runs(
+        self,
+        task_def_files,
+        without_files,
+        fileOptions,
+        local_propertytag,
+        required_files_pattern,
+        appendFileTags,
+    ):
+        """Generate the runs for the tasks of one <tasks> tag."""
+        if not self.lazy_runs:
+            # lazily created runs load their task definition individually
+            self.benchmark.task_definitions.preload(
+                f for f in task_def_files if f.endswith(".yml")
+            )
+
+        for identifier in task_def_files:
+            try:
+                if identifier.endswith(".yml"):
+                    run = self.create_run_from_task_definition(
+                        identifier,
+                        fileOptions,
+                        local_propertytag,
+                        required_files_pattern,
+                    )
+                else:
+                    run = self.create_run_for_input_file(
+                        identifier,
+                        fileOptions,
+                        local_propertytag,
+                        required_files_pattern,
+                        appendFileTags,
+                    )
+            except BenchExecException as e:
+                if not self.lazy_runs:
+                    raise
+                # benchmark is already executing, so do not abort it
+                logging.error("Skipping task %s: %s", identifier, e)
+                continue
+            if run:
+                yield run
+
+        # add runs for cases without source files
+        for identifier in without_files:
+            yield Run(
+                identifier,
+                [],
+                None,
+                fileOptions,
+                self,
+                local_propertytag,
+                required_files_pattern,
+            )
+
     def get_task_def_files_from_xml(self, sourcefilesTag, base_dir):
         """Get the task-definition files from the XML definition. Task-definition files are files
         for which we create a run (typically an input file or a YAML task definition).
@@ -776,17 +1081,16 @@ class RunSet(object):
         self, task_def_file, options, local_propertytag, required_files_pattern
     ):
         """Create a Run from a task definition in yaml format"""
-        task_def = load_task_definition_file(task_def_file)
+        task_definitions = self.benchmark.task_definitions
+        task_def = task_definitions.load(task_def_file)
 
-        input_files = handle_files_from_task_definition(
-            task_def.get("input_files"), task_def_file
-        )
+        input_files = task_definitions.get_files(task_def_file, task_def, "input_files")
         if not input_files:
             raise BenchExecException(
                 f"Task-definition file {task_def_file} does not define any input files."
             )
-        required_files = handle_files_from_task_definition(
-            task_def.get("required_files"), task_def_file
+        required_files = task_definitions.get_files(
+            task_def_file, task_def, "required_files"
         )
 
         run = Run(
@@ -815,7 +1119,7 @@ class RunSet(object):
                     f"Missing property file for property "
                     f"in task-definition file {task_def_file}."
                 )
-            expanded = util.expand_filename_pattern(
+            expanded = task_definitions.expand_filename_pattern(
                 prop_dict["property_file"], os.path.dirname(task_def_file)
             )
             if len(expanded) != 1:
@@ -825,9 +1129,7 @@ class RunSet(object):
                     f"does not refer to exactly one file."
                 )
 
-            # TODO We could reduce I/O by checking absolute paths and using os.path.samestat
-            # with cached stat calls.
-            if prop.filename == expanded[0] or os.path.samefile(
+            if prop.filename == expanded[0] or task_definitions.samefile(
                 prop.filename, expanded[0]
             ):
                 expected_result = prop_dict.get("expected_verdict")
@@ -898,7 +1200,9 @@ class RunSet(object):
                 "Expanded variables in expression %r to %r.", pattern, expandedPattern
             )
 
-        fileList = util.expand_filename_pattern(expandedPattern, base_dir)
+        fileList = self.benchmark.task_definitions.expand_filename_pattern(
+            expandedPattern, base_dir
+        )
 
         # sort alphabetical,
         fileList.sort()
@@ -1057,6 +1361,28 @@ class Run(object):
         )
         return self._cmdline
 
+    @property
+    def samples_file(self):
+        """The file for the resource usage over time (cf. --sample-interval)."""
+        return self.log_file[: -len(".log")] + ".samples.csv"
+
+    def discard_details(self):
+        """
+        Drop all data of this run that are needed only for executing it
+        and for writing its result, in order to save memory.
+        Afterwards, only identifier, status, category, and values are available.
+        """
+        self.sourcefiles = None
+        self.required_files = None
+        self.task_options = None
+        self.specific_options = None
+        self.options = None
+        self.propertytag = None
+        self.properties = None
+        self.expected_results = None
+        self.columns = None
+        self._cmdline = None
+
     def set_result(self, values, visible_columns={}):
         """Set the result of this run.
         @param values: a dictionary with result values as returned by RunExecutor.execute_run(),
@@ -1065,6 +1391,7 @@ class Run(object):
             (i.e., not marked as hidden), apart from those that BenchExec shows by default anyway
         """
         exitcode = values.pop("exitcode", None)
+        output = values.pop("output", None)
         if exitcode is not None:
             if exitcode.signal:
                 self.values["@exitsignal"] = exitcode.signal
@@ -1087,43 +1414,70 @@ class Run(object):
 
         termination_reason = values.get("terminationreason")
 
-        # read output
-        try:
-            with open(self.log_file, "rt", errors="ignore") as outputFile:
-                output = outputFile.readlines()
-                # first 6 lines are for logging, rest is output of subprocess, see runexecutor.py for details
-                output = output[6:]
-        except OSError as e:
-            logging.warning("Cannot read log file: %s", e.strerror)
-            output = []
+        # read output if it was not already captured by the executor
+        if output is None:
+            try:
+                with open(self.log_file, "rt", errors="ignore") as outputFile:
+                    output = outputFile.readlines()
+                    # first 6 lines are for logging, rest is output of subprocess, see runexecutor.py for details
+                    output = output[6:]
+            except OSError as e:
+                logging.warning("Cannot read log file: %s", e.strerror)
+                output = []
         output = tooladapter.CURRENT_BASETOOL.RunOutput(output)
 
-        self.status = self._analyze_result(exitcode, output, termination_reason)
+        tool_status, column_values = self._analyze_output(
+            exitcode, output, termination_reason
+        )
+        self.status = self._get_status(exitcode, tool_status, termination_reason)
         self.category = result.get_result_category(
             self.expected_results, self.status, self.properties
         )
 
-        for column in self.columns:
-            substitutedColumnText = substitute_vars(
-                [column.text], self.runSet, self.sourcefiles[0]
-            )[0]
-            column.value = self.runSet.benchmark.tool.get_value_from_output(
-                output, substitutedColumnText
+        for column, value in zip(self.columns, column_values):
+            column.value = value
+
+    def _analyze_output(self, exitcode, output, termination_reason, columns=None):
+        """
+        Let the tool-info module determine the result of the run
+        and extract the values of the given columns (default: all) from the output.
+        @return the result of determine_result() (None if there is no exit code)
+            and the list of column values
+        """
+        tool = self.runSet.benchmark.tool
+        tool_run = None
+        if exitcode is not None:
+            logging.debug("My subprocess returned %s.", exitcode)
+            tool_run = tooladapter.CURRENT_BASETOOL.Run(
+                self._cmdline, exitcode, output, termination_reason
             )
+        identifiers = [
+            substitute_vars([column.text], self.runSet, self.sourcefiles[0])[0]
+            for column in (self.columns if columns is None else columns)
+        ]
+
+        # ContainerizedTool can do everything in a single call into its container.
+        # Its module is imported lazily by load_tool_info() only in container mode.
+        containerized_tool = sys.modules.get("benchexec.containerized_tool")
+        if containerized_tool and isinstance(
+            tool, containerized_tool.ContainerizedTool
+        ):
+            return tool.analyze_run(tool_run, output, identifiers)
+
+        tool_status = tool.determine_result(tool_run) if tool_run else None
+        values = [tool.get_value_from_output(output, i) for i in identifiers]
+        return tool_status, values
 
     def _analyze_result(self, exitcode, output, termination_reason):
         """Return status according to result and output of tool."""
+        tool_status, _ = self._analyze_output(
+            exitcode, output, termination_reason, columns=[]
+        )
+        return self._get_status(exitcode, tool_status, termination_reason)
 
-        # Ask tool info.
-        tool_status = None
+    def _get_status(self, exitcode, tool_status, termination_reason):
+        """Return status according to exit code and result of tool info."""
         if exitcode is not None:
-            logging.debug("My subprocess returned %s.", exitcode)
-            tool_status = self.runSet.benchmark.tool.determine_result(
-                tooladapter.CURRENT_BASETOOL.Run(
-                    self._cmdline, exitcode, output, termination_reason
-                )
-            )
-
             if tool_status in result.RESULT_LIST_OTHER:
                 # for unspecific results provide some more information if possible
                 if exitcode.signal == 6:
@@ -0,0 +1,136 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import locale
+import select
+import threading
+import time
+
+_READ_SIZE = 64 * 1024
+_POLL_INTERVAL_MS = 1000
+_STOP_TIMEOUT_SECONDS = 1
+
+# Same threshold as for shrinking log files written to disk
+_SIZE_TOLERANCE = 500
+
+
+class OutputCaptureThread(threading.Thread):
+    """
+    Thread that reads the output of a tool from a pipe
+    and keeps only the part of it in memory that would be retained
+    in the log file after shrinking it to a given size.
+
+    The output is cut in the same way as by util.shrink_text_file
+    (at line boundaries, keeping the first and the last max_size/2 bytes),
+    but at most 2*max_size+500 bytes are kept in memory while the tool runs.
+    The only difference is that if the line at the start of the removed part
+    is longer than max_size/2, it is cut in the middle instead of being kept
+    completely.
+    """
+
+    def __init__(self, read_fd, header, max_size):
+        """
+        @param read_fd: the read end of the pipe, will be closed by this thread
+        @param header: bytes that are retained as the start of the output
+        @param max_size: the size to which the output should be shrunk
+            (capturing output without limit would need unbounded memory)
+        """
+        super(OutputCaptureThread, self).__init__()
+        self.name = "OutputCaptureThread-" + self.name
+        self.daemon = True
+
+        assert max_size is not None and max_size >= 0
+        self._read_fd = read_fd
+        self._max_size = max_size
+        self._head = bytearray(header)  # first max_size bytes of the output
+        self._tail = bytearray()  # last max_size+500 bytes after the head
+        self._size = len(header)  # total size of output so far
+        self._deadline = None
+
+    def run(self):
+        with open(self._read_fd, "rb", buffering=0) as pipe:
+            poller = select.poll()
+            poller.register(pipe, select.POLLIN)
+            while True:
+                if self._deadline is not None and time.monotonic() > self._deadline:
+                    # Some process that escaped from the run still has the pipe open.
+                    break
+                if not poller.poll(_POLL_INTERVAL_MS):
+                    continue
+                data = pipe.read(_READ_SIZE)
+                if not data:
+                    break
+                self._add(data)
+
+    def _add(self, data):
+        self._size += len(data)
+        missing_head = self._max_size - len(self._head)
+        if missing_head > 0:
+            self._head += data[:missing_head]
+            data = data[missing_head:]
+        self._tail += data
+        excess = len(self._tail) - (self._max_size + _SIZE_TOLERANCE)
+        if excess > 0:
+            # efficient, bytearray does not copy when removing at the start
+            del self._tail[:excess]
+
+    def finish(self):
+        """
+        Wait until all output was read. This should be called
+        after the write end of the pipe was closed and the tool has terminated.
+        """
+        self._deadline = time.monotonic() + _STOP_TIMEOUT_SECONDS
+        self.join()
+
+    @property
+    def size(self):
+        """The size of the complete output (before shrinking)."""
+        return self._size
+
+    def _should_shrink(self):
+        return self._size >= self._max_size + _SIZE_TOLERANCE
+
+    def get_output(self, removal_marker=None):
+        """
+        Return the retained part of the output as bytes,
+        with the given marker at the place where lines were removed.
+        """
+        is_complete = self._size == len(self._head) + len(self._tail)
+        data = bytes(self._head + self._tail) if is_complete else None
+        if not self._should_shrink():
+            return data
+
+        marker = removal_marker.encode() if removal_marker else b""
+        max_size = self._max_size
+
+        prefix = data if is_complete else self._head
+        end_of_start = prefix.find(b"\n", max_size // 2) + 1
+        if is_complete and end_of_start in [0, len(data)]:
+            # like shrink_text_file, do not shrink if there is no further line
+            return data
+        elif not end_of_start:
+            end_of_start = max_size // 2
+
+        suffix = data if is_complete else self._tail
+        start_of_end = suffix.find(b"\n", len(suffix) + (-max_size // 2)) + 1
+        if not start_of_end:
+            start_of_end = len(suffix)
+        if is_complete and end_of_start + len(marker) > start_of_end:
+            return data
+
+        return bytes(prefix[:end_of_start]) + marker + bytes(suffix[start_of_end:])
+
+
+def decode_output_lines(output):
+    """
+    Return the lines of the given output (bytes)
+    like readlines() of the output file opened in text mode with errors="ignore".
+    """
+    text = output.decode(locale.getpreferredencoding(False), errors="ignore")
+    # StringIO splits lines in universal-newlines mode like text files
+    return io.StringIO(text, newline=None).readlines()
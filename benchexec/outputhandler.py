@@ -10,22 +10,21 @@ import bz2
 import collections
 import datetime
 import decimal
-import io
+import logging
 import os
 import threading
 import time
 import sys
 
-# Need to disable pytype for minidom due to https://github.com/google/pytype/issues/1130
-from xml.dom import minidom  # pytype: disable=pyi-error
 from xml.etree import ElementTree
-import zipfile
 
 import benchexec
 from benchexec.model import MEMLIMIT, TIMELIMIT, CORELIMIT
 from benchexec import filewriter
 from benchexec import intel_cpu_energy
+from benchexec import logarchive
 from benchexec import result
+from benchexec import resultxmlwriter
 from benchexec import util
 
 RESULT_XML_PUBLIC_ID = "+//IDN sosy-lab.org//DTD BenchExec result 3.0//EN"
@@ -82,6 +81,8 @@ class OutputHandler(object):
         self.all_created_files = set()
         self.benchmark = benchmark
         self.statistics = Statistics()
+        # run sets whose information is not yet completely written to the txt file
+        self.txt_run_sets = []
 
         version = self.benchmark.tool_version
 
@@ -116,10 +117,7 @@ class OutputHandler(object):
         self.xml_file_names = []
 
         if compress_results:
-            self.log_zip = zipfile.ZipFile(
-                benchmark.log_zip, mode="w", compression=zipfile.ZIP_DEFLATED
-            )
-            self.log_zip_lock = threading.Lock()
+            self.log_zip = logarchive.LogArchiveWriter(benchmark.log_zip)
             self.all_created_files.add(benchmark.log_zip)
 
     def store_system_info(
@@ -163,15 +161,13 @@ class OutputHandler(object):
 
         self.xml_header.append(systemInfo)
         if runSet:
-            # insert before <run> tags to conform with DTD
-            i = None
-            for i, elem in enumerate(runSet.xml):  # noqa: B007
-                if elem.tag == "run":
+            # insert before run-set <column> tags to conform with DTD
+            for i, elem in enumerate(runSet.xml):
+                if elem.tag == "column":
+                    runSet.xml.insert(i, systemInfo)
                     break
-            if i is None:
-                runSet.xml.append(systemInfo)
             else:
-                runSet.xml.insert(i, systemInfo)
+                runSet.xml.append(systemInfo)
 
     def set_error(self, msg, runSet=None):
         """
@@ -323,8 +319,9 @@ class OutputHandler(object):
         @param runSet: current run set
         """
         xml_file_name = self.get_filename(runSet.name, "xml")
+        runSet.xml_file_name = xml_file_name
 
-        identifier_names = [run.identifier for run in runSet.runs]
+        identifier_names = runSet.get_run_identifiers()
 
         # common prefix of file names
         runSet.common_prefix = util.common_base_dir(identifier_names)
@@ -340,7 +337,7 @@ class OutputHandler(object):
         )
 
         # write run set name to terminal
-        numberOfFiles = len(runSet.runs)
+        numberOfFiles = runSet.run_count
         numberOfFilesStr = (
             "     (1 file)" if numberOfFiles == 1 else f"     ({numberOfFiles} files)"
         )
@@ -355,51 +352,62 @@ class OutputHandler(object):
         self.writeRunSetInfoToLog(runSet)
 
         # prepare information for text output
+        # (lazily created runs are prepared by output_for_new_run())
         for run in runSet.runs:
-            run.resultline = self.format_sourcefile_name(run.identifier, runSet)
-
-            if run.sourcefiles:
-                adjusted_identifier = util.relative_path(run.identifier, xml_file_name)
-            else:
-                # If no source files exist the task doesn't point to any file that could be downloaded.
-                # In this case, the name doesn't have to be adjusted because it's no path.
-                adjusted_identifier = run.identifier
-
-            # prepare XML structure for each run and runSet
-            run.xml = ElementTree.Element("run", name=adjusted_identifier)
-            if run.sourcefiles:
-                adjusted_sourcefiles = (
-                    util.relative_path(s, xml_file_name) for s in run.sourcefiles
-                )
-                run.xml.set("files", "[" + ", ".join(adjusted_sourcefiles) + "]")
-            if run.specific_options:
-                run.xml.set("options", " ".join(run.specific_options))
-            if run.properties:
-                all_properties = (prop.name for prop in run.properties)
-                run.xml.set("properties", " ".join(sorted(all_properties)))
-            if len(run.properties) == 1:
-                prop = run.properties[0]
-                run.xml.set(
-                    "propertyFile", util.relative_path(prop.filename, xml_file_name)
-                )
-                expected_result = str(run.expected_results.get(prop.filename, ""))
-                if expected_result:
-                    run.xml.set("expectedVerdict", expected_result)
+            self.output_for_new_run(run)
 
         block_name = runSet.blocks[0].name if len(runSet.blocks) == 1 else None
-        runSet.xml = self.runs_to_xml(runSet, runSet.runs, block_name)
+        runSet.xml = self.run_set_header_to_xml(runSet, block_name)
         if start_time:
             runSet.xml.set("starttime", start_time.isoformat())
         elif not self.benchmark.config.start_time:
             runSet.xml.set("starttime", util.read_local_time().isoformat())
 
-        # write (empty) results to XML
-        runSet.xml_file_name = xml_file_name
-        self._write_rough_result_xml_to_file(runSet.xml, runSet.xml_file_name)
-        runSet.xml_file_last_modified_time = time.monotonic()
+        # write header of results to XML, results of runs are appended when available
+        runSet.xml_writer = resultxmlwriter.ResultXmlWriter(
+            xml_file_name, runSet.xml, RESULT_XML_PUBLIC_ID, RESULT_XML_SYSTEM_ID
+        )
         self.all_created_files.add(runSet.xml_file_name)
         self.xml_file_names.append(runSet.xml_file_name)
 
+    def output_for_new_run(self, run):
+        """
+        Prepare the text output and the XML structure of a run.
+        This is done for all existing runs of a run set in output_before_run_set(),
+        and needs to be called for runs that are created lazily afterwards.
+        """
+        runSet = run.runSet
+        xml_file_name = runSet.xml_file_name
+        run.resultline = self.format_sourcefile_name(run.identifier, runSet)
+
+        if run.sourcefiles:
+            adjusted_identifier = util.relative_path(run.identifier, xml_file_name)
+        else:
+            # If no source files exist the task doesn't point to any file that could be downloaded.
+            # In this case, the name doesn't have to be adjusted because it's no path.
+            adjusted_identifier = run.identifier
+
+        # prepare XML structure for each run and runSet
+        run.xml = ElementTree.Element("run", name=adjusted_identifier)
+        if run.sourcefiles:
+            adjusted_sourcefiles = (
+                util.relative_path(s, xml_file_name) for s in run.sourcefiles
+            )
+            run.xml.set("files", "[" + ", ".join(adjusted_sourcefiles) + "]")
+        if run.specific_options:
+            run.xml.set("options", " ".join(run.specific_options))
+        if run.properties:
+            all_properties = (prop.name for prop in run.properties)
+            run.xml.set("properties", " ".join(sorted(all_properties)))
+        if len(run.properties) == 1:
+            prop = run.properties[0]
+            run.xml.set(
+                "propertyFile", util.relative_path(prop.filename, xml_file_name)
+            )
+            expected_result = str(run.expected_results.get(prop.filename, ""))
+            if expected_result:
+                run.xml.set("expectedVerdict", expected_result)
+
     def output_for_skipping_run_set(self, runSet, reason=None):
         """
         This function writes a simple message to terminal and logfile,
@@ -423,7 +431,8 @@ class OutputHandler(object):
             f"skipped {reason or ''}".rstrip()
         )
         runSetInfo += "\n"
-        self.txt_file.append(runSetInfo)
+        with OutputHandler.print_lock:
+            self._add_run_set_to_txt_file(runSet, runSetInfo, final_text="")
 
     def writeRunSetInfoToLog(self, runSet):
         """
@@ -455,7 +464,44 @@ class OutputHandler(object):
         runSetInfo += titleLine + "\n" + runSet.simpleLine + "\n"
 
         # write into txt_file
-        self.txt_file.append(runSetInfo)
+        with OutputHandler.print_lock:
+            self._add_run_set_to_txt_file(runSet, runSetInfo)
+
+    def _add_run_set_to_txt_file(self, runSet, info, final_text=None):
+        """
+        Write the information about a run set into the txt_file.
+        If the execution of previous run sets is not yet finished
+        (which happens if run sets are executed overlapping),
+        the information is written only temporarily until they are finished.
+        Needs to be called while holding print_lock.
+        """
+        runSet.txt_info = info
+        runSet.txt_final_text = final_text
+        self.txt_run_sets.append(runSet)
+        if len(self.txt_run_sets) == 1:
+            self._flush_txt_file()
+        else:
+            self.txt_file.append(info, keep=False)
+
+    def _flush_txt_file(self):
+        """
+        Permanently write the information about all run sets to the txt_file
+        for which all previous run sets are finished.
+        Needs to be called while holding print_lock.
+        """
+        while self.txt_run_sets:
+            runSet = self.txt_run_sets[0]
+            if runSet.txt_info is not None:
+                self.txt_file.append(runSet.txt_info)
+                runSet.txt_info = None
+            if runSet.txt_final_text is None:
+                break  # still executed
+            self.txt_file.append(runSet.txt_final_text)
+            self.txt_run_sets.pop(0)
+
+        # temporary content was removed by writing permanent content, restore it
+        for runSet in self.txt_run_sets[1:]:
+            self.txt_file.append(runSet.txt_info, keep=False)
 
     def output_before_run(self, run):
         """
@@ -474,7 +520,7 @@ class OutputHandler(object):
                 runSet.started_runs = 1
 
             timeStr = time.strftime("%H:%M:%S", time.localtime()) + "   "
-            progressIndicator = f" ({runSet.started_runs}/{len(runSet.runs)})"
+            progressIndicator = f" ({runSet.started_runs}/{runSet.run_count})"
             terminalTitle = TERMINAL_TITLE.format(runSet.full_name + progressIndicator)
             if self.benchmark.num_of_threads == 1:
                 util.printOut(
@@ -529,6 +575,14 @@ class OutputHandler(object):
             run.columns,
         )
         self.add_values_to_run_xml(run)
+        has_samples = self.benchmark.config.sample_interval and os.path.isfile(
+            run.samples_file
+        )
+        if has_samples:
+            run.xml.set(
+                "samples",
+                util.relative_path(run.samples_file, run.runSet.xml_file_name),
+            )
 
         # output in terminal/console
         statusStr = COLOR_DIC[run.category].format(run.status.ljust(LEN_OF_STATUS))
@@ -551,14 +605,10 @@ class OutputHandler(object):
             self.txt_file.append(run.resultline + "\n", keep=False)
             self.statistics.add_result(run)
 
-            # we don't want to write this file to often, it can slow down the whole script,
-            # so we wait at least 10 seconds between two write-actions
-            currentTime = time.monotonic()
-            if currentTime - run.runSet.xml_file_last_modified_time > 60:
-                self._write_rough_result_xml_to_file(
-                    run.runSet.xml, run.runSet.xml_file_name
-                )
-                run.runSet.xml_file_last_modified_time = time.monotonic()
+            # The run is serialized only once and appended to the result file,
+            # afterwards we no longer need to keep its XML element in memory.
+            run.runSet.xml_writer.add_run(run, run.xml)
+            run.xml = None
 
         finally:
             OutputHandler.print_lock.release()
@@ -567,14 +617,28 @@ class OutputHandler(object):
             log_file_path = os.path.relpath(
                 run.log_file, os.path.join(self.benchmark.log_folder, os.pardir)
             )
-            with self.log_zip_lock:
-                self.log_zip.write(run.log_file, log_file_path)
+            # compresses the log in the current thread, so this can run in parallel
+            self.log_zip.write(run.log_file, log_file_path)
             os.remove(run.log_file)
+            if has_samples:
+                samples_file_path = os.path.relpath(
+                    run.samples_file, os.path.join(self.benchmark.log_folder, os.pardir)
+                )
+                self.log_zip.write(run.samples_file, samples_file_path)
+                os.remove(run.samples_file)
         else:
             self.all_created_files.add(run.log_file)
+            if has_samples:
+                self.all_created_files.add(run.samples_file)
 
         if os.path.isdir(run.result_files_folder):
             self.all_created_files.add(run.result_files_folder)
+        if os.path.isfile(run.result_files_folder + ".zip"):
+            self.all_created_files.add(run.result_files_folder + ".zip")
+
+        if run.runSet.lazy_runs:
+            # the run is kept only for writing the final result files
+            run.discard_details()
 
     def output_after_run_set(
         self, runSet, cputime=None, walltime=None, energy={}, cache={}, end_time=None
@@ -593,18 +657,28 @@ class OutputHandler(object):
 
         # Write results to files. This overwrites the intermediate files written
         # from output_after_run with the proper results.
-        self._write_pretty_result_xml_to_file(runSet.xml, runSet.xml_file_name)
+        self._write_pretty_result_xml_to_file(
+            runSet.xml, runSet.runs, runSet.xml_writer, runSet.xml_file_name
+        )
 
         if len(runSet.blocks) > 1:
             for block in runSet.blocks:
                 blockFileName = self.get_filename(runSet.name, block.name + ".xml")
-                block_xml = self.runs_to_xml(runSet, block.runs, block.name)
+                block_xml = self.run_set_header_to_xml(runSet, block.name)
                 block_xml.set("starttime", runSet.xml.get("starttime"))
                 if runSet.xml.get("endtime"):
                     block_xml.set("endtime", runSet.xml.get("endtime"))
-                self._write_pretty_result_xml_to_file(block_xml, blockFileName)
+                self._write_pretty_result_xml_to_file(
+                    block_xml, block.runs, runSet.xml_writer, blockFileName
+                )
 
-        self.txt_file.append(self.run_set_to_text(runSet, cputime, walltime, energy))
+        runSet.xml_writer.close()
+
+        with OutputHandler.print_lock:
+            runSet.txt_final_text = self.run_set_to_text(
+                runSet, cputime, walltime, energy
+            )
+            self._flush_txt_file()
 
     def run_set_to_text(self, runSet, cputime=0, walltime=0, energy={}):
         lines = []
@@ -633,9 +707,10 @@ class OutputHandler(object):
 
         return "\n".join(lines) + "\n"
 
-    def runs_to_xml(self, runSet, runs, blockname=None):
+    def run_set_header_to_xml(self, runSet, blockname=None):
         """
-        This function creates the XML structure for a list of runs
+        This function creates the XML structure for the result of a run set
+        (or one of its blocks) without the runs
         """
         # copy benchmarkinfo, limits, columntitles, systeminfo from xml_header
         runsElem = util.copy_of_xml_element(self.xml_header)
@@ -649,10 +724,6 @@ class OutputHandler(object):
         elif runSet.real_name:
             runsElem.set("name", runSet.real_name)
 
-        # collect XMLelements from all runs
-        for run in runs:
-            runsElem.append(run.xml)
-
         return runsElem
 
     def add_values_to_run_xml(self, run):
@@ -728,6 +799,13 @@ class OutputHandler(object):
                 value_suffix = "B/s"
             elif title.startswith("pressure-") and title.endswith("-some"):
                 value_suffix = "s"
+            elif title in [
+                "setuptime",
+                "measurementtime",
+                "samplingtime",
+                "timelimit-overshoot",
+            ]:
+                value_suffix = "s"
 
         value = f"{value}{value_suffix}"
 
@@ -837,14 +915,20 @@ class OutputHandler(object):
         self.txt_file.close()
 
         if self.compress_results:
-            with self.log_zip_lock:
-                zip_is_empty = not self.log_zip.namelist()
-                self.log_zip.close()
-
-                if zip_is_empty:
-                    # remove useless ZIP file, e.g., because all runs were skipped
-                    os.remove(self.benchmark.log_zip)
-                    self.all_created_files.remove(self.benchmark.log_zip)
+            self.log_zip.close()
+            count, avg_time, max_time, avg_wait_time = self.log_zip.get_statistics()
+            if count:
+                logging.info(
+                    "Archiving a log file took %.1fms on average and %.1fms at most "
+                    "(%.1fms on average were spent waiting for other runs).",
+                    avg_time * 1000,
+                    max_time * 1000,
+                    avg_wait_time * 1000,
+                )
+            else:
+                # remove useless ZIP file, e.g., because all runs were skipped
+                os.remove(self.benchmark.log_zip)
+                self.all_created_files.remove(self.benchmark.log_zip)
 
         # remove useless log folder if it is empty,
         # e.g., because all logs were written to the ZIP file
@@ -874,24 +958,11 @@ class OutputHandler(object):
             fileName = fileName[len(runSet.common_prefix) :]
         return fileName.ljust(runSet.max_length_of_filename + 4)
 
-    def _write_rough_result_xml_to_file(self, xml, filename):
-        """Write a rough string version of the XML (for temporary files)."""
-        # Write content to temp file first
-        error = xml.get("error", None)
-        xml.set("error", "incomplete")  # Mark result file as incomplete
-        temp_filename = filename + ".tmp"
-        with open(temp_filename, "wb") as file:
-            ElementTree.ElementTree(xml).write(
-                file, encoding="utf-8", xml_declaration=True
-            )
-        os.replace(temp_filename, filename)
-        if error is not None:
-            xml.set("error", error)
-        else:
-            del xml.attrib["error"]
-
-    def _write_pretty_result_xml_to_file(self, xml, filename):
-        """Writes a nicely formatted XML file with DOCTYPE, and compressed if necessary."""
+    def _write_pretty_result_xml_to_file(self, xml, runs, xml_writer, filename):
+        """
+        Writes a nicely formatted XML file with DOCTYPE, and compressed if necessary.
+        The runs are taken from the given ResultXmlWriter as far as they are finished.
+        """
         if self.compress_results:
             actual_filename = filename + ".bz2"
             open_func = bz2.BZ2File
@@ -901,18 +972,8 @@ class OutputHandler(object):
             actual_filename = filename + ".tmp"
             open_func = open
 
-        with io.TextIOWrapper(
-            open_func(actual_filename, "wb"), encoding="utf-8"
-        ) as file:
-            rough_string = ElementTree.tostring(xml, encoding="unicode")
-            reparsed = minidom.parseString(rough_string)
-            doctype = minidom.DOMImplementation().createDocumentType(
-                "result", RESULT_XML_PUBLIC_ID, RESULT_XML_SYSTEM_ID
-            )
-            reparsed.insertBefore(doctype, reparsed.documentElement)
-            reparsed.writexml(
-                file, indent="", addindent="  ", newl="\n", encoding="utf-8"
-            )
+        with open_func(actual_filename, "wb") as file:
+            xml_writer.write_final_result(file, xml, runs)
 
         if self.compress_results:
             # try to delete uncompressed file (would have been overwritten in no-compress-mode)
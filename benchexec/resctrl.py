@@ -0,0 +1,241 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains the ResctrlMonitor class, which monitors L3-cache occupancy
+and memory bandwidth of runs with the resctrl file system of Linux
+(cf. https://docs.kernel.org/arch/x86/resctrl.html).
+"""
+
+import logging
+import os
+import threading
+import time
+
+from benchexec import util
+
+# events of resctrl and their names in the run results (like those of pqos_wrapper)
+_EVENTS = {
+    "llc_occupancy": "llc",
+    "mbm_local_bytes": "mbm_local",
+    "mbm_total_bytes": "mbm_total",
+}
+_OCCUPANCY_EVENTS = {"llc_occupancy"}
+
+_SAMPLING_INTERVAL = 0.5  # seconds
+# bandwidth over shorter intervals (at the end of a run) is too imprecise for maxima
+_MIN_RATE_INTERVAL = 0.1  # seconds
+
+
+def find_resctrl_mount():
+    """Return the mount point of the resctrl file system, or None."""
+    try:
+        with open("/proc/mounts") as mounts:
+            for mount in mounts:
+                mount = mount.split(" ")
+                if mount[2] == "resctrl":
+                    return mount[1]
+    except OSError:
+        logging.exception("Cannot read /proc/mounts")
+    return None
+
+
+class _RunStatistics(object):
+    """The statistics of the events of one monitoring group during one run."""
+
+    def __init__(self, now, values):
+        self.start_time = now
+        self.start_values = values
+        self.last_time = now
+        self.last_values = values
+        self.occupancy_sums = {}
+        self.occupancy_counts = {}
+        self.maxima = {}
+
+    def add_sample(self, now, values):
+        elapsed = now - self.last_time
+        for event, value in values.items():
+            if event in _OCCUPANCY_EVENTS:
+                self.occupancy_sums[event] = self.occupancy_sums.get(event, 0) + value
+                self.occupancy_counts[event] = self.occupancy_counts.get(event, 0) + 1
+            elif event in self.last_values and elapsed >= _MIN_RATE_INTERVAL:
+                value = (value - self.last_values[event]) / elapsed
+            else:
+                continue
+            self.maxima[event] = max(self.maxima.get(event, value), value)
+        self.last_time = now
+        self.last_values = values
+
+    def get_result(self):
+        result = {}
+        elapsed = self.last_time - self.start_time
+        for event, name in _EVENTS.items():
+            if event in self.occupancy_counts:
+                average = self.occupancy_sums[event] / self.occupancy_counts[event]
+            elif (
+                event in self.last_values and event in self.start_values and elapsed > 0
+            ):
+                # average bandwidth from the counters at start and end of the run
+                average = (self.last_values[event] - self.start_values[event]) / elapsed
+            else:
+                continue
+            result[name + "_avg"] = int(average)
+            result[name + "_max"] = int(self.maxima.get(event, average))
+        return result
+
+
+class _MonitoringGroup(object):
+    """A monitoring group of resctrl for one set of cores."""
+
+    def __init__(self, path, cores, domains, events):
+        self.path = path
+        self.cores = cores
+        self.files = [
+            (
+                event,
+                [os.path.join(path, "mon_data", domain, event) for domain in domains],
+            )
+            for event in events
+        ]
+        self.run = None  # statistics of the current run
+
+    def read(self):
+        """Read the current values of all events, summed over all L3 domains."""
+        values = {}
+        for event, files in self.files:
+            value = 0
+            try:
+                for file in files:
+                    with open(file, "rb") as f:
+                        value += int(f.read())
+            except (OSError, ValueError):
+                # value can be "Unavailable" or "Error"
+                continue
+            values[event] = value
+        return values
+
+
+class ResctrlMonitor(object):
+    """
+    Monitors L3-cache occupancy and memory bandwidth for the sets of cores of all
+    parallel runs of a benchmark.
+    For each set of cores, one monitoring group of resctrl
+    (for which the kernel reserves an RMID) is created for the whole benchmark,
+    and a single thread samples the counters of all groups periodically.
+    Monitoring a run thus only needs to read the counters at its start and end,
+    instead of starting a pqos_wrapper process for each run.
+    """
+
+    def __init__(self, resctrl_dir, core_sets, interval=_SAMPLING_INTERVAL):
+        """
+        Create the monitoring groups and start the sampling thread.
+        @param resctrl_dir: the mount point of resctrl
+        @param core_sets: the list of cores for each parallel run
+        """
+        features = util.read_file(resctrl_dir, "info", "L3_MON", "mon_features")
+        events = [event for event in _EVENTS if event in features.split()]
+        if not events:
+            raise OSError(f"No supported events in {resctrl_dir}")
+        domains = sorted(
+            domain
+            for domain in os.listdir(os.path.join(resctrl_dir, "mon_data"))
+            if domain.startswith("mon_L3_")
+        )
+
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._groups = {}  # tuple of cores -> _MonitoringGroup
+        try:
+            for i, cores in enumerate(core_sets):
+                path = os.path.join(
+                    resctrl_dir, "mon_groups", f"benchexec_{os.getpid()}_{i}"
+                )
+                os.makedirs(path, exist_ok=True)
+                self._groups[tuple(cores)] = _MonitoringGroup(
+                    path, cores, domains, events
+                )
+                util.write_file(",".join(map(str, cores)), path, "cpus_list")
+        except OSError:
+            self._remove_groups()
+            raise
+
+        self._thread = threading.Thread(
+            target=self._sample_periodically, name="ResctrlMonitor", daemon=True
+        )
+        self._thread.start()
+        logging.debug(
+            "Monitoring %s for %d sets of cores with resctrl.",
+            ", ".join(events),
+            len(self._groups),
+        )
+
+    @classmethod
+    def create_if_supported(cls, core_sets):
+        """Return a ResctrlMonitor for the given sets of cores, or None."""
+        resctrl_dir = find_resctrl_mount()
+        if not resctrl_dir:
+            logging.debug(
+                "Cache and memory-bandwidth monitoring with resctrl not available "
+                "because resctrl is not mounted."
+            )
+            return None
+        try:
+            return cls(resctrl_dir, core_sets)
+        except OSError as e:
+            logging.debug(
+                "Cache and memory-bandwidth monitoring with resctrl not available: %s",
+                e,
+            )
+            return None
+
+    def _sample_periodically(self):
+        while not self._stopped.wait(self._interval):
+            self._sample()
+
+    def _sample(self):
+        with self._lock:
+            now = time.monotonic()
+            for group in self._groups.values():
+                if group.run:
+                    group.run.add_sample(now, group.read())
+
+    def start_run(self, cores):
+        """Start monitoring a run that uses the given set of cores."""
+        group = self._groups[tuple(cores)]
+        with self._lock:
+            group.run = _RunStatistics(time.monotonic(), group.read())
+
+    def stop_run(self, cores):
+        """
+        Stop monitoring the run that uses the given set of cores
+        and return its results as a dict like Pqos.stop_monitoring().
+        """
+        group = self._groups[tuple(cores)]
+        with self._lock:
+            run = group.run
+            group.run = None
+            if not run:
+                return {}
+            run.add_sample(time.monotonic(), group.read())
+        return run.get_result()
+
+    def close(self):
+        """Stop the sampling thread and remove the monitoring groups."""
+        self._stopped.set()
+        self._thread.join()
+        self._remove_groups()
+
+    def _remove_groups(self):
+        for group in self._groups.values():
+            try:
+                os.rmdir(group.path)
+            except OSError as e:
+                logging.warning(
+                    "Could not remove resctrl monitoring group %s: %s", group.path, e
+                )
+        self._groups = {}
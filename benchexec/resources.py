@@ -50,9 +50,11 @@ def get_cpu_cores_per_run(
     The list of available cores is read from the cgroup file system,
     such that the assigned cores are a subset of the cores
     that the current process is allowed to use.
-    This script does currently not support situations
-    where the available cores are asymmetrically split over CPUs,
-    e.g. 3 cores on one CPU and 5 on another.
+    If the available cores are asymmetrically split over CPUs
+    (e.g. 3 cores on one CPU and 5 on another), if the machine has different kinds
+    of cores (e.g., performance and efficiency cores), or if a CPU/memory region
+    has several L3 caches, the assignment is computed by
+    _get_cpu_cores_per_run_topology() instead.
 
     @param coreLimit: the number of cores for each run
     @param num_of_threads: the number of parallel benchmark executions
@@ -116,15 +118,325 @@ def get_cpu_cores_per_run(
             )
             siblings_of_core[core] = siblings
         logging.debug("Siblings of cores are %s.", siblings_of_core)
+
+        topology = _get_cpu_topology(allCpus, siblings_of_core)
+        logging.debug("Topology of cores is %s.", topology)
     except ValueError as e:
         sys.exit(f"Could not read CPU information from kernel: {e}")
-    return _get_cpu_cores_per_run0(
-        coreLimit,
-        num_of_threads,
-        use_hyperthreading,
-        allCpus,
-        cores_of_unit,
-        siblings_of_core,
+
+    if _is_symmetric_topology(
+        use_hyperthreading, cores_of_unit, siblings_of_core, topology
+    ):
+        result = _get_cpu_cores_per_run0(
+            coreLimit,
+            num_of_threads,
+            use_hyperthreading,
+            allCpus,
+            cores_of_unit,
+            siblings_of_core,
+        )
+    else:
+        logging.debug(
+            "Machine architecture is asymmetric or has several L3 caches "
+            "per CPU/memory region, using topology-aware core assignment."
+        )
+        result = _get_cpu_cores_per_run_topology(
+            coreLimit, num_of_threads, use_hyperthreading, topology
+        )
+    _log_core_assignment(result, topology)
+    return result
+
+
+_CpuTopology = collections.namedtuple(
+    "CpuTopology", ["package", "node", "l3", "core", "cpu_class"]
+)
+"""
+Position of a virtual core in the topology of the machine: its physical package,
+NUMA node, and L3 cache (None if unknown), the physical core (identified by the
+lowest sibling), and the class of the core (higher numbers are faster cores).
+Prefixes of this tuple identify the domains in which runs share resources.
+"""
+
+# Weights for how much runs interfere if they share a domain of the topology,
+# given as length of the prefix of _CpuTopology that identifies the domain.
+_INTERFERENCE_WEIGHTS = [
+    (4, "physical cores", 1),
+    (3, "L3 caches", 0.5),
+    (2, "NUMA nodes", 0.25),
+]
+
+
+def _get_cpu_topology(cpus, siblings_of_core):
+    """
+    Read the topology of the given cores from the kernel.
+    @return a mapping from each core to its _CpuTopology
+    """
+    # Intel CPUs with performance and efficiency cores list the former here.
+    performance_cores = util.try_read_file("/sys/devices/cpu_core/cpus")
+    if performance_cores is not None:
+        performance_cores = set(util.parse_int_list(performance_cores))
+
+    topology = {}
+    for cpu in cpus:
+        cpu_dir = f"/sys/devices/system/cpu/cpu{cpu}/"
+        memory_regions = _get_memory_banks_listed_in_dir(cpu_dir)
+        if performance_cores is not None:
+            cpu_class = int(cpu in performance_cores)
+        else:
+            # relative performance of cores on ARM and recent x86 kernels
+            cpu_class = int(util.try_read_file(cpu_dir, "cpu_capacity") or 0)
+        topology[cpu] = _CpuTopology(
+            package=get_cpu_package_for_core(cpu),
+            node=memory_regions[0] if memory_regions else None,
+            l3=_get_l3_cache_of_core(cpu),
+            core=min(siblings_of_core[cpu]),
+            cpu_class=cpu_class,
+        )
+
+    # Use information about NUMA nodes and L3 caches only if present for all cores.
+    for field in ["node", "l3"]:
+        if any(getattr(position, field) is None for position in topology.values()):
+            topology = {
+                cpu: position._replace(**{field: None})
+                for cpu, position in topology.items()
+            }
+    return topology
+
+
+def _get_l3_cache_of_core(core):
+    """Get the lowest core that shares the L3 cache with the given core, if known."""
+    cache_dir = f"/sys/devices/system/cpu/cpu{core}/cache/"
+    try:
+        entries = sorted(os.listdir(cache_dir))
+    except OSError:
+        return None
+    for entry in entries:
+        if entry.startswith("index") and (
+            util.try_read_file(cache_dir, entry, "level") == "3"
+        ):
+            shared_cores = util.try_read_file(cache_dir, entry, "shared_cpu_list")
+            if shared_cores:
+                return min(util.parse_int_list(shared_cores))
+    return None
+
+
+def _is_symmetric_topology(
+    use_hyperthreading, cores_of_unit, siblings_of_core, topology
+):
+    """
+    Check whether _get_cpu_cores_per_run0 can handle the machine:
+    all cores need to be of the same class, all CPUs/memory regions need to have
+    the same number of cores and only one L3 cache, and if hyper-threading is used,
+    all cores need to have the same number of siblings, which need to be available.
+    """
+    if len({position.cpu_class for position in topology.values()}) > 1:
+        return False
+    if use_hyperthreading:
+        if len({len(siblings_of_core[core]) for core in topology}) > 1:
+            return False
+        if any(not topology.keys() >= set(siblings_of_core[core]) for core in topology):
+            return False
+        unit_sizes = {len(cores) for cores in cores_of_unit.values()}
+    else:
+        unit_sizes = {
+            len({topology[core].core for core in cores})
+            for cores in cores_of_unit.values()
+        }
+    if len(unit_sizes) > 1:
+        return False
+    return all(
+        len({topology[core][:3] for core in cores}) == 1
+        for cores in cores_of_unit.values()
+    )
+
+
+def _get_cpu_cores_per_run_topology(
+    coreLimit, num_of_threads, use_hyperthreading, topology
+):
+    """
+    Calculate an assignment of the available CPU cores to a number
+    of parallel benchmark executions like get_cpu_cores_per_run,
+    but based on the full topology of the machine, which may be asymmetric.
+    Each run gets cores that share one L3 cache if possible,
+    otherwise one NUMA node or one CPU, and runs are distributed such that
+    as few runs as possible share the same L3 caches, NUMA nodes, and CPUs.
+    All runs get cores of the same (fastest) class and do not share physical cores
+    if possible, otherwise a warning is logged.
+
+    @param topology: a mapping from each available core to its _CpuTopology
+    @return a list of lists, where each inner list contains the cores for one run
+    """
+    coreCount = len(topology)
+    if coreLimit > coreCount:
+        sys.exit(
+            f"Cannot run benchmarks with {coreLimit} CPU cores, "
+            f"only {coreCount} CPU cores available."
+        )
+    if coreLimit * num_of_threads > coreCount:
+        sys.exit(
+            f"Cannot run {num_of_threads} benchmarks in parallel "
+            f"with {coreLimit} CPU cores each, only {coreCount} CPU cores available. "
+            f"Please reduce the number of threads to {coreCount // coreLimit}."
+        )
+
+    # usable virtual cores of each physical core
+    physical_cores = collections.defaultdict(list)
+    for core, position in sorted(topology.items()):
+        physical_cores[position].append(core)
+    if not use_hyperthreading:
+        physical_cores = {
+            position: cores[:1] for position, cores in physical_cores.items()
+        }
+
+    cpu_classes = sorted({position.cpu_class for position in topology.values()})
+    for class_count in range(1, len(cpu_classes) + 1):
+        usable_classes = cpu_classes[-class_count:]
+        usable_cores = {
+            position: cores
+            for position, cores in physical_cores.items()
+            if position.cpu_class in usable_classes
+        }
+        for share_physical_cores in [False, True]:
+            result = _assign_cores_to_runs(
+                coreLimit, num_of_threads, usable_cores, share_physical_cores
+            )
+            if result:
+                if class_count > 1:
+                    logging.warning(
+                        "There are not enough cores of the fastest kind for all runs, "
+                        "so some runs use slower cores, "
+                        "which makes benchmarking unreliable."
+                    )
+                if share_physical_cores:
+                    logging.warning(
+                        "The number of threads is too high and hyper-threading "
+                        "sibling cores need to be split among different runs, "
+                        "which makes benchmarking unreliable. "
+                        "Please reduce the number of threads."
+                    )
+                logging.debug("Final core assignment: %s.", result)
+                return result
+
+    sys.exit(
+        f"Cannot run {num_of_threads} benchmarks in parallel "
+        f"with {coreLimit} CPU cores each on the available CPU cores. "
+        f"Please reduce the number of threads."
+    )
+
+
+def _assign_cores_to_runs(
+    coreLimit, num_of_threads, physical_cores, share_physical_cores
+):
+    """
+    Greedily assign cores to runs for _get_cpu_cores_per_run_topology.
+    @param physical_cores: a mapping from the _CpuTopology of each usable physical core
+        to its usable virtual cores
+    @param share_physical_cores: whether unused virtual cores of a physical core
+        may be assigned to other runs
+    @return a list of lists with the cores for each run, or None if not possible
+    """
+    free_cores = dict(physical_cores)
+    runs_in_domain = collections.Counter()  # prefix of _CpuTopology -> number of runs
+    result = []
+    for _ in range(num_of_threads):
+        # number of free cores per L3 cache, NUMA node, CPU, and whole machine
+        free_cores_in_domain = collections.Counter()
+        for position, cores in free_cores.items():
+            for level in range(4):
+                free_cores_in_domain[position[:level]] += len(cores)
+
+        # find the smallest kind of domain that can hold the run
+        for level in [3, 2, 1, 0]:
+            candidates = [
+                domain
+                for domain, count in free_cores_in_domain.items()
+                if len(domain) == level and count >= coreLimit
+            ]
+            if candidates:
+                break
+        else:
+            return None
+
+        # prefer domains that are shared with few other runs, and then large domains
+        domain = min(
+            candidates,
+            key=lambda domain: (
+                [runs_in_domain[domain[:i]] for i in range(level, 0, -1)],
+                -free_cores_in_domain[domain],
+                domain,
+            ),
+        )
+        # Avoid physical cores that are used by other runs,
+        # and if the run needs several L3 caches, use as few as possible.
+        positions = sorted(
+            (position for position in free_cores if position[:level] == domain),
+            key=lambda position: (
+                runs_in_domain[position[:4]],
+                -free_cores_in_domain[position[:3]],
+                position,
+            ),
+        )
+
+        cores = []
+        used_domains = set()
+        for position in positions:
+            available_cores = free_cores.pop(position)
+            needed = coreLimit - len(cores)
+            cores.extend(available_cores[:needed])
+            if share_physical_cores and len(available_cores) > needed:
+                free_cores[position] = available_cores[needed:]
+            used_domains.update(position[:i] for i in range(1, 5))
+            if len(cores) == coreLimit:
+                break
+        assert len(cores) == coreLimit
+        runs_in_domain.update(used_domains)
+        result.append(sorted(cores))
+    return result
+
+
+def _log_core_assignment(assignment, topology):
+    """
+    Log which runs use which L3 caches, NUMA nodes, and CPUs,
+    and a predicted score for how much the runs interfere with each other.
+    """
+    runs_of_l3 = collections.defaultdict(list)
+    for run, cores in enumerate(assignment, start=1):
+        cores_per_l3 = collections.defaultdict(list)
+        for core in cores:
+            cores_per_l3[topology[core][:3]].append(core)
+        for l3, cores_of_l3 in cores_per_l3.items():
+            runs_of_l3[l3].append(
+                f"run {run} (cores {','.join(map(str, sorted(cores_of_l3)))})"
+            )
+    for (package, node, l3), runs in sorted(
+        runs_of_l3.items(), key=lambda item: str(item[0])
+    ):
+        logging.info(
+            "CPU %s, NUMA node %s, L3 cache %s: %s",
+            package,
+            "unknown" if node is None else node,
+            "unknown" if l3 is None else l3,
+            ", ".join(runs),
+        )
+
+    score = 0
+    for level, _name, weight in _INTERFERENCE_WEIGHTS:
+        runs_of_domain = collections.defaultdict(set)
+        for run, cores in enumerate(assignment):
+            for core in cores:
+                domain = topology[core][:level]
+                if None not in domain:
+                    runs_of_domain[domain].add(run)
+        # each run counts the other runs with which it shares a domain
+        score += weight * sum(
+            len(runs) * (len(runs) - 1) for runs in runs_of_domain.values()
+        )
+    logging.info(
+        "Predicted interference of parallel runs: %.2f "
+        "(average number of other runs sharing %s, weighted with %s).",
+        score / len(assignment),
+        "/".join(name for _level, name, _weight in _INTERFERENCE_WEIGHTS),
+        "/".join(str(weight) for _level, _name, weight in _INTERFERENCE_WEIGHTS),
     )
 
 
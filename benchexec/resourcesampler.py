@@ -0,0 +1,119 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Recording of the resource usage of a run over time.
+
+A ResourceSampler is a check for the LimitSupervisor (the same thread that
+enforces the time limits of all runs), which periodically reads the current
+resource usage from the cgroup of a run and appends it to a CSV file.
+"""
+
+import decimal
+import logging
+import time
+
+from benchexec import limitsupervisor
+from benchexec import util
+
+# Fraction of the wall time of a run that may be spent on sampling.
+# If sampling takes longer, the interval is increased.
+MAX_OVERHEAD = 0.01
+
+# After this many samples, the interval is doubled
+# such that the size of the file stays reasonable also for long runs.
+SAMPLES_PER_INTERVAL_DOUBLING = 10000
+
+# Name of the column with the time of each sample
+TIME_COLUMN = "walltime"
+
+
+def _format_value(value):
+    if value is None:
+        return ""
+    elif isinstance(value, float):
+        return f"{value:.6f}"
+    elif isinstance(value, decimal.Decimal):
+        return util.print_decimal(value)
+    return str(value)
+
+
+class ResourceSampler(object):
+    """
+    Check that records the resource usage of a cgroup (as returned by
+    Cgroups.read_current_usage()) in the given interval into a CSV file.
+    The first column is the wall time since the start of the sampling
+    and the remaining columns use the same names as the results of the run.
+    After cancel() was called, the attribute "sampling_time" contains the
+    total time in seconds that was spent on taking samples.
+    """
+
+    def __init__(self, cgroups, filename, interval, supervisor=None):
+        assert interval > 0
+        self.cgroups = cgroups
+        self.filename = filename
+        self.interval = interval
+        self.sample_count = 0
+        self.sampling_time = 0
+        self._columns = None
+        self._next_interval_doubling = SAMPLES_PER_INTERVAL_DOUBLING
+        self._file = open(filename, "w")
+        self._start_time = time.monotonic()
+        self._due_time = None
+        self._supervisor = supervisor or limitsupervisor.get_shared_supervisor()
+        self._supervisor.add(self)
+
+    def __str__(self):
+        return f"resource sampling into {self.filename}"
+
+    def _sample(self, now):
+        sampling_start = time.monotonic()
+        try:
+            usage = self.cgroups.read_current_usage()
+        except (OSError, ValueError) as e:
+            # cgroup might vanish at the end of the run
+            logging.debug("Could not sample resource usage: %s", e)
+        else:
+            if self._columns is None:
+                # values that are not available at all are omitted
+                self._columns = [k for k, v in usage.items() if v is not None]
+                self._file.write(",".join([TIME_COLUMN] + self._columns) + "\n")
+            values = [now - self._start_time]
+            values.extend(usage.get(column) for column in self._columns)
+            self._file.write(",".join(map(_format_value, values)) + "\n")
+            self.sample_count += 1
+        self.sampling_time += time.monotonic() - sampling_start
+
+    def check(self, now):
+        self._sample(now)
+        if self.sample_count >= self._next_interval_doubling:
+            self.interval *= 2
+            self._next_interval_doubling += SAMPLES_PER_INTERVAL_DOUBLING
+        while self.sampling_time > MAX_OVERHEAD * (
+            now - self._start_time + self.interval
+        ):
+            self.interval *= 2
+        return now + self.interval
+
+    def cancel(self):
+        """
+        Stop sampling, record a final sample, and close the file.
+        This should be called after all processes of the run have terminated,
+        but before the cgroup is removed.
+        """
+        self._supervisor.cancel(self)
+        if self._file.closed:
+            return
+        try:
+            self._sample(time.monotonic())
+        finally:
+            self._file.close()
+        logging.debug(
+            "Took %d samples of resource usage in %.4fs.",
+            self.sample_count,
+            self.sampling_time,
+        )
@@ -0,0 +1,207 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Transfer of the result files of a run out of the container,
+either into a directory tree or into a ZIP archive.
+
+Files are moved with rename() if source and target are on the same file system.
+Otherwise, they are copied as efficiently as the file systems allow:
+as reflink (FICLONE ioctl, e.g., on Btrfs and XFS), in the kernel
+with copy_file_range() (Python 3.8+) or sendfile(), or in user space.
+"""
+
+import concurrent.futures
+import errno
+import fcntl
+import logging
+import os
+import shutil
+import stat
+
+from benchexec.logarchive import LogArchiveWriter
+
+# from linux/fs.h
+_FICLONE = 0x40049409
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+# Errors that mean that a copy method is not supported for the given files
+_UNSUPPORTED_ERRORS = {
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EBADF,
+}
+
+
+def find_regular_files(path):
+    """
+    Return all regular files (no symlinks, device nodes, etc.) at the given path,
+    i.e., the path itself or all files below it if it is a directory.
+    The file type is taken from the directory entries where possible,
+    such that no additional system call is necessary per file.
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except OSError:
+        return []
+    if stat.S_ISREG(mode):
+        return [path]
+    elif not stat.S_ISDIR(mode):
+        return []
+
+    result = []
+    pending_dirs = [path]
+    while pending_dirs:
+        try:
+            entries = os.scandir(pending_dirs.pop())
+        except OSError as e:
+            logging.debug("Could not list directory: %s", e)
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending_dirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        result.append(entry.path)
+                except OSError:
+                    pass
+    return result
+
+
+def _clone(source_fd, target_fd):
+    fcntl.ioctl(target_fd, _FICLONE, source_fd)
+
+
+def _copy_with_copy_file_range(source_fd, target_fd):
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "copy_file_range is not available")
+    while os.copy_file_range(source_fd, target_fd, _COPY_CHUNK_SIZE * 64):
+        pass
+
+
+def _copy_with_sendfile(source_fd, target_fd):
+    while os.sendfile(target_fd, source_fd, None, _COPY_CHUNK_SIZE * 64):
+        pass
+
+
+def _copy_in_user_space(source_fd, target_fd):
+    while True:
+        data = os.read(source_fd, _COPY_CHUNK_SIZE)
+        if not data:
+            return
+        view = memoryview(data)
+        while view:
+            view = view[os.write(target_fd, view) :]
+
+
+# All methods continue at the current file positions,
+# so each one can also continue a copy that a previous one started.
+_COPY_METHODS = [
+    _clone,
+    _copy_with_copy_file_range,
+    _copy_with_sendfile,
+    _copy_in_user_space,
+]
+
+
+class ResultFilesTransfer(object):
+    """
+    Transfers files into an output directory or into a ZIP archive,
+    optionally with several threads in parallel.
+    Renaming and copy methods that turn out to be unsupported for the source
+    and target file systems are not tried again for further files.
+    """
+
+    def __init__(self, output_dir, archive=False, threads=1):
+        """
+        @param output_dir: the directory where to write the files
+        @param archive: whether to write the files into the ZIP archive
+            output_dir + ".zip" instead of into the directory
+        @param threads: the number of files to transfer in parallel
+        """
+        assert threads >= 1
+        self.output_dir = output_dir
+        self.archive_file = os.path.normpath(output_dir) + ".zip" if archive else None
+        self._threads = threads
+        self._archive = None
+        self._rename_possible = True
+        self._unsupported_methods = set()
+
+    def transfer(self, files):
+        """
+        Transfer the given files. Files that cannot be transferred are skipped
+        with a warning.
+        @param files: list of pairs of the absolute path of each file
+            and its path relative to the output directory
+        """
+        if not files:
+            return
+        if self.archive_file:
+            os.makedirs(os.path.dirname(self.archive_file), exist_ok=True)
+            self._archive = LogArchiveWriter(self.archive_file)
+        try:
+            if self._threads == 1:
+                for file in files:
+                    self._transfer_file(file)
+            else:
+                with concurrent.futures.ThreadPoolExecutor(self._threads) as pool:
+                    # list() propagates unexpected exceptions
+                    list(pool.map(self._transfer_file, files))
+        finally:
+            if self._archive:
+                self._archive.close()
+                self._archive = None
+
+    def _transfer_file(self, file):
+        source, name = file
+        try:
+            if self._archive:
+                self._archive.write(source, name)
+            else:
+                target = os.path.join(self.output_dir, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                self._move_file(source, target)
+        except OSError as e:
+            logging.warning("Could not retrieve output file '/%s': %s", name, e)
+
+    def _move_file(self, source, target):
+        if self._rename_possible:
+            try:
+                os.rename(source, target)
+                return
+            except OSError as e:
+                logging.debug("Cannot rename result file %s: %s", source, e)
+                if e.errno == errno.EXDEV:
+                    # would fail for the other files as well
+                    self._rename_possible = False
+        # Like shutil.move(), copy content and metadata if renaming is not possible
+        # (typically because the target is on a different file system).
+        # We do not need to delete the source, it is in the temporary directory.
+        with open(source, "rb", buffering=0) as source_file, open(
+            target, "wb", buffering=0
+        ) as target_file:
+            self._copy_content(source_file.fileno(), target_file.fileno())
+        shutil.copystat(source, target)
+
+    def _copy_content(self, source_fd, target_fd):
+        for copy in _COPY_METHODS:
+            if copy in self._unsupported_methods:
+                continue
+            try:
+                copy(source_fd, target_fd)
+                return
+            except OSError as e:
+                if copy is _copy_in_user_space or e.errno not in _UNSUPPORTED_ERRORS:
+                    raise
+                logging.debug("Cannot copy result files with %s: %s", copy.__name__, e)
+                self._unsupported_methods.add(copy)
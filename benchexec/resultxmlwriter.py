@@ -0,0 +1,146 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Incremental writing of result XML files.
+
+Instead of keeping the <run> elements of all runs of a run set in one ElementTree
+and serializing that whole tree again and again, each run is serialized exactly once
+when it is finished and appended to the intermediate result file.
+The final result file is produced by copying these serialized fragments
+in the order of the runs, such that neither the full tree nor its string
+representation ever needs to be kept in memory.
+"""
+
+from xml.sax.saxutils import escape
+
+XML_DECLARATION = '<?xml version="1.0" encoding="utf-8"?>\n'
+
+_INDENT = "  "
+_TEXT_ENTITIES = {'"': "&quot;"}
+_ATTRIBUTE_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}
+
+
+def doctype(root_tag, public_id, system_id):
+    """Return a DOCTYPE declaration (in the same format as xml.dom.minidom)."""
+    return f"<!DOCTYPE {root_tag}\n  PUBLIC '{public_id}'\n  '{system_id}'>\n"
+
+
+def start_tag(elem, close=False):
+    """Return the start tag of an element including all its attributes."""
+    attributes = "".join(
+        f' {key}="{escape(str(value), _ATTRIBUTE_ENTITIES)}"'
+        for key, value in elem.attrib.items()
+    )
+    return f"<{elem.tag}{attributes}{'/>' if close else '>'}"
+
+
+def element_to_string(elem, level=0):
+    """
+    Serialize an element and all its children, one element per line
+    and indented according to the given nesting level.
+    """
+    indent = _INDENT * level
+    if len(elem):
+        return "".join(
+            [indent + start_tag(elem) + "\n"]
+            + [element_to_string(child, level + 1) for child in elem]
+            + [f"{indent}</{elem.tag}>\n"]
+        )
+    elif elem.text:
+        return f"{indent}{start_tag(elem)}{escape(elem.text, _TEXT_ENTITIES)}</{elem.tag}>\n"
+    else:
+        return indent + start_tag(elem, close=True) + "\n"
+
+
+class ResultXmlWriter(object):
+    """
+    Append-only writer for the result XML file of a run set during its execution.
+
+    The file starts with the header of the result (marked as incomplete)
+    and each finished run is appended as soon as add_run() is called,
+    so after a crash it contains all runs that were finished so far
+    and only lacks the closing tag of the root element.
+    The positions of the serialized runs in the file are kept such that
+    write_final_result() can create the final file by copying them.
+    Instances are not thread-safe.
+    """
+
+    def __init__(self, filename, header_xml, public_id, system_id):
+        """
+        Create the intermediate file and write the given header to it.
+        @param header_xml: root element with all children that precede the runs
+        """
+        self.filename = filename
+        self.public_id = public_id
+        self.system_id = system_id
+        self._run_positions = {}
+        self._file = open(filename, "w+b")
+
+        header = header_xml.makeelement(header_xml.tag, header_xml.attrib)
+        header.set("error", "incomplete")  # Mark result file as incomplete
+        header.extend(header_xml)
+        self._append(
+            XML_DECLARATION
+            + doctype(header.tag, public_id, system_id)
+            + start_tag(header)
+            + "\n"
+            + "".join(element_to_string(child, 1) for child in header)
+        )
+
+    def _append(self, content):
+        data = content.encode("utf-8")
+        self._file.seek(0, 2)
+        offset = self._file.tell()
+        # a single write call per run keeps partially written runs at the end
+        self._file.write(data)
+        self._file.flush()
+        return offset, len(data)
+
+    def add_run(self, run, run_xml):
+        """Append the given XML element as the result of the given run."""
+        self._run_positions[run] = self._append(element_to_string(run_xml, 1))
+
+    def write_final_result(self, file, root_xml, runs):
+        """
+        Write the final result XML with the given root element to a binary file.
+        Direct children of the root element with tag "column" are written after
+        the runs, all others before them.
+        Runs that were not added to this writer are serialized from their
+        element in attribute "xml" (these are runs that were not executed).
+        """
+
+        def write(content):
+            file.write(content.encode("utf-8"))
+
+        write(XML_DECLARATION)
+        write(doctype(root_xml.tag, self.public_id, self.system_id))
+        write(start_tag(root_xml) + "\n")
+        for child in root_xml:
+            if child.tag != "column":
+                write(element_to_string(child, 1))
+
+        for run in runs:
+            position = self._run_positions.get(run)
+            if position is None:
+                write(element_to_string(run.xml, 1))
+            else:
+                offset, length = position
+                self._file.seek(offset)
+                file.write(self._file.read(length))
+
+        for child in root_xml:
+            if child.tag == "column":
+                write(element_to_string(child, 1))
+        write(f"</{root_xml.tag}>\n")
+
+    def close(self):
+        """Close the intermediate file (but do not delete it)."""
+        if self._file:
+            self._file.close()
+            self._file = None
+            self._run_positions = {}
@@ -0,0 +1,292 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Server mode of runexec (runexec --server SOCKET).
+
+A single process keeps initialized RunExecutor instances and executes runs
+on request, such that the startup cost of runexec (importing BenchExec,
+initializing cgroups, and checking the system) is paid only once.
+Requests are JSON objects that are sent over a Unix socket, one per line,
+and for each request the result of the run is sent back as a JSON object
+on a single line as soon as the run has finished.
+The requests of a connection are executed one after the other,
+but several connections can execute runs in parallel
+if the runs use disjoint sets of CPU cores.
+"""
+
+import datetime
+import decimal
+import json
+import logging
+import os
+import socketserver
+import threading
+
+from benchexec import intel_cpu_energy
+from benchexec import util
+
+# Keys of a request with the function for parsing string values
+# (the same as for the respective command-line option of runexec)
+# and the name of the respective parameter of RunExecutor.execute_run().
+_RUN_PARAMETERS = {
+    "timelimit": (util.parse_timespan_value, "hardtimelimit"),
+    "softtimelimit": (util.parse_timespan_value, "softtimelimit"),
+    "walltimelimit": (util.parse_timespan_value, "walltimelimit"),
+    "memlimit": (util.parse_memory_value, "memlimit"),
+    "cores": (util.parse_int_list, "cores"),
+    "memoryNodes": (util.parse_int_list, "memory_nodes"),
+    "output": (str, "output_filename"),
+    "maxOutputSize": (util.parse_memory_value, "maxLogfileSize"),
+    "filesCountLimit": (int, "files_count_limit"),
+    "filesSizeLimit": (util.parse_memory_value, "files_size_limit"),
+    "sample-interval": (float, "sample_interval"),
+    "samples-file": (str, "samples_filename"),
+    "dir": (str, "workingDir"),
+    "output-directory": (str, "output_dir"),
+}
+
+# Keys of a request that are not passed to RunExecutor.execute_run() directly
+_OTHER_KEYS = {"id", "args", "input", "result-files"}
+
+
+def parse_run_request(request):
+    """
+    Check a run request (a dict parsed from JSON)
+    and return the arguments for RunExecutor.execute_run() for it
+    (except for stdin) and the name of the input file (or None).
+    @raise ValueError: if the request is invalid
+    """
+    if not isinstance(request, dict):
+        raise ValueError("Request needs to be a JSON object.")
+    unknown_keys = set(request) - set(_RUN_PARAMETERS) - _OTHER_KEYS
+    if unknown_keys:
+        raise ValueError(f"Unknown keys in request: {', '.join(sorted(unknown_keys))}")
+
+    args = request.get("args")
+    if (
+        not isinstance(args, list)
+        or not args
+        or not all(isinstance(arg, str) for arg in args)
+    ):
+        raise ValueError('Request needs a non-empty list of strings as "args".')
+
+    kwargs = {"args": args, "output_filename": "output.log"}
+    for key, (parse, parameter) in _RUN_PARAMETERS.items():
+        value = request.get(key)
+        if isinstance(value, str):
+            value = parse(value)
+        elif key in ["cores", "memoryNodes"] and value is not None:
+            if not isinstance(value, list) or not all(
+                isinstance(item, int) for item in value
+            ):
+                raise ValueError(f'Value of "{key}" needs to be a list of integers.')
+        elif value is not None and not isinstance(value, (int, float)):
+            raise ValueError(f'Invalid value for "{key}": {value!r}')
+        if value is not None:
+            kwargs[parameter] = value
+
+    result_files = request.get("result-files")
+    if result_files is not None:
+        if "output_dir" not in kwargs:
+            raise ValueError('"result-files" can only be used with "output-directory".')
+        if not isinstance(result_files, list):
+            raise ValueError('Value of "result-files" needs to be a list of patterns.')
+        patterns = [os.path.normpath(p) for p in result_files if p]
+        for pattern in patterns:
+            if pattern.startswith(".."):
+                raise ValueError(f"Invalid relative result-files pattern '{pattern}'.")
+        kwargs["result_files_patterns"] = patterns
+    elif "output_dir" in kwargs:
+        kwargs["result_files_patterns"] = ["."]
+
+    input_file = request.get("input")
+    if input_file is not None and not isinstance(input_file, str):
+        raise ValueError('Value of "input" needs to be a file name.')
+    if input_file is not None and input_file == kwargs["output_filename"]:
+        raise ValueError("Input and output files cannot be the same.")
+    return kwargs, input_file
+
+
+def result_to_json(result):
+    """
+    Convert the result of RunExecutor.execute_run() into a dict
+    that can be serialized as JSON and has the same keys as the output of runexec
+    (values are numbers in seconds, bytes, and Joules, respectively).
+    """
+    result = dict(result)
+    exit_code = result.pop("exitcode", None)
+    result.update(intel_cpu_energy.format_energy_results(result.pop("cpuenergy", None)))
+    if exit_code is not None and exit_code.value is not None:
+        result["returnvalue"] = exit_code.value
+    if exit_code is not None and exit_code.signal is not None:
+        result["exitsignal"] = exit_code.signal
+
+    def convert(value):
+        if isinstance(value, decimal.Decimal):
+            return float(value)
+        elif isinstance(value, datetime.datetime):
+            return value.isoformat()
+        return value
+
+    return {key: convert(value) for key, value in result.items()}
+
+
+class _ActiveRun(object):
+    def __init__(self, cores):
+        self.cores = cores  # None if the run may use all cores
+        self.executor = None
+
+    def conflicts_with(self, cores):
+        return cores is None or self.cores is None or not self.cores.isdisjoint(cores)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles all requests received over one connection."""
+
+    def handle(self):
+        try:
+            for line in self.rfile:
+                if line.strip():
+                    response = self.server.handle_run_request(line)
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+        except OSError as e:
+            logging.warning("Connection to client failed: %s", e)
+
+
+class RunExecServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Server that executes runs as requested by clients over a Unix socket.
+    RunExecutor instances are created on demand (one for each run that is executed
+    in parallel) and reused for all later runs.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, create_executor, cgroup_values={}):
+        """
+        Create the server and bind it to the given socket path.
+        @param create_executor: function that returns a new RunExecutor
+        @param cgroup_values: additional cgroup values that are set for all runs
+        """
+        self._create_executor = create_executor
+        self._cgroup_values = cgroup_values
+        # reentrant because stop() can be called from a signal handler
+        self._lock = threading.RLock()
+        self._runs_finished = threading.Condition(self._lock)
+        self._idle_executors = []
+        self._active_runs = []
+        self._stopped = False
+        super(RunExecServer, self).__init__(socket_path, _RequestHandler)
+
+    def add_idle_executor(self, executor):
+        """Add an already created RunExecutor to the pool of this server."""
+        with self._lock:
+            self._idle_executors.append(executor)
+
+    def handle_run_request(self, line):
+        """
+        Execute the run given by one line of a request
+        and return the response (with the result or an error message) as dict.
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            if isinstance(request, dict):
+                request_id = request.get("id")
+            result = self.execute_run(request)
+            response = {"result": result}
+        except (ValueError, OSError) as e:
+            response = {"error": str(e)}
+        except SystemExit as e:
+            # RunExecutor.execute_run() calls sys.exit() for invalid arguments
+            response = {"error": str(e.code)}
+        except Exception as e:
+            logging.exception("Executing run failed")
+            response = {"error": f"Executing run failed: {e}"}
+        if "error" in response:
+            logging.warning("Could not execute run: %s", response["error"])
+        if request_id is not None:
+            response["id"] = request_id
+        return response
+
+    def execute_run(self, request):
+        """
+        Execute the run given by a request (a dict)
+        and return the result in the format of result_to_json().
+        @raise ValueError: if the request is invalid or its cores are in use
+        """
+        kwargs, input_file = parse_run_request(request)
+        cores = kwargs.get("cores")
+        run = self._start_run(None if cores is None else set(cores))
+        stdin = None
+        try:
+            if run.executor is None:
+                run.executor = self._create_executor()
+            if input_file is not None:
+                stdin = open(input_file, "rt")
+            logging.debug(
+                "Starting command %s",
+                " ".join(map(util.escape_string_shell, kwargs["args"])),
+            )
+            result = run.executor.execute_run(
+                stdin=stdin, cgroupValues=self._cgroup_values, **kwargs
+            )
+        finally:
+            if stdin:
+                stdin.close()
+            self._finish_run(run)
+        return result_to_json(result)
+
+    def _start_run(self, cores):
+        with self._lock:
+            if self._stopped:
+                raise ValueError("Server is shutting down.")
+            for other_run in self._active_runs:
+                if other_run.conflicts_with(cores):
+                    raise ValueError(
+                        "Another run is currently executing on the requested cores."
+                    )
+            run = _ActiveRun(cores)
+            if self._idle_executors:
+                run.executor = self._idle_executors.pop()
+            self._active_runs.append(run)
+            return run
+
+    def _finish_run(self, run):
+        with self._lock:
+            self._active_runs.remove(run)
+            if run.executor is not None:
+                self._idle_executors.append(run.executor)
+            self._runs_finished.notify_all()
+
+    def stop(self):
+        """
+        Kill all current runs, reject further requests,
+        and let serve_forever() return. Can be called from a signal handler.
+        """
+        with self._lock:
+            self._stopped = True
+            for run in self._active_runs:
+                if run.executor is not None:
+                    run.executor.stop()
+        # shutdown() waits for serve_forever(), which might run on this thread
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def server_close(self):
+        """Wait until all current runs are finished and release all resources."""
+        super(RunExecServer, self).server_close()
+        with self._lock:
+            while self._active_runs:
+                self._runs_finished.wait()
+            for executor in self._idle_executors:
+                executor.close()
+            self._idle_executors = []
+        try:
+            os.remove(self.server_address)
+        except OSError:
+            pass
@@ -10,12 +10,10 @@ import collections
 import datetime
 import decimal
 import logging
-import multiprocessing
 import os
 import signal
 import subprocess
 import sys
-import threading
 import time
 import tempfile
 from typing import cast, Optional
@@ -27,7 +25,10 @@ from benchexec import containerexecutor
 from benchexec.cgroups import Cgroups
 from benchexec.filehierarchylimit import FileHierarchyLimitThread
 from benchexec import intel_cpu_energy
+from benchexec.limitsupervisor import TimeLimit
 from benchexec import oomhandler
+from benchexec import outputcapture
+from benchexec import resourcesampler
 from benchexec.util import print_decimal
 from benchexec import resources
 from benchexec import systeminfo
@@ -40,6 +41,27 @@ _BYTE_FACTOR = 1000  # byte in kilobyte
 _LOG_SHRINK_MARKER = "\n\n\nWARNING: YOUR LOGFILE WAS TOO LONG, SOME LINES IN THE MIDDLE WERE REMOVED.\n\n\n\n"
 
 
+# Destinations of command-line options that are given per run in server mode
+_SINGLE_RUN_OPTIONS = [
+    "memlimit",
+    "timelimit",
+    "softtimelimit",
+    "walltimelimit",
+    "cores",
+    "memoryNodes",
+    "input",
+    "output",
+    "maxOutputSize",
+    "filesCountLimit",
+    "filesSizeLimit",
+    "sample_interval",
+    "samples_file",
+    "output_directory",
+    "result_files",
+    "dir",
+]
+
+
 def main(argv=None):
     """
     A simple command-line interface for the runexecutor module of BenchExec.
@@ -125,6 +147,20 @@ def main(argv=None):
         metavar="BYTES",
         help="maximum size of files the tool may write (checked periodically, counts only files written in container mode or to temporary directories, only supported with --no-tmpfs)",
     )
+    io_args.add_argument(
+        "--sample-interval",
+        type=float,
+        metavar="SECONDS",
+        help="record the resource usage of the command over time in this interval "
+        "(increased automatically if sampling takes more than 1%% of the wall time)",
+    )
+    io_args.add_argument(
+        "--samples-file",
+        default="samples.csv",
+        metavar="FILE",
+        help="name of CSV file where the resource usage over time is written "
+        "if --sample-interval is given",
+    )
     io_args.add_argument(
         "--skip-cleanup",
         action="store_false",
@@ -174,12 +210,32 @@ def main(argv=None):
         help="working directory for executing the command (default is current directory)",
     )
 
-    baseexecutor.add_basic_executor_options(parser)
+    environment_args.add_argument(
+        "--server",
+        metavar="SOCKET",
+        help="instead of executing a single command, listen on this Unix socket "
+        "for requests for runs (as JSON) and execute them "
+        "(cf. doc/runexec.md for details)",
+    )
+
+    baseexecutor.add_basic_executor_options(parser, args_required=False)
 
     options = parser.parse_args(argv[1:])
     baseexecutor.handle_basic_executor_options(options, parser)
     logging.debug("This is runexec %s.", __version__)
 
+    if options.server:
+        # options for single runs are part of the requests
+        for option in _SINGLE_RUN_OPTIONS:
+            if getattr(options, option) != parser.get_default(option):
+                parser.error(
+                    f"Option --{option.replace('_', '-')} cannot be used with --server."
+                )
+        if options.args:
+            parser.error("No command can be given together with --server.")
+    elif not options.args:
+        parser.error("the following arguments are required: ARG")
+
     if options.container:
         container_options = containerexecutor.handle_basic_container_args(
             options, parser
@@ -187,6 +243,9 @@ def main(argv=None):
         container_output_options = containerexecutor.handle_container_output_args(
             options, parser
         )
+        container_options.update(
+            containerexecutor.handle_result_files_transfer_args(options, parser)
+        )
         if container_options["container_tmpfs"] and (
             options.filesCountLimit or options.filesSizeLimit
         ):
@@ -225,12 +284,19 @@ def main(argv=None):
         cgroup_values[(subsystem, option)] = value
         cgroup_subsystems.add(subsystem)
 
-    executor = RunExecutor(
-        cleanup_temp_dir=options.cleanup,
-        additional_cgroup_subsystems=list(cgroup_subsystems),
-        use_namespaces=options.container,
-        **container_options,
-    )
+    def create_executor():
+        return RunExecutor(
+            cleanup_temp_dir=options.cleanup,
+            additional_cgroup_subsystems=list(cgroup_subsystems),
+            use_namespaces=options.container,
+            **container_options,
+        )
+
+    if options.server:
+        _run_server(options.server, create_executor, cgroup_values)
+        return
+
+    executor = create_executor()
 
     # Ensure that process gets killed on interrupt/kill signal,
     # and avoid KeyboardInterrupt because it could occur anywhere.
@@ -269,6 +335,8 @@ def main(argv=None):
             maxLogfileSize=options.maxOutputSize,
             files_count_limit=options.filesCountLimit,
             files_size_limit=options.filesSizeLimit,
+            samples_filename=options.samples_file,
+            sample_interval=options.sample_interval,
             **container_output_options,
         )
     finally:
@@ -297,6 +365,9 @@ def main(argv=None):
     if exit_code is not None and exit_code.signal is not None:
         print(f"exitsignal={exit_code.signal}")
     print_optional_result("walltime", "s")
+    print_optional_result("setuptime", "s")
+    print_optional_result("measurementtime", "s")
+    print_optional_result("samplingtime", "s")
     print_optional_result("cputime", "s")
     for key in sorted(result.keys()):
         if key.startswith("cputime-"):
@@ -307,26 +378,63 @@ def main(argv=None):
     print_optional_result("pressure-cpu-some", "s")
     print_optional_result("pressure-io-some", "s")
     print_optional_result("pressure-memory-some", "s")
+    print_optional_result("timelimit-overshoot", "s")
     energy = intel_cpu_energy.format_energy_results(result.get("cpuenergy"))
     for energy_key, energy_value in energy.items():
         print(f"{energy_key}={energy_value}J")
 
 
+def _run_server(socket_path, create_executor, cgroup_values):
+    """Execute runs as requested over the given Unix socket until killed."""
+    from benchexec import runexecserver
+
+    try:
+        server = runexecserver.RunExecServer(
+            socket_path, create_executor, cgroup_values
+        )
+    except OSError as e:
+        sys.exit(f"Cannot listen on socket {socket_path}: {e.strerror}")
+
+    # Initialize one executor already now, such that problems are reported at once.
+    server.add_idle_executor(create_executor())
+
+    def signal_handler_stop(signum, frame):
+        server.stop()
+
+    signal.signal(signal.SIGTERM, signal_handler_stop)
+    signal.signal(signal.SIGQUIT, signal_handler_stop)
+    signal.signal(signal.SIGINT, signal_handler_stop)
+
+    logging.info("Waiting for run requests on %s", socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
 class RunExecutor(containerexecutor.ContainerExecutor):
     # --- object initialization ---
 
     def __init__(
-        self, cleanup_temp_dir=True, additional_cgroup_subsystems=[], *args, **kwargs
+        self,
+        cleanup_temp_dir=True,
+        additional_cgroup_subsystems=[],
+        prepare_runs=False,
+        *args,
+        **kwargs,
     ):
         """
         Create an instance of of RunExecutor.
         @param cleanup_temp_dir Whether to remove the temporary directories created for the run.
         @param additional_cgroup_subsystems List of additional cgroup subsystems that should be required and used for runs.
+        @param prepare_runs Whether to prepare cgroups and temporary directory for the next run while a run is executing (call close() to release them).
         """
         super(RunExecutor, self).__init__(*args, **kwargs)
         self._termination_reason = None
         self._should_cleanup_temp_dir = cleanup_temp_dir
         self._cgroup_subsystems = additional_cgroup_subsystems
+        self._should_prepare_runs = prepare_runs
+        self._prepared_run = None
 
         self._energy_measurement = (
             intel_cpu_energy.EnergyMeasurement.create_if_supported()
@@ -486,6 +594,54 @@ class RunExecutor(containerexecutor.ContainerExecutor):
 
         return cgroups
 
+    def _prepare_next_run(self, my_cpus, memlimit, memory_nodes, cgroup_values):
+        """
+        Create cgroups and temporary directory for a future run with the same
+        parameters, such that _take_prepared_run() can provide them quickly.
+        Each run still gets its own fresh cgroups and temporary directory,
+        they are just created earlier (while the current run is executing).
+        """
+        key = _prepared_run_key(my_cpus, memlimit, memory_nodes, cgroup_values)
+        try:
+            cgroups = self._setup_cgroups(
+                my_cpus, memlimit, memory_nodes, cgroup_values
+            )
+        except (SystemExit, OSError) as e:
+            # Will be reported when the next run is started without preparation.
+            logging.debug("Could not prepare cgroups for next run: %s", e)
+            return
+        temp_dir = tempfile.mkdtemp(prefix="BenchExec_run_")
+        self._prepared_run = (key, cgroups, temp_dir)
+
+    def _take_prepared_run(self, my_cpus, memlimit, memory_nodes, cgroup_values):
+        """
+        Return the cgroups and the temporary directory that were prepared
+        by _prepare_next_run() if they match the given parameters, or None.
+        """
+        prepared_run = self._prepared_run
+        self._prepared_run = None
+        if prepared_run:
+            key, cgroups, temp_dir = prepared_run
+            if key == _prepared_run_key(my_cpus, memlimit, memory_nodes, cgroup_values):
+                logging.debug("Using prepared cgroups %s.", cgroups)
+                return cgroups, temp_dir
+            self._release_prepared_run(prepared_run)
+        return None
+
+    def _release_prepared_run(self, prepared_run):
+        unused_key, cgroups, temp_dir = prepared_run
+        cgroups.remove()
+        util.rmtree(temp_dir, onerror=util.log_rmtree_error)
+
+    def close(self):
+        """
+        Release the resources that were prepared for future runs, if any.
+        The instance can still be used afterwards.
+        """
+        if self._prepared_run:
+            self._release_prepared_run(self._prepared_run)
+            self._prepared_run = None
+
     def _cleanup_temp_dir(self, base_dir):
         """Delete given temporary directory and all its contents."""
         if self._should_cleanup_temp_dir:
@@ -516,10 +672,18 @@ class RunExecutor(containerexecutor.ContainerExecutor):
         logging.debug("Using additional environment %s.", environments)
         return run_environment
 
+    def _get_output_header(self, args):
+        # command line for output file
+        # (without environment variables, they are documented by benchexec)
+        return (
+            " ".join(map(util.escape_string_shell, args))
+            + "\n\n\n"
+            + "-" * 80
+            + "\n\n\n"
+        )
+
     def _setup_output_file(self, output_filename, args, write_header=True):
         """Open and prepare output file."""
-        # write command line into outputFile
-        # (without environment variables, they are documented by benchexec)
         try:
             parent_dir = os.path.dirname(output_filename)
             if parent_dir:
@@ -529,12 +693,7 @@ class RunExecutor(containerexecutor.ContainerExecutor):
             sys.exit("Could not write to output file: " + str(e))
 
         if write_header:
-            output_file.write(
-                " ".join(map(util.escape_string_shell, args))
-                + "\n\n\n"
-                + "-" * 80
-                + "\n\n\n"
-            )
+            output_file.write(self._get_output_header(args))
             output_file.flush()
 
         return output_file
@@ -546,8 +705,8 @@ class RunExecutor(containerexecutor.ContainerExecutor):
         @return None or the time-limit handler for calling cancel()
         """
         if any([hardtimelimit, softtimelimit, walltimelimit]):
-            # Start a timer to periodically check timelimit
-            timelimitThread = _TimelimitThread(
+            # Register time limit at the supervisor that is shared by all runs
+            return TimeLimit(
                 cgroups=cgroups,
                 hardtimelimit=hardtimelimit,
                 softtimelimit=softtimelimit,
@@ -556,8 +715,6 @@ class RunExecutor(containerexecutor.ContainerExecutor):
                 cores=cores,
                 callbackFn=self._set_termination_reason,
             )
-            timelimitThread.start()
-            return timelimitThread
         return None
 
     def _setup_cgroup_memory_limit_thread(self, memlimit, cgroups, pid_to_kill):
@@ -599,6 +756,16 @@ class RunExecutor(containerexecutor.ContainerExecutor):
             return file_hierarchy_limit_thread
         return None
 
+    def _setup_resource_sampler(self, samples_filename, sample_interval, cgroups):
+        """Start recording the resource usage of the run over time if requested.
+        @return None or the sampler for calling cancel()
+        """
+        if sample_interval is not None:
+            return resourcesampler.ResourceSampler(
+                cgroups, samples_filename, sample_interval
+            )
+        return None
+
     # --- run execution ---
 
     def execute_run(
@@ -620,6 +787,9 @@ class RunExecutor(containerexecutor.ContainerExecutor):
         files_size_limit=None,
         error_filename=None,
         write_header=True,
+        capture_output=False,
+        samples_filename=None,
+        sample_interval=None,
         **kwargs,
     ):  # pytype: disable=signature-mismatch  discrepancy is ok here
         """
@@ -648,6 +818,9 @@ class RunExecutor(containerexecutor.ContainerExecutor):
         @param files_size_limit: None or maximum size of files that may be written.
         @param error_filename: the file where the error output should be written to (default: same as output_filename)
         @param write_headers: Write informational headers to the output and the error file if separate (default: True)
+        @param capture_output: Read the output through a pipe and keep only the part in memory that is retained after shrinking it to maxLogfileSize, instead of writing all of it to the output file. The result then contains the retained lines of the output (after the header) as "output". Ignored if maxLogfileSize is None, because all output would need to be kept in memory.
+        @param samples_filename: None or the file where the resource usage over time is written to as CSV (only if sample_interval is given)
+        @param sample_interval: None or the interval in seconds in which the resource usage is recorded (it is increased automatically if sampling takes too long)
         @param **kwargs: further arguments for ContainerExecutor.execute_run()
         @return: dict with result of run (measurement results and process exitcode)
         """
@@ -725,6 +898,11 @@ class RunExecutor(containerexecutor.ContainerExecutor):
 
         self.cgroups.handle_errors(critical_cgroups)
 
+        if capture_output and maxLogfileSize is None:
+            # Memory usage of capturing would not be bounded.
+            logging.debug("Not capturing output because its size is not limited.")
+            capture_output = False
+
         for (subsystem, option), _ in cgroupValues.items():
             if subsystem not in self._cgroup_subsystems:
                 sys.exit(
@@ -744,6 +922,11 @@ class RunExecutor(containerexecutor.ContainerExecutor):
         if files_size_limit is not None:
             if files_size_limit < 0:
                 sys.exit(f"Invalid files-size limit {files_size_limit}.")
+        if sample_interval is not None:
+            if sample_interval <= 0:
+                sys.exit(f"Invalid sample interval {sample_interval}.")
+            if not samples_filename:
+                sys.exit("Sampling resource usage requires a file for the samples.")
 
         try:
             return self._execute(
@@ -752,6 +935,7 @@ class RunExecutor(containerexecutor.ContainerExecutor):
                 error_filename,
                 stdin,
                 write_header,
+                capture_output,
                 hardtimelimit,
                 softtimelimit,
                 walltimelimit,
@@ -764,6 +948,8 @@ class RunExecutor(containerexecutor.ContainerExecutor):
                 maxLogfileSize,
                 files_count_limit,
                 files_size_limit,
+                samples_filename,
+                sample_interval,
                 **kwargs,
             )
 
@@ -789,6 +975,7 @@ class RunExecutor(containerexecutor.ContainerExecutor):
         error_filename,
         stdin,
         write_header,
+        capture_output,
         hardtimelimit,
         softtimelimit,
         walltimelimit,
@@ -801,15 +988,19 @@ class RunExecutor(containerexecutor.ContainerExecutor):
         max_output_size,
         files_count_limit,
         files_size_limit,
+        samples_filename,
+        sample_interval,
         **kwargs,
     ):
         """
         This method executes the command line and waits for the termination of it,
         handling all setup and cleanup, but does not check whether arguments are valid.
         """
-        timelimitThread = None
+        setup_start = time.monotonic()
+        timelimit = None
         oomThread = None
         file_hierarchy_limit_thread = None
+        resource_sampler = None
 
         if self._energy_measurement is not None:
             # Calculate which packages we should use for energy measurements
@@ -829,8 +1020,12 @@ class RunExecutor(containerexecutor.ContainerExecutor):
                     # Disable energy measurements because we use only parts of a CPU
                     packages = None
 
+        walltime_before = None
+        crash_base_path = None
+
         def preParent():
             """Setup that is executed in the parent process immediately before the actual tool is started."""
+            nonlocal walltime_before
             # start measurements
             if self._energy_measurement is not None and packages:
                 self._energy_measurement.start()
@@ -859,15 +1054,20 @@ class RunExecutor(containerexecutor.ContainerExecutor):
             # For a similar reason, we cancel all limits. Otherwise a run could have
             # terminationreason=walltime because copying output files took a long time.
             # Can be removed if #433 gets implemented properly.
-            if timelimitThread:
-                timelimitThread.cancel()
+            if timelimit:
+                timelimit.cancel()
             if oomThread:
                 oomThread.cancel()
             if file_hierarchy_limit_thread:
                 file_hierarchy_limit_thread.cancel()
 
             if exit_code.value not in [0, 1]:
-                _get_debug_output_after_crash(output_filename, base_path)
+                if output_capture:
+                    # output file is written later
+                    nonlocal crash_base_path
+                    crash_base_path = base_path
+                else:
+                    _get_debug_output_after_crash(output_filename, base_path)
 
             return starttime, walltime, energy
 
@@ -876,12 +1076,30 @@ class RunExecutor(containerexecutor.ContainerExecutor):
             os.setpgrp()  # make subprocess to group-leader
 
         # preparations that are not time critical
-        cgroups = self._setup_cgroups(cores, memlimit, memory_nodes, cgroup_values)
-        temp_dir = tempfile.mkdtemp(prefix="BenchExec_run_")
+        prepared_run = self._take_prepared_run(
+            cores, memlimit, memory_nodes, cgroup_values
+        )
+        if prepared_run:
+            cgroups, temp_dir = prepared_run
+        else:
+            cgroups = self._setup_cgroups(cores, memlimit, memory_nodes, cgroup_values)
+            temp_dir = tempfile.mkdtemp(prefix="BenchExec_run_")
         run_environment = self._setup_environment(environments)
         outputFile = self._setup_output_file(
             output_filename, args, write_header=write_header
         )
+        output_capture = None
+        if capture_output:
+            # The output file is written only after the run.
+            header = self._get_output_header(args) if write_header else ""
+            header = header.encode(outputFile.encoding)
+            outputFile.close()
+            read_fd, write_fd = os.pipe()
+            output_capture = outputcapture.OutputCaptureThread(
+                read_fd, header, max_output_size
+            )
+            output_capture.start()
+            outputFile = open(write_fd, "wb", buffering=0)
         if error_filename is None:
             errorFile = outputFile
         else:
@@ -921,19 +1139,27 @@ class RunExecutor(containerexecutor.ContainerExecutor):
             with self.SUB_PROCESS_PIDS_LOCK:
                 self.SUB_PROCESS_PIDS.add(pid)
 
-            timelimitThread = self._setup_cgroup_time_limit(
+            timelimit = self._setup_cgroup_time_limit(
                 hardtimelimit, softtimelimit, walltimelimit, cgroups, cores, pid
             )
             oomThread = self._setup_cgroup_memory_limit_thread(memlimit, cgroups, pid)
             file_hierarchy_limit_thread = self._setup_file_hierarchy_limit(
                 files_count_limit, files_size_limit, temp_dir, cgroups, pid
             )
+            resource_sampler = self._setup_resource_sampler(
+                samples_filename, sample_interval, cgroups
+            )
+
+            if self._should_prepare_runs:
+                # We would only wait for the process otherwise.
+                self._prepare_next_run(cores, memlimit, memory_nodes, cgroup_values)
 
             # wait until process has terminated
             returnvalue, ru_child, (starttime, walltime, energy) = result_fn()
             if starttime:
                 result["starttime"] = starttime
             result["walltime"] = walltime
+            result["setuptime"] = walltime_before - setup_start
         finally:
             # cleanup steps that need to get executed even in case of failure
             logging.debug("Process terminated, exit code %s.", returnvalue)
@@ -941,8 +1167,8 @@ class RunExecutor(containerexecutor.ContainerExecutor):
             with self.SUB_PROCESS_PIDS_LOCK:
                 self.SUB_PROCESS_PIDS.discard(pid)
 
-            if timelimitThread:
-                timelimitThread.cancel()
+            if timelimit:
+                timelimit.cancel()
 
             if oomThread:
                 oomThread.cancel()
@@ -950,6 +1176,11 @@ class RunExecutor(containerexecutor.ContainerExecutor):
             if file_hierarchy_limit_thread:
                 file_hierarchy_limit_thread.cancel()
 
+            if resource_sampler:
+                # the final sample needs the cgroup, but no process is running anymore
+                resource_sampler.cancel()
+                result["samplingtime"] = resource_sampler.sampling_time
+
             # Make sure to kill all processes if there are still some
             # (needs to come early to avoid accumulating more CPU time)
             cgroups.kill_all_tasks()
@@ -958,6 +1189,11 @@ class RunExecutor(containerexecutor.ContainerExecutor):
             outputFile.close()
             if errorFile is not outputFile:
                 errorFile.close()
+            if output_capture:
+                output_capture.finish()
+                output = output_capture.get_output(_LOG_SHRINK_MARKER)
+                with open(output_filename, "wb") as f:
+                    f.write(output)
 
             # measurements are not relevant in case of failure, but need to come before cgroup cleanup
             self._get_cgroup_measurements(cgroups, ru_child, result)
@@ -966,8 +1202,6 @@ class RunExecutor(containerexecutor.ContainerExecutor):
 
             self._cleanup_temp_dir(temp_dir)
 
-            if timelimitThread:
-                _try_join_cancelled_thread(timelimitThread)
             if oomThread:
                 _try_join_cancelled_thread(oomThread)
             if file_hierarchy_limit_thread:
@@ -991,7 +1225,22 @@ class RunExecutor(containerexecutor.ContainerExecutor):
         if error_filename is not None:
             _reduce_file_size_if_necessary(error_filename, max_output_size)
 
-        _reduce_file_size_if_necessary(output_filename, max_output_size)
+        if output_capture:
+            if len(output) < output_capture.size:
+                logging.warning(
+                    "Output of run is too big (size %s bytes), "
+                    "removed lines from logfile '%s'.",
+                    output_capture.size,
+                    output_filename,
+                )
+            if crash_base_path is not None:
+                _get_debug_output_after_crash(output_filename, crash_base_path)
+            else:
+                result["output"] = outputcapture.decode_output_lines(output)[
+                    header.count(b"\n") :
+                ]
+        else:
+            _reduce_file_size_if_necessary(output_filename, max_output_size)
 
         result["exitcode"] = util.ProcessExitCode.from_raw(returnvalue)
         if energy:
@@ -1001,6 +1250,8 @@ class RunExecutor(containerexecutor.ContainerExecutor):
                 result["cpuenergy"] = {
                     pkg: energy[pkg] for pkg in energy if pkg in packages
                 }
+        if timelimit and timelimit.overshoot is not None:
+            result["timelimit-overshoot"] = timelimit.overshoot
         if self._termination_reason:
             result["terminationreason"] = self._termination_reason
         elif self.cgroups.version == 2 and result.get("oom_kill_count"):
@@ -1021,9 +1272,11 @@ class RunExecutor(containerexecutor.ContainerExecutor):
     def _get_cgroup_measurements(self, cgroups, ru_child, result):
         """
         This method calculates the exact results for time and memory measurements.
-        It is not important to call this method as soon as possible after the run.
+        It is not important to call this method as soon as possible after the run,
+        but it needs to be called after all processes in the cgroups were killed.
         """
         logging.debug("Getting cgroup measurements.")
+        measurement_start = time.monotonic()
 
         cputime_wait = ru_child.ru_utime + ru_child.ru_stime if ru_child else 0
         cputime_cgroups = None
@@ -1032,20 +1285,14 @@ class RunExecutor(containerexecutor.ContainerExecutor):
             if value is not None:
                 result[key] = value
 
+        # All processes of the run have terminated and been reaped at this point
+        # (kill_all_tasks() waits for this), and the kernel accounts their resource
+        # usage when they exit. So a single snapshot of all values is consistent
+        # and we do not need to wait for values to become stable.
+        measurements = cgroups.read_final_measurements()
+
         if cgroups.CPU in cgroups:
-            # We want to read the value from the cgroup.
-            # The documentation warns about outdated values.
-            # So we read twice with 0.1s time difference,
-            # and continue reading as long as the values differ.
-            # This has never happened except when interrupting the script with Ctrl+C,
-            # but just try to be on the safe side here.
-            tmp = cgroups.read_cputime()
-            tmp2 = None
-            while tmp != tmp2:
-                time.sleep(0.1)
-                tmp2 = tmp
-                tmp = cgroups.read_cputime()
-            cputime_cgroups = tmp
+            cputime_cgroups = measurements["cputime"]
 
             # Usually cputime_cgroups seems to be 0.01s greater than cputime_wait.
             # Furthermore, cputime_wait might miss some subprocesses,
@@ -1068,21 +1315,23 @@ class RunExecutor(containerexecutor.ContainerExecutor):
             else:
                 result["cputime"] = cputime_cgroups
 
-            for core, coretime in cgroups.read_usage_per_cpu().items():
+            for core, coretime in measurements["usage_per_cpu"].items():
                 result[f"cputime-cpu{core}"] = coretime
 
         if cgroups.MEMORY in cgroups:
-            store_result("memory", cgroups.read_max_mem_usage())
-            store_result("oom_kill_count", cgroups.read_oom_kill_count())
+            store_result("memory", measurements["memory"])
+            store_result("oom_kill_count", measurements["oom_kill_count"])
 
         if cgroups.IO in cgroups:
-            result["blkio-read"], result["blkio-write"] = cgroups.read_io_stat()
+            result["blkio-read"], result["blkio-write"] = measurements["io"]
 
         # Pressure information does not depend on enabled controllers:
         # https://docs.kernel.org/accounting/psi.html
-        store_result("pressure-cpu-some", cgroups.read_cpu_pressure())
-        store_result("pressure-memory-some", cgroups.read_mem_pressure())
-        store_result("pressure-io-some", cgroups.read_io_pressure())
+        store_result("pressure-cpu-some", measurements["pressure-cpu-some"])
+        store_result("pressure-memory-some", measurements["pressure-memory-some"])
+        store_result("pressure-io-some", measurements["pressure-io-some"])
+
+        result["measurementtime"] = time.monotonic() - measurement_start
 
         logging.debug(
             "Resource usage of run: walltime=%s, cputime=%s, cgroup-cputime=%s, memory=%s",
@@ -1099,6 +1348,16 @@ class RunExecutor(containerexecutor.ContainerExecutor):
         super(RunExecutor, self).stop()
 
 
+def _prepared_run_key(my_cpus, memlimit, memory_nodes, cgroup_values):
+    """Return a hashable representation of all parameters of _setup_cgroups()."""
+    return (
+        None if my_cpus is None else tuple(my_cpus),
+        memlimit,
+        None if memory_nodes is None else tuple(memory_nodes),
+        frozenset(cgroup_values.items()),
+    )
+
+
 def _reduce_file_size_if_necessary(fileName, maxSize):
     """
     This function shrinks a file.
@@ -1181,102 +1440,5 @@ def _try_join_cancelled_thread(thread):
         )
 
 
-class _TimelimitThread(threading.Thread):
-    """
-    Thread that periodically checks whether the given process has already
-    reached its timelimit. After this happens, the process is terminated.
-    """
-
-    def __init__(
-        self,
-        cgroups,
-        hardtimelimit,
-        softtimelimit,
-        walltimelimit,
-        pid_to_kill,
-        cores,
-        callbackFn=lambda reason: None,
-    ):
-        super(_TimelimitThread, self).__init__()
-        self.name = "TimelimitThread-" + self.name
-        self.finished = threading.Event()
-
-        if hardtimelimit or softtimelimit:
-            assert cgroups.CPU in cgroups
-        assert walltimelimit is not None
-
-        if cores:
-            self.cpuCount = len(cores)
-        else:
-            try:
-                self.cpuCount = multiprocessing.cpu_count()
-            except NotImplementedError:
-                self.cpuCount = 1
-
-        self.cgroups = cgroups
-        # set timelimits to large dummy value if no limit is given
-        self.timelimit = hardtimelimit or (60 * 60 * 24 * 365 * 100)
-        self.softtimelimit = softtimelimit or (60 * 60 * 24 * 365 * 100)
-        self.latestKillTime = time.monotonic() + walltimelimit
-        self.pid_to_kill = pid_to_kill
-        self.callback = callbackFn
-
-    def read_cputime(self):
-        while True:
-            try:
-                return self.cgroups.read_cputime()
-            except ValueError:
-                # Sometimes the kernel produces strange values with linebreaks in them
-                time.sleep(1)
-
-    def run(self):
-        while not self.finished.is_set():
-            usedCpuTime = self.read_cputime() if self.cgroups.CPU in self.cgroups else 0
-            remainingCpuTime = self.timelimit - usedCpuTime
-            remainingSoftCpuTime = self.softtimelimit - usedCpuTime
-            remainingWallTime = self.latestKillTime - time.monotonic()
-            logging.debug(
-                "TimelimitThread for process %s: used CPU time: %s, remaining CPU time: %s, "
-                "remaining soft CPU time: %s, remaining wall time: %s.",
-                self.pid_to_kill,
-                usedCpuTime,
-                remainingCpuTime,
-                remainingSoftCpuTime,
-                remainingWallTime,
-            )
-            if remainingCpuTime <= 0:
-                self.callback("cputime")
-                logging.debug(
-                    "Killing process %s due to CPU time timeout.", self.pid_to_kill
-                )
-                util.kill_process(self.pid_to_kill)
-                self.finished.set()
-                return
-            if remainingWallTime <= 0:
-                self.callback("walltime")
-                logging.warning(
-                    "Killing process %s due to wall time timeout.", self.pid_to_kill
-                )
-                util.kill_process(self.pid_to_kill)
-                self.finished.set()
-                return
-
-            if remainingSoftCpuTime <= 0:
-                self.callback("cputime-soft")
-                # soft time limit violated, ask process to terminate
-                util.kill_process(self.pid_to_kill, signal.SIGTERM)
-                self.softtimelimit = self.timelimit
-
-            remainingTime = min(
-                remainingCpuTime / self.cpuCount,
-                remainingSoftCpuTime / self.cpuCount,
-                remainingWallTime,
-            )
-            self.finished.wait(remainingTime + 1)
-
-    def cancel(self):
-        self.finished.set()
-
-
 if __name__ == "__main__":
     main()
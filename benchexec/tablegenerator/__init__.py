@@ -33,9 +33,17 @@ import benchexec.model as model
 import benchexec.result as result
 import benchexec.tooladapter as tooladapter
 import benchexec.util
-from benchexec.tablegenerator import htmltable, statistics, util, statisticstex
+from benchexec.tablegenerator import (
+    htmltable,
+    logindex,
+    resultcache,
+    samplesplot,
+    statistics,
+    util,
+    statisticstex,
+)
 from benchexec.tablegenerator.columns import Column
-from benchexec.tablegenerator.util import TaskId
+from benchexec.tablegenerator.util import RunXml, TaskId
 import zipfile
 
 # Process pool for parallel work.
@@ -187,7 +195,9 @@ def handle_union_tag(
             if resultsFile in all_result_files:
                 handle_error("File '%s' included twice in <union> tag", resultsFile)
             all_result_files.add(resultsFile)
-            result_xml = parse_results_file(resultsFile, run_set_id)
+            result_xml = parse_results_file(
+                resultsFile, run_set_id, use_cache=options.use_cache
+            )
             if result_xml is not None:
                 result.append(resultsFile, result_xml, options.all_columns)
 
@@ -202,7 +212,7 @@ def handle_union_tag(
     name = tag.get("title", name)
     if name:
         result.attributes["name"] = [name]
-    result.collect_data(options.correct_only)
+    result.collect_data(options.correct_only, options.use_cache)
     return result
 
 
@@ -397,10 +407,12 @@ class RunSetResult(object):
                 resultFile, resultElem, all_columns
             )
 
-    def collect_data(self, correct_only):
+    def collect_data(self, correct_only, use_cache=False):
         """
         Load the actual result values from the XML file and the log files.
         This may take some time if many log files have to be opened and parsed.
+        @param use_cache: Whether values from local log archives should be indexed
+                          (cf. module logindex).
         """
         self.results = []
 
@@ -417,6 +429,42 @@ class RunSetResult(object):
 
         # Opening the ZIP archive with the logs for every run is too slow, we cache it.
         log_zip_cache = {}
+        log_indexes = {}  # path of ZIP archive -> LogValueIndex or None
+        tool_module = (
+            self.attributes["toolmodule"][0]
+            if "toolmodule" in self.attributes
+            else None
+        )
+
+        def _get_log_index(log_file):
+            """
+            Return the index for the archive that contains the given log file
+            and the name of the log file in the archive, or None if not available.
+            """
+            if util.is_url(log_file) or os.path.isfile(log_file):
+                return None, None
+            log_folder = os.path.dirname(log_file)
+            log_zip = log_folder + ".zip"
+            if log_zip not in log_indexes:
+                log_indexes[log_zip] = (
+                    logindex.LogValueIndex(log_zip, tool_module)
+                    if os.path.isfile(log_zip)
+                    else None
+                )
+            return (
+                log_indexes[log_zip],
+                os.path.relpath(log_file, os.path.dirname(log_folder)),
+            )
+
+        # Index is not needed, or values would not be meaningful without tool.
+        get_log_index = (
+            _get_log_index
+            if use_cache
+            and any(c.pattern and not c.href for c in self.columns)
+            and load_tool(self)
+            else None
+        )
+
         task_set = set()
         try:
             for xml_result, result_file in self._xml_results:
@@ -428,6 +476,7 @@ class RunSetResult(object):
                     log_zip_cache,
                     self.columns_relevant_for_diff,
                     result_file,
+                    get_log_index,
                 )
                 task = run_result.task_id
                 # Make sure to keep results free of duplicates
@@ -441,6 +490,9 @@ class RunSetResult(object):
         finally:
             for file in log_zip_cache.values():
                 file.close()
+            for log_index in log_indexes.values():
+                if log_index:
+                    log_index.store()
 
         for column in self.columns:
             column_values = (
@@ -500,7 +552,7 @@ class RunSetResult(object):
             column_names = {
                 c.get("title")
                 for s in run_results
-                for c in s.findall("column")
+                for c in s.columns
                 if all_columns or c.get("hidden") != "true"
             }
 
@@ -563,10 +615,31 @@ class RunSetResult(object):
         return summary
 
 
+class _ResultElement(ElementTree.Element):
+    """
+    The "result" tag of a result file, but without its runs,
+    which are stored as a list of RunXml instances in the attribute "runs".
+    """
+
+    @staticmethod
+    def create(header, runs):
+        result_elem = _ResultElement(header.tag, header.attrib)
+        result_elem.extend(header)
+        result_elem.runs = runs
+        return result_elem
+
+
 def _get_run_tags_from_xml(result_elem):
-    # Here we keep support for <sourcefile> in order to be able to read old benchmark
-    # results (no reason to forbid this).
-    return result_elem.findall("run") + result_elem.findall("sourcefile")
+    """Return the runs of a "result" tag as RunXml instances."""
+    runs = getattr(result_elem, "runs", None)
+    if runs is None:
+        # Here we keep support for <sourcefile> in order to be able to read old
+        # benchmark results (no reason to forbid this).
+        runs = [
+            RunXml.from_element(run)
+            for run in result_elem.findall("run") + result_elem.findall("sourcefile")
+        ]
+    return runs
 
 
 def load_results(
@@ -601,7 +674,10 @@ def load_result(
     @return a fully ready RunSetResult instance or None
     """
     xml = parse_results_file(
-        result_file, run_set_id=run_set_id, ignore_errors=options.ignore_errors
+        result_file,
+        run_set_id=run_set_id,
+        ignore_errors=options.ignore_errors,
+        use_cache=options.use_cache,
     )
     if xml is None:
         return None
@@ -613,44 +689,49 @@ def load_result(
         all_columns=options.all_columns,
         columns_relevant_for_diff=columns_relevant_for_diff,
     )
-    result.collect_data(options.correct_only)
+    result.collect_data(options.correct_only, options.use_cache)
     return result
 
 
-def parse_results_file(resultFile, run_set_id=None, ignore_errors=False):
+def parse_results_file(
+    resultFile, run_set_id=None, ignore_errors=False, use_cache=False
+):
     """
     This function parses an XML file that contains the results of the execution of a run set.
-    It returns the "result" XML tag.
+    It returns the "result" XML tag, with the runs stored separately as RunXml instances
+    (cf. _get_run_tags_from_xml()).
     @param resultFile: The file name of the XML file that contains the results.
     @param run_set_id: An optional identifier of this set of results.
+    @param use_cache: Whether the content of local files should be cached
+                      (cf. module resultcache).
     """
     logging.info("    %s", resultFile)
-    url = util.make_url(resultFile)
 
-    parse = ElementTree.ElementTree().parse
-    try:
-        with util.open_url_seekable(url, mode="rb") as f:
+    resultElem = None
+    cache_key = None
+    if use_cache and not util.is_url(resultFile):
+        cached = resultcache.load(resultFile)
+        if cached:
+            resultElem = _ResultElement.create(*cached)
+        else:
             try:
-                try:
-                    resultElem = parse(typing.cast(typing.IO, gzip.GzipFile(fileobj=f)))
-                except OSError:
-                    f.seek(0)
-                    resultElem = parse(bz2.BZ2File(f))
+                cache_key = resultcache.get_cache_key(resultFile)
             except OSError:
-                f.seek(0)
-                resultElem = parse(f)
-    except OSError as e:
-        handle_error("Could not read result file %s: %s", resultFile, e)
-    except ElementTree.ParseError as e:
-        handle_error("Result file %s is invalid: %s", resultFile, e)
+                pass  # error will be reported below
 
-    if resultElem.tag not in ["result", "test"]:
-        handle_error(
-            "XML file with benchmark results seems to be invalid.\n"
-            "The root element of the file is not named 'result' or 'test'.\n"
-            "If you want to run a table-definition file,\n"
-            "you should use the option '-x' or '--xml'."
-        )
+    if resultElem is None:
+        resultElem = _read_results_file(resultFile)
+
+        if resultElem.tag not in ["result", "test"]:
+            handle_error(
+                "XML file with benchmark results seems to be invalid.\n"
+                "The root element of the file is not named 'result' or 'test'.\n"
+                "If you want to run a table-definition file,\n"
+                "you should use the option '-x' or '--xml'."
+            )
+
+        if cache_key is not None:
+            resultcache.store(resultFile, cache_key, resultElem, resultElem.runs)
 
     if ignore_errors and "error" in resultElem.attrib:
         logging.warning(
@@ -668,6 +749,50 @@ def parse_results_file(resultFile, run_set_id=None, ignore_errors=False):
     return resultElem
 
 
+def _read_results_file(resultFile):
+    url = util.make_url(resultFile)
+    parse = _parse_results_xml
+    try:
+        with util.open_url_seekable(url, mode="rb") as f:
+            try:
+                try:
+                    return parse(typing.cast(typing.IO, gzip.GzipFile(fileobj=f)))
+                except OSError:
+                    f.seek(0)
+                    return parse(bz2.BZ2File(f))
+            except OSError:
+                f.seek(0)
+                return parse(f)
+    except OSError as e:
+        handle_error("Could not read result file %s: %s", resultFile, e)
+    except ElementTree.ParseError as e:
+        handle_error("Result file %s is invalid: %s", resultFile, e)
+
+
+def _parse_results_xml(file):
+    """
+    Parse a result file incrementally. Each run is converted to a RunXml instance
+    and removed from the XML tree as soon as it was parsed,
+    such that the full tree of large result files is never kept in memory.
+    """
+    runs = []
+    sourcefiles = []
+    depth = 0
+    events = ElementTree.iterparse(file, events=("start", "end"))
+    _event, root = next(events)
+    for event, elem in events:
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 0 and elem.tag in ("run", "sourcefile"):
+            (runs if elem.tag == "run" else sourcefiles).append(
+                RunXml.from_element(elem)
+            )
+            root.remove(elem)
+    return _ResultElement.create(root, runs + sourcefiles)
+
+
 def insert_logfile_names(resultFile, resultElem):
     # get folder of logfiles (truncate end of XML file name and append .logfiles instead)
     log_folder = resultFile[0 : resultFile.rfind(".results.")] + ".logfiles/"
@@ -692,6 +817,9 @@ def insert_logfile_names(resultFile, resultElem):
         else:
             log_file = f"{log_folder}{os.path.basename(sourcefile.get('name'))}.log"
         sourcefile.set("logfile", log_file)
+        if "samples" in sourcefile.attrib:
+            samples_file = urllib.parse.urljoin(resultFile, sourcefile.get("samples"))
+            sourcefile.set("samples", samples_file)
 
 
 def apply_task_list(runset_results, tasks):
@@ -702,6 +830,12 @@ def apply_task_list(runset_results, tasks):
     """
     missing = 0
     for runset in runset_results:
+        if len(runset.results) == len(tasks) and all(
+            run_result.task_id == task
+            for run_result, task in zip(runset.results, tasks)
+        ):
+            continue  # already correct, which is common for identical task lists
+
         # create mapping from id to RunResult object
         dic = {run_result.task_id: run_result for run_result in runset.results}
         assert len(dic) == len(runset.results)
@@ -725,6 +859,105 @@ def apply_task_list(runset_results, tasks):
     return missing
 
 
+def read_logfile_lines(log_file, log_zip_cache):
+    """
+    Return the lines of a log file (or another file next to the log files),
+    which may also be stored in the ZIP archive of the log files.
+    @param log_zip_cache: a dict for caching opened ZIP archives by their URL
+    """
+    if not log_file:
+        return []
+    log_file_url = util.make_url(log_file)
+    url_parts = urllib.parse.urlparse(log_file_url, allow_fragments=False)
+    log_zip_path = os.path.dirname(url_parts.path) + ".zip"
+    log_zip_url = urllib.parse.urlunparse(
+        (
+            url_parts.scheme,
+            url_parts.netloc,
+            log_zip_path,
+            url_parts.params,
+            url_parts.query,
+            url_parts.fragment,
+        )
+    )
+    path_in_zip = urllib.parse.unquote(
+        # os.path.relpath creates os-dependant paths, but windows separators can produce errors with zipfile lib
+        util.fix_path_if_on_windows(
+            os.path.relpath(url_parts.path, os.path.dirname(log_zip_path))
+        )
+    )
+    if log_zip_url.startswith("file:///") and not log_zip_path.startswith("/"):
+        # Replace file:/// with file: for relative paths,
+        # otherwise opening fails.
+        log_zip_url = "file:" + log_zip_url[8:]
+
+    try:
+        if not util.is_url(log_file):
+            return logindex.read_lines(log_file)
+        with util.open_url_seekable(log_file_url, "rt") as logfile:
+            return logfile.readlines()
+    except OSError:
+        try:
+            if log_zip_url not in log_zip_cache:
+                log_zip_cache[log_zip_url] = zipfile.ZipFile(
+                    util.open_url_seekable(log_zip_url, "rb")
+                )
+            log_zip = log_zip_cache[log_zip_url]
+
+            try:
+                with io.TextIOWrapper(log_zip.open(path_in_zip)) as logfile:
+                    return logfile.readlines()
+            except KeyError:
+                logging.warning(
+                    "Could not find logfile '%s' in archive '%s'.",
+                    log_file,
+                    log_zip_url,
+                )
+                return []
+
+        except OSError:
+            logging.warning(
+                "Could not find logfile '%s' nor log archive '%s'.",
+                log_file,
+                log_zip_url,
+            )
+            return []
+
+
+def write_samples_plots(runSetResults, output_dir):
+    """
+    Write a plot of the resource usage over time (as SVG file into output_dir)
+    for each run for which such samples were recorded.
+    @return the number of written plots
+    """
+    log_zip_cache = {}
+    count = 0
+    try:
+        for index, runSetResult in enumerate(runSetResults):
+            for run_result in runSetResult.results:
+                if not run_result.samples_file:
+                    continue
+                header, rows = samplesplot.parse_samples(
+                    read_logfile_lines(run_result.samples_file, log_zip_cache)
+                )
+                if not rows:
+                    continue
+                name = os.path.basename(urllib.parse.unquote(run_result.samples_file))
+                if name.endswith(".samples.csv"):
+                    name = name[: -len(".samples.csv")]
+                run_set_name = runSetResult.attributes.get("niceName")
+                title = f"{run_result.task_id.name} ({run_set_name})"
+                os.makedirs(output_dir, exist_ok=True)
+                plot_file = os.path.join(output_dir, f"{index}.{name}.svg")
+                with open(plot_file, "w") as f:
+                    f.write(samplesplot.create_svg_plot(title, header, rows))
+                count += 1
+    finally:
+        for file in log_zip_cache.values():
+            file.close()
+    return count
+
+
 class RunResult(object):
     """
     The class RunResult contains the results of a single verification run.
@@ -741,12 +974,14 @@ class RunResult(object):
         values,
         columns_relevant_for_diff=set(),
         sourcefiles_exist=True,
+        samples_file=None,
     ):
         assert len(columns) == len(values)
         self.task_id = task_id
         self.sourcefiles_exist = sourcefiles_exist
         self.status = status
         self.log_file = log_file
+        self.samples_file = samples_file
         self.columns = columns
         self.values = values
         self.category = category
@@ -762,69 +997,15 @@ class RunResult(object):
         log_zip_cache,
         columns_relevant_for_diff,
         result_file_or_url,
+        get_log_index=None,
     ):
         """
         This function collects the values from one run.
         Only columns that should be part of the table are collected.
+        @param get_log_index: optional function that returns the LogValueIndex
+            and the name in it for a log file
         """
 
-        def read_logfile_lines(log_file):
-            if not log_file:
-                return []
-            log_file_url = util.make_url(log_file)
-            url_parts = urllib.parse.urlparse(log_file_url, allow_fragments=False)
-            log_zip_path = os.path.dirname(url_parts.path) + ".zip"
-            log_zip_url = urllib.parse.urlunparse(
-                (
-                    url_parts.scheme,
-                    url_parts.netloc,
-                    log_zip_path,
-                    url_parts.params,
-                    url_parts.query,
-                    url_parts.fragment,
-                )
-            )
-            path_in_zip = urllib.parse.unquote(
-                # os.path.relpath creates os-dependant paths, but windows separators can produce errors with zipfile lib
-                util.fix_path_if_on_windows(
-                    os.path.relpath(url_parts.path, os.path.dirname(log_zip_path))
-                )
-            )
-            if log_zip_url.startswith("file:///") and not log_zip_path.startswith("/"):
-                # Replace file:/// with file: for relative paths,
-                # otherwise opening fails.
-                log_zip_url = "file:" + log_zip_url[8:]
-
-            try:
-                with util.open_url_seekable(log_file_url, "rt") as logfile:
-                    return logfile.readlines()
-            except OSError:
-                try:
-                    if log_zip_url not in log_zip_cache:
-                        log_zip_cache[log_zip_url] = zipfile.ZipFile(
-                            util.open_url_seekable(log_zip_url, "rb")
-                        )
-                    log_zip = log_zip_cache[log_zip_url]
-
-                    try:
-                        with io.TextIOWrapper(log_zip.open(path_in_zip)) as logfile:
-                            return logfile.readlines()
-                    except KeyError:
-                        logging.warning(
-                            "Could not find logfile '%s' in archive '%s'.",
-                            log_file,
-                            log_zip_url,
-                        )
-                        return []
-
-                except OSError:
-                    logging.warning(
-                        "Could not find logfile '%s' nor log archive '%s'.",
-                        log_file,
-                        log_zip_url,
-                    )
-                    return []
-
         sourcefiles = sourcefileTag.get("files")
         if sourcefiles:
             if not sourcefiles.startswith("["):
@@ -845,7 +1026,8 @@ class RunResult(object):
             sourcefileTag.get("propertyFile"),
             sourcefileTag.get("expectedVerdict"),
         )
-        witness_category = util.get_column_value(sourcefileTag, "witness-category")
+        column_values = sourcefileTag.get_column_values()
+        witness_category = column_values.get("witness-category")
         task_id = TaskId(
             task_name,
             prop,
@@ -854,8 +1036,8 @@ class RunResult(object):
             sourcefileTag.get("runset"),
         )
 
-        status = util.get_column_value(sourcefileTag, "status", "")
-        category = util.get_column_value(sourcefileTag, "category")
+        status = column_values.get("status", "")
+        category = column_values.get("category")
         if not category:
             if status:  # only category missing
                 category = result.CATEGORY_MISSING
@@ -865,7 +1047,11 @@ class RunResult(object):
         score = None
         if prop:
             score = prop.compute_score(category, status, witness_category)
+        log_file = sourcefileTag.get("logfile")
         logfileLines = None
+        log_index = None
+        if get_log_index and log_file:
+            log_index, log_name = get_log_index(log_file)
 
         values = []
 
@@ -877,13 +1063,18 @@ class RunResult(object):
             elif not correct_only or category == result.CATEGORY_CORRECT:
                 if not column.pattern or column.href:
                     # collect values from XML
-                    value = util.get_column_value(sourcefileTag, column.title)
+                    value = column_values.get(column.title)
+
+                elif log_index and log_index.contains(log_name, column.pattern):
+                    value = log_index.get(log_name, column.pattern)
 
                 else:  # collect values from logfile
                     if logfileLines is None:  # cache content
-                        logfileLines = read_logfile_lines(sourcefileTag.get("logfile"))
+                        logfileLines = read_logfile_lines(log_file, log_zip_cache)
 
                     value = get_value_from_logfile(logfileLines, column.pattern)
+                    if log_index:
+                        log_index.add(log_name, column.pattern, value)
 
             if column.title.lower() == "score" and value is None and score is not None:
                 # If no score column exists in the xml, take the internally computed score,
@@ -901,6 +1092,7 @@ class RunResult(object):
             values,
             columns_relevant_for_diff,
             sourcefiles_exist=sourcefiles_exist,
+            samples_file=sourcefileTag.get("samples"),
         )
 
 
@@ -1146,13 +1338,20 @@ def select_relevant_id_columns(rows):
     return relevant_id_columns
 
 
-def compute_stats(rows, run_set_results, use_local_summary, correct_only):
+def compute_stats(
+    rows,
+    run_set_results,
+    use_local_summary,
+    correct_only,
+    engine=statistics.ENGINE_DECIMAL,
+):
     result_cols = list(rows_to_columns(rows))  # column-wise
     all_column_stats = list(
         parallel.map(
             statistics.get_stats_of_run_set,
             result_cols,
             [correct_only] * len(result_cols),
+            [engine] * len(result_cols),
         )
     )
 
@@ -1265,7 +1464,11 @@ def create_tables(
         # calculate statistics if necessary
         if not options.format == ["csv"]:
             local_data.stats = compute_stats(
-                rows, runSetResults, use_local_summary, options.correct_only
+                rows,
+                runSetResults,
+                use_local_summary,
+                options.correct_only,
+                options.statistics_engine,
             )
 
         for template_format in options.format or DEFAULT_TEMPLATE_FORMATS:
@@ -1497,6 +1700,34 @@ def create_argument_parser():
         dest="all_columns",
         help="Show all columns in tables, including those that are normally hidden.",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_false",
+        dest="use_cache",
+        help="Do not use and create cache files for result files and log archives. "
+        "By default, the content of each result file and the values extracted from "
+        "each archive of log files are cached in a hidden file next to it "
+        "in order to speed up loading it again.",
+    )
+    parser.add_argument(
+        "--statistics-engine",
+        choices=statistics.ENGINES,
+        default=statistics.ENGINE_DECIMAL,
+        help="How statistics of numeric columns are computed: "
+        "with exact decimal arithmetic (default), "
+        "with vectorized operations that are much faster for large tables "
+        "but compute the standard deviation with floating-point precision "
+        "(requires NumPy), or with both for validating the results "
+        "of the latter (differences in the shown precision produce warnings).",
+    )
+    parser.add_argument(
+        "--plot-samples",
+        action="store_true",
+        dest="plot_samples",
+        help="Additionally write a plot of the resource usage over time "
+        "for each run that was executed with benchexec --sample-interval "
+        "(as SVG files in a directory next to the tables).",
+    )
     parser.add_argument(
         "--show",
         action="store_true",
@@ -1584,6 +1815,13 @@ def main(args=None):
 
     arg_parser = create_argument_parser()
     options = arg_parser.parse_args((args or sys.argv)[1:])
+    if (
+        options.statistics_engine != statistics.ENGINE_DECIMAL
+        and statistics.numpy is None
+    ):
+        arg_parser.error(
+            f"Statistics engine '{options.statistics_engine}' requires NumPy."
+        )
 
     setup_process(options)
 
@@ -1716,6 +1954,15 @@ def main(args=None):
         name, runSetResults, rows, rowsDiff, outputPath, outputFilePattern, options
     )
 
+    if options.plot_samples and outputFilePattern != "-":
+        samples_dir = os.path.join(outputPath, name + ".samples")
+        logging.info("Plotting resource usage over time...")
+        plot_count = write_samples_plots(runSetResults, samples_dir)
+        if plot_count:
+            logging.info("Wrote %s plots to %s.", plot_count, samples_dir)
+        else:
+            logging.warning("No samples of resource usage found in results.")
+
     if options.dump_counts:  # print some stats for Buildbot
         print("REGRESSIONS", get_regression_count(rows, options.ignoreFlappingTimeouts))
 
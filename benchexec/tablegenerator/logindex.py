@@ -0,0 +1,161 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Index of the values that were extracted from log files for columns with a pattern.
+
+Extracting such values from logs in a ZIP archive requires decompressing and splitting
+every log file, which dominates the runtime of table-generator for large archives.
+So for each local ZIP archive with log files, table-generator stores the extracted
+values of each log in an index file next to the archive (".<name>.logindex"),
+such that later invocations do not need to read the logs again.
+Values for further patterns are added to the index when they are requested.
+The index is only used if size and modification time of the archive match
+and if the same tool module (with the same file, size, and modification time)
+is used for extracting the values.
+"""
+
+import io
+import json
+import locale
+import logging
+import mmap
+import os
+import sys
+import tempfile
+
+from benchexec import __version__
+
+_INDEX_VERSION = 1
+
+
+def get_index_file(log_zip):
+    directory, name = os.path.split(log_zip)
+    return os.path.join(directory, "." + name + ".logindex")
+
+
+def _get_module_file_key(module_name):
+    """
+    Return a list that identifies the current version of the file of a loaded module,
+    such that changes to user-provided tool-info modules invalidate the index.
+    """
+    module_file = getattr(sys.modules.get(module_name), "__file__", None)
+    if not module_file:
+        return [None, None, None]
+    module_file = os.path.abspath(module_file)
+    try:
+        stat = os.stat(module_file)
+    except OSError:
+        return [module_file, None, None]
+    return [module_file, stat.st_size, stat.st_mtime_ns]
+
+
+def read_lines(log_file):
+    """
+    Read the lines of a local uncompressed log file via mmap,
+    like readlines() on the file opened in text mode.
+    """
+    with open(log_file, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                # decode directly from the mapping without copying it into bytes
+                text = str(content, locale.getpreferredencoding(False))
+        except ValueError:
+            # empty files cannot be mapped
+            return []
+    # StringIO splits lines in universal-newlines mode like text files
+    return io.StringIO(text, newline=None).readlines()
+
+
+class LogValueIndex(object):
+    """
+    The values of column patterns for the log files in one ZIP archive.
+    """
+
+    def __init__(self, log_zip, tool_module):
+        self.log_zip = log_zip
+        stat = os.stat(log_zip)
+        self._key = [
+            _INDEX_VERSION,
+            __version__,
+            tool_module,
+            *_get_module_file_key(tool_module),
+            stat.st_size,
+            stat.st_mtime_ns,
+        ]
+        self._values = self._read()  # pattern -> (name of log in archive -> value)
+        self._changed = False
+
+    def _read(self):
+        """Return the values of the index file, or an empty dict if not usable."""
+        index_file = get_index_file(self.log_zip)
+        try:
+            with open(index_file, "rt") as f:
+                index = json.load(f)
+            if index.get("key") == self._key:
+                return index["values"]
+            else:
+                logging.debug("Log index '%s' is outdated.", index_file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.debug("Could not read log index '%s': %s", index_file, e)
+        return {}
+
+    def contains(self, log_name, pattern):
+        return log_name in self._values.get(pattern, ())
+
+    def get(self, log_name, pattern):
+        """Return the value of a pattern for a log file, which must be present."""
+        return self._values[pattern][log_name]
+
+    def add(self, log_name, pattern, value):
+        values = self._values.get(pattern)
+        if values is None:
+            values = self._values[pattern] = {}
+        values[log_name] = value
+        self._changed = True
+
+    def store(self):
+        """
+        Write the index to its file if it contains new values.
+        Several table-generator processes can use the same archive in parallel
+        (e.g., for different run sets), so values that were stored by others
+        in the meantime are merged into this index before writing it.
+        """
+        if not self._changed:
+            return
+        for pattern, stored_values in self._read().items():
+            values = self._values.get(pattern)
+            if values is None:
+                self._values[pattern] = stored_values
+            else:
+                for log_name, value in stored_values.items():
+                    values.setdefault(log_name, value)
+
+        index_file = get_index_file(self.log_zip)
+        tmp_file = None
+        try:
+            fd, tmp_file = tempfile.mkstemp(
+                prefix=os.path.basename(index_file) + ".",
+                dir=os.path.dirname(index_file) or os.curdir,
+            )
+            with open(fd, "wt") as f:
+                json.dump(
+                    {"key": self._key, "values": self._values},
+                    f,
+                    separators=(",", ":"),
+                )
+            os.replace(tmp_file, index_file)
+            self._changed = False
+        except OSError as e:
+            logging.debug("Could not write log index '%s': %s", index_file, e)
+            if tmp_file:
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
@@ -0,0 +1,156 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Cache for the content of result files in a columnar format.
+
+Decompressing and parsing large result files is the most expensive part of loading
+them, so table-generator stores the content of each local result file in a cache file
+next to it (".<name>.tablecache"). The cache contains the attributes and column values
+of all runs as one list per attribute or column, which can be loaded much faster
+than the XML file. It is only used if the size and the modification time of the result
+file match.
+"""
+
+import collections
+import json
+import logging
+import os
+import tempfile
+from xml.etree import ElementTree
+
+from benchexec.tablegenerator import util
+
+_CACHE_VERSION = 1
+_RUN_TAGS = ["run", "sourcefile"]
+
+
+def get_cache_file(result_file):
+    directory, name = os.path.split(result_file)
+    return os.path.join(directory, "." + name + ".tablecache")
+
+
+def get_cache_key(result_file):
+    """
+    Return the key that identifies the current content of the given result file,
+    this needs to be determined before reading the file.
+    """
+    stat = os.stat(result_file)
+    return [_CACHE_VERSION, stat.st_size, stat.st_mtime_ns]
+
+
+def load(result_file):
+    """
+    Load the cached content of the given result file.
+    @return: a tuple of the "result" tag without runs and the list of runs
+        (as RunXml instances), or None if no valid cache exists
+    """
+    cache_file = get_cache_file(result_file)
+    try:
+        key = get_cache_key(result_file)
+        with open(cache_file, "rt") as f:
+            cache = json.load(f)
+        if cache.get("key") != key:
+            logging.debug("Cache '%s' is outdated.", cache_file)
+            return None
+        return _from_data(cache["data"])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logging.debug("Could not read cache '%s': %s", cache_file, e)
+        return None
+
+
+def store(result_file, key, header, runs):
+    """
+    Store the content of the given result file in its cache, if possible.
+    @param key: the result of get_cache_key() before the result file was read
+    @param header: the "result" tag without runs
+    @param runs: the runs of the result file as RunXml instances
+    """
+    data = _to_data(header, runs)
+    if data is None:
+        logging.debug("Content of '%s' cannot be cached.", result_file)
+        return
+    cache_file = get_cache_file(result_file)
+    tmp_file = None
+    try:
+        # unique name because several processes may store the same cache
+        fd, tmp_file = tempfile.mkstemp(
+            prefix=os.path.basename(cache_file) + ".",
+            dir=os.path.dirname(cache_file) or os.curdir,
+        )
+        with open(fd, "wt") as f:
+            json.dump({"key": key, "data": data}, f, separators=(",", ":"))
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        logging.debug("Could not write cache '%s': %s", cache_file, e)
+        if tmp_file:
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+
+
+def _to_data(header, all_runs):
+    """Convert the content of a result file to a JSON-compatible columnar format."""
+    data = {"header": ElementTree.tostring(header, encoding="unicode")}
+
+    for tag in _RUN_TAGS:
+        runs = [run for run in all_runs if run.tag == tag]
+        attributes = {}
+        columns = {}  # (occurrence, attributes except value) -> list of values
+        for i, run in enumerate(runs):
+            for name, value in run.attrib.items():
+                if name not in attributes:
+                    attributes[name] = [None] * len(runs)
+                attributes[name][i] = value
+
+            occurrences = collections.Counter()  # title -> count
+            for column in run.columns:
+                if "value" not in column:
+                    # cannot be represented in columnar format
+                    return None
+                # Titles can occur several times in a run, and lookups return the
+                # first column with a given title, so we need to keep their order.
+                title = column.get("title")
+                column_key = (
+                    occurrences[title],
+                    tuple(sorted(a for a in column.items() if a[0] != "value")),
+                )
+                occurrences[title] += 1
+                if column_key not in columns:
+                    columns[column_key] = [None] * len(runs)
+                columns[column_key][i] = column["value"]
+
+        data[tag] = {
+            "count": len(runs),
+            "attributes": attributes,
+            "columns": [
+                [dict(key[1]), values]
+                for key, values in sorted(columns.items(), key=lambda c: c[0][0])
+            ],
+        }
+    return data
+
+
+def _from_data(data):
+    """Create the content of a result file from the data created by _to_data()."""
+    header = ElementTree.fromstring(data["header"])
+    all_runs = []
+    for tag in _RUN_TAGS:
+        runs = [util.RunXml(tag, {}, []) for _ in range(data[tag]["count"])]
+        for name, values in data[tag]["attributes"].items():
+            for run, value in zip(runs, values):
+                if value is not None:
+                    run.attrib[name] = value
+        for column_attrib, values in data[tag]["columns"]:
+            for run, value in zip(runs, values):
+                if value is not None:
+                    run.columns.append(dict(column_attrib, value=value))
+        all_runs.extend(runs)
+    return header, all_runs
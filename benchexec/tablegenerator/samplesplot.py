@@ -0,0 +1,117 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Plots of the resource usage of a run over time,
+as recorded by benchexec with --sample-interval.
+The plots are simple SVG images with one chart per measured value
+such that no further dependencies are necessary.
+"""
+
+import csv
+from xml.sax.saxutils import escape
+
+_WIDTH = 800
+_CHART_HEIGHT = 100
+_MARGIN = 20
+_TITLE_HEIGHT = 30
+_LABEL_HEIGHT = 20
+_COLOR = "#1f77b4"
+
+_UNITS = {
+    "cputime": "s",
+    "memory": "B",
+    "blkio-read": "B",
+    "blkio-write": "B",
+    "pressure-cpu-some": "s",
+    "pressure-memory-some": "s",
+    "pressure-io-some": "s",
+}
+
+
+def parse_samples(lines):
+    """
+    Parse the lines of a CSV file with samples.
+    @return the list of column titles and the list of rows with float values
+        (None for missing values)
+    """
+    reader = csv.reader(lines)
+    header = next(reader, [])
+    rows = []
+    for row in reader:
+        if len(row) != len(header):
+            continue  # incomplete last line if the run was aborted
+        try:
+            rows.append([float(value) if value else None for value in row])
+        except ValueError:
+            continue
+    return header, rows
+
+
+def _format_value(value, unit):
+    if unit == "B":
+        for factor, prefix in [(1e9, "G"), (1e6, "M"), (1e3, "k")]:
+            if value >= factor:
+                return f"{value / factor:.1f} {prefix}B"
+        return f"{value:.0f} B"
+    return f"{value:.2f} {unit}".rstrip()
+
+
+def create_svg_plot(title, header, rows):
+    """
+    Create an SVG image with one chart for each column (except the first one,
+    which is the time) that shows the values over time.
+    @return the SVG document as string
+    """
+    times = [row[0] for row in rows]
+    max_time = max(times, default=0) or 1
+    chart_width = _WIDTH - 2 * _MARGIN
+    height = _TITLE_HEIGHT + (len(header) - 1) * (_LABEL_HEIGHT + _CHART_HEIGHT)
+    height += _LABEL_HEIGHT + _MARGIN
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_WIDTH}" '
+        f'height="{height}" font-family="sans-serif" font-size="12">',
+        f'<text x="{_MARGIN}" y="{_TITLE_HEIGHT - 10}" font-size="14" '
+        f'font-weight="bold">{escape(title)}</text>',
+    ]
+    y = _TITLE_HEIGHT
+    for index, column in enumerate(header[1:], 1):
+        unit = _UNITS.get(column, "")
+        points = [
+            (t, row[index]) for t, row in zip(times, rows) if row[index] is not None
+        ]
+        max_value = max((value for _, value in points), default=0)
+        label = column
+        if points:
+            label += f" (max. {_format_value(max_value, unit)})"
+        parts.append(
+            f'<text x="{_MARGIN}" y="{y + _LABEL_HEIGHT - 5}">{escape(label)}</text>'
+        )
+        y += _LABEL_HEIGHT
+        parts.append(
+            f'<rect x="{_MARGIN}" y="{y}" width="{chart_width}" '
+            f'height="{_CHART_HEIGHT}" fill="none" stroke="#ccc"/>'
+        )
+        scale = _CHART_HEIGHT / (max_value or 1)
+        coordinates = " ".join(
+            f"{_MARGIN + t / max_time * chart_width:.1f},"
+            f"{y + _CHART_HEIGHT - value * scale:.1f}"
+            for t, value in points
+        )
+        parts.append(
+            f'<polyline points="{coordinates}" fill="none" stroke="{_COLOR}"/>'
+        )
+        y += _CHART_HEIGHT
+
+    parts.append(f'<text x="{_MARGIN}" y="{y + _LABEL_HEIGHT - 5}">0 s</text>')
+    parts.append(
+        f'<text x="{_WIDTH - _MARGIN}" y="{y + _LABEL_HEIGHT - 5}" '
+        f'text-anchor="end">{max(times, default=0):.1f} s (wall time)</text>'
+    )
+    parts.append("</svg>")
+    return "\n".join(parts) + "\n"
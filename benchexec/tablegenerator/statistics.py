@@ -9,15 +9,83 @@ import collections
 import decimal
 from decimal import Decimal, InvalidOperation
 import itertools
+import logging
+import string
+import warnings
 
 from benchexec import result
 from benchexec.tablegenerator import util
 from benchexec.tablegenerator.columns import ColumnType
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 nan = Decimal("nan")
 inf = Decimal("inf")
 
+ENGINE_DECIMAL = "decimal"
+"""Compute all statistics with Decimal values (default)."""
+ENGINE_NUMPY = "numpy"
+"""Compute statistics of numeric columns with vectorized operations (needs NumPy)."""
+ENGINE_VALIDATE = "validate"
+"""Use both engines and warn if their results differ in the shown precision."""
+ENGINES = [ENGINE_DECIMAL, ENGINE_NUMPY, ENGINE_VALIDATE]
+
+# Fields of ColumnStatistics for numeric columns and the pairs of
+# (category, result classification) of the runs that they consider
+_CATEGORY_FIELDS = [
+    (
+        "correct",
+        [
+            (result.CATEGORY_CORRECT, result.RESULT_CLASS_TRUE),
+            (result.CATEGORY_CORRECT, result.RESULT_CLASS_FALSE),
+        ],
+    ),
+    ("correct_true", [(result.CATEGORY_CORRECT, result.RESULT_CLASS_TRUE)]),
+    ("correct_false", [(result.CATEGORY_CORRECT, result.RESULT_CLASS_FALSE)]),
+    (
+        "correct_unconfirmed",
+        [
+            (result.CATEGORY_CORRECT_UNCONFIRMED, result.RESULT_CLASS_TRUE),
+            (result.CATEGORY_CORRECT_UNCONFIRMED, result.RESULT_CLASS_FALSE),
+        ],
+    ),
+    (
+        "correct_unconfirmed_true",
+        [(result.CATEGORY_CORRECT_UNCONFIRMED, result.RESULT_CLASS_TRUE)],
+    ),
+    (
+        "correct_unconfirmed_false",
+        [(result.CATEGORY_CORRECT_UNCONFIRMED, result.RESULT_CLASS_FALSE)],
+    ),
+    (
+        "wrong",
+        [
+            (result.CATEGORY_WRONG, result.RESULT_CLASS_TRUE),
+            (result.CATEGORY_WRONG, result.RESULT_CLASS_FALSE),
+        ],
+    ),
+    ("wrong_true", [(result.CATEGORY_WRONG, result.RESULT_CLASS_TRUE)]),
+    ("wrong_false", [(result.CATEGORY_WRONG, result.RESULT_CLASS_FALSE)]),
+]
+
+# Values that util.to_decimal() handles specially, and characters of units
+_SPECIAL_NUMBERS = ["nan", "inf", "+inf", "-inf"]
+_UNIT_CHARACTERS = string.ascii_letters + string.whitespace + "%"
+
+# Format targets with which the attributes of StatValue are shown in HTML tables
+_STAT_VALUE_FORMAT_TARGETS = [
+    ("sum", "html_cell"),
+    ("min", "tooltip"),
+    ("max", "tooltip"),
+    ("avg", "tooltip"),
+    ("median", "tooltip"),
+    ("stdev", "tooltip_stochastic"),
+]
+
 
 class ColumnStatistics(object):
     _fields = frozenset(
@@ -116,14 +184,30 @@ class StatValue(object):
         )
 
 
-def get_stats_of_run_set(runResults, correct_only):
+def get_stats_of_run_set(runResults, correct_only, engine=ENGINE_DECIMAL):
     """
     This function returns the numbers of the statistics.
     @param runResults: All the results of the execution of one run set (as list of RunResult objects)
+    @param engine: How statistics of numeric columns are computed (one of ENGINES)
     """
     columns = runResults[0].columns
     status_list = [(runResult.category, runResult.status) for runResult in runResults]
 
+    if engine != ENGINE_DECIMAL:
+        numeric_columns = [
+            index
+            for index, column in enumerate(columns)
+            if column.type.type not in [ColumnType.status, ColumnType.text]
+        ]
+        vectorized_stats = dict(
+            zip(
+                numeric_columns,
+                _get_stats_of_number_columns_vectorized(
+                    runResults, numeric_columns, correct_only
+                ),
+            )
+        )
+
     # collect some statistics
     stats = []
     for index, column in enumerate(columns):
@@ -136,10 +220,15 @@ def get_stats_of_run_set(runResults, correct_only):
 
         else:
             assert column.is_numeric()
-            values = (run_result.values[index] for run_result in runResults)
-            column_stats = _get_stats_of_number_column(
-                values, status_list, correct_only
-            )
+            if engine == ENGINE_NUMPY:
+                column_stats = vectorized_stats[index]
+            else:
+                values = (run_result.values[index] for run_result in runResults)
+                column_stats = _get_stats_of_number_column(
+                    values, status_list, correct_only
+                )
+                if engine == ENGINE_VALIDATE:
+                    _validate_stats(column, column_stats, vectorized_stats[index])
 
         stats.append(column_stats)
 
@@ -201,6 +290,240 @@ def _get_stats_of_number_column(values, categoryList, correct_only):
     return stats
 
 
+def _get_stats_of_number_columns_vectorized(run_results, column_indices, correct_only):
+    """
+    Compute the same statistics as _get_stats_of_number_column for several columns,
+    but with batched operations on NumPy arrays that contain the values of all
+    given columns and are created only once.
+    Minimum, maximum, and median are taken from the original values, and the sum
+    is rounded to the precision of the original values, so only the standard
+    deviation is affected by floating-point imprecision.
+    @return: a list with one ColumnStatistics instance per given column
+    """
+    shape = (len(run_results), len(column_indices))
+    values = numpy.empty(shape, dtype=numpy.float64)
+    present = numpy.empty(shape, dtype=bool)
+    exponents = numpy.empty(shape, dtype=numpy.int64)
+    for column, index in enumerate(column_indices):
+        column_values = [run_result.values[index] for run_result in run_results]
+        parsed = _parse_numbers_vectorized(column_values)
+        if parsed is None:
+            parsed = _parse_numbers(column_values)
+        values[:, column], present[:, column], exponents[:, column] = parsed
+    is_nan = numpy.isnan(values) & present
+
+    # one code per run for its pair of category and result classification
+    category_codes = {}
+    run_categories = numpy.array(
+        [
+            (
+                -1
+                if run_result.status is None
+                else category_codes.setdefault(
+                    (
+                        run_result.category,
+                        result.get_result_classification(run_result.status),
+                    ),
+                    len(category_codes),
+                )
+            )
+            for run_result in run_results
+        ],
+        dtype=numpy.int64,
+    )
+
+    all_stats = [ColumnStatistics() for _ in column_indices]
+    field_masks = [("total", numpy.ones(len(run_results), dtype=bool))]
+    for field, keys in _CATEGORY_FIELDS:
+        if correct_only and field.startswith("wrong"):
+            continue
+        codes = [category_codes[key] for key in keys if key in category_codes]
+        field_masks.append((field, numpy.isin(run_categories, codes)))
+
+    def get_decimal(row, column):
+        return util.to_decimal(run_results[row].values[column_indices[column]])
+
+    for field, mask in field_masks:
+        stat_values = _get_stat_values_vectorized(
+            get_decimal,
+            numpy.flatnonzero(mask),
+            values[mask],
+            present[mask],
+            is_nan[mask],
+            exponents[mask],
+        )
+        for stats, stat_value in zip(all_stats, stat_values):
+            setattr(stats, field, stat_value)
+    return all_stats
+
+
+def _parse_numbers(values):
+    """
+    Convert the values of a column like util.to_decimal() into a float array
+    (NaN for missing values), a bool array that marks present values,
+    and an array with the exponents of the finite values.
+    """
+    decimals = [util.to_decimal(value) for value in values]
+    return (
+        [numpy.nan if value is None else float(value) for value in decimals],
+        [value is not None for value in decimals],
+        [
+            value.as_tuple().exponent if value is not None and value.is_finite() else 0
+            for value in decimals
+        ],
+    )
+
+
+def _parse_numbers_vectorized(values):
+    """
+    Same as _parse_numbers(), but with batched string operations,
+    which support only the common cases (e.g., no exponential notation).
+    @return: the same as _parse_numbers(), or None if not supported for these values
+    """
+    if not all(value is None or isinstance(value, str) for value in values):
+        return None
+    strings = numpy.char.strip(
+        numpy.array(["" if value is None else value for value in values], dtype=str)
+    )
+    lower = numpy.char.lower(strings)
+    special = numpy.isin(lower, _SPECIAL_NUMBERS)
+    # remove unit and also special values, those are parsed by NumPy from lower
+    numbers = numpy.char.rstrip(strings, _UNIT_CHARACTERS)
+    if numpy.char.count(numbers, "e").any() or numpy.char.count(numbers, "E").any():
+        return None
+    present = special | (numbers != "")
+    try:
+        floats = numpy.where(
+            special, lower, numpy.where(present, numbers, "nan")
+        ).astype(numpy.float64)
+    except ValueError:
+        return None
+    # number of digits after the decimal point, if any
+    decimal_point = numpy.char.rfind(numbers, ".")
+    exponents = numpy.where(
+        (decimal_point >= 0) & ~special,
+        decimal_point + 1 - numpy.char.str_len(numbers),
+        0,
+    )
+    return floats, present, exponents
+
+
+def _get_stat_values_vectorized(get_decimal, rows, values, present, is_nan, exponents):
+    """
+    Compute StatValue instances for all columns of the given subset of runs,
+    like StatValue.from_list().
+    @param get_decimal: function that returns the original Decimal value
+        for a given run and column
+    @param rows: the indices of the runs in the subset
+    @param values: the float values of the runs in the subset (NaN if missing)
+    """
+    counts = present.sum(axis=0)
+    has_nan = is_nan.any(axis=0)
+    # sort order with missing values last
+    order = numpy.argsort(values, axis=0, kind="stable")
+    with warnings.catch_warnings():
+        # for columns without values
+        warnings.simplefilter("ignore", RuntimeWarning)
+        sums = numpy.nansum(values, axis=0)
+        variances = numpy.nanvar(values, axis=0)
+    # sum() starts with 0, so the exponent of the sum is at most 0
+    exponents = numpy.where(present, exponents, 0).min(axis=0, initial=0)
+
+    stat_values = []
+    for column in range(values.shape[1]):
+        count = int(counts[column])
+        if has_nan[column]:
+            stat_values.append(StatValue(nan, nan, nan, nan, nan, nan))
+            continue
+        if not count:
+            stat_values.append(None)
+            continue
+
+        sorted_rows = rows[order[:count, column]]
+        min_value = get_decimal(sorted_rows[0], column)
+        max_value = get_decimal(sorted_rows[-1], column)
+
+        if min_value == -inf and max_value == +inf:
+            values_sum = nan
+            mean = nan
+            stdev = nan
+        elif max_value == inf:
+            values_sum = inf
+            mean = inf
+            stdev = inf
+        elif min_value == -inf:
+            values_sum = -inf
+            mean = -inf
+            stdev = inf
+        else:
+            values_sum = Decimal(repr(float(sums[column]))).quantize(
+                Decimal(1).scaleb(int(exponents[column]))
+            )
+            mean = values_sum / count
+            # Scaling as in StatValue.from_list()
+            stdev = (
+                Decimal(0).scaleb(-decimal.getcontext().prec)
+                + Decimal(repr(float(variances[column])))
+            ).sqrt()
+
+        half, len_is_odd = divmod(count, 2)
+        if len_is_odd:
+            median = get_decimal(sorted_rows[half], column)
+        else:
+            median = (
+                get_decimal(sorted_rows[half - 1], column)
+                + get_decimal(sorted_rows[half], column)
+            ) / Decimal(2)
+
+        stat_values.append(
+            StatValue(
+                values_sum,
+                min=min_value,
+                max=max_value,
+                avg=mean,
+                median=median,
+                stdev=stdev,
+            )
+        )
+    return stat_values
+
+
+def _validate_stats(column, expected_stats, actual_stats):
+    """
+    Warn if the statistics of the vectorized engine differ from the expected ones
+    in the precision in which they are shown.
+    """
+    for field in sorted(ColumnStatistics._fields):
+        expected = getattr(expected_stats, field)
+        actual = getattr(actual_stats, field)
+        if expected is None or actual is None:
+            if expected is not actual:
+                logging.warning(
+                    "Statistics engines disagree for %s of column %s: %s vs. %s",
+                    field,
+                    column.title,
+                    expected,
+                    actual,
+                )
+            continue
+        for attribute, format_target in _STAT_VALUE_FORMAT_TARGETS:
+            expected_value = column.format_value(
+                getattr(expected, attribute), format_target
+            )
+            actual_value = column.format_value(
+                getattr(actual, attribute), format_target
+            )
+            if expected_value != actual_value:
+                logging.warning(
+                    "Statistics engines disagree for %s of %s of column %s: %s vs. %s",
+                    attribute,
+                    field,
+                    column.title,
+                    expected_value,
+                    actual_value,
+                )
+
+
 def _get_stats_of_status_column(run_results, col):
     stats = ColumnStatistics()
     stats.score = StatValue(sum(run_result.score or 0 for run_result in run_results))
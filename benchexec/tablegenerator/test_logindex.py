@@ -0,0 +1,122 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import tempfile
+import types
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from benchexec.tablegenerator import logindex
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+LOG_NAME = "test.logfiles/run.log"
+
+
+class TestLogIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.log_zip = os.path.join(self.tmp_dir.name, "test.logfiles.zip")
+        with zipfile.ZipFile(self.log_zip, "w") as log_zip:
+            log_zip.writestr(LOG_NAME, "Value: 1\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_empty(self):
+        index = logindex.LogValueIndex(self.log_zip, "tool")
+        self.assertFalse(index.contains(LOG_NAME, "Value"))
+        index.store()
+        self.assertFalse(os.path.exists(logindex.get_index_file(self.log_zip)))
+
+    def test_roundtrip(self):
+        index = logindex.LogValueIndex(self.log_zip, "tool")
+        index.add(LOG_NAME, "Value", "1")
+        index.add(LOG_NAME, "Other", None)
+        index.store()
+
+        index = logindex.LogValueIndex(self.log_zip, "tool")
+        self.assertTrue(index.contains(LOG_NAME, "Value"))
+        self.assertEqual(index.get(LOG_NAME, "Value"), "1")
+        self.assertTrue(index.contains(LOG_NAME, "Other"))
+        self.assertIsNone(index.get(LOG_NAME, "Other"))
+        self.assertFalse(index.contains("other.log", "Value"))
+
+    def test_parallel_store(self):
+        index1 = logindex.LogValueIndex(self.log_zip, "tool")
+        index2 = logindex.LogValueIndex(self.log_zip, "tool")
+        index1.add(LOG_NAME, "Value", "1")
+        index2.add(LOG_NAME, "Other", "2")
+        index2.add("other.log", "Value", "3")
+        index1.store()
+        index2.store()
+
+        index = logindex.LogValueIndex(self.log_zip, "tool")
+        self.assertEqual(index.get(LOG_NAME, "Value"), "1")
+        self.assertEqual(index.get(LOG_NAME, "Other"), "2")
+        self.assertEqual(index.get("other.log", "Value"), "3")
+        self.assertEqual(
+            [os.path.basename(logindex.get_index_file(self.log_zip))],
+            [name for name in os.listdir(self.tmp_dir.name) if name.startswith(".")],
+        )
+
+    def test_other_tool(self):
+        index = logindex.LogValueIndex(self.log_zip, "tool")
+        index.add(LOG_NAME, "Value", "1")
+        index.store()
+        index = logindex.LogValueIndex(self.log_zip, "other_tool")
+        self.assertFalse(index.contains(LOG_NAME, "Value"))
+
+    def test_changed_tool_module(self):
+        module_file = os.path.join(self.tmp_dir.name, "tool.py")
+        with open(module_file, "w") as f:
+            f.write("# version 1\n")
+        module = types.ModuleType("tool")
+        module.__file__ = module_file
+        with patch.dict(sys.modules, {"tool": module}):
+            index = logindex.LogValueIndex(self.log_zip, "tool")
+            index.add(LOG_NAME, "Value", "1")
+            index.store()
+            index = logindex.LogValueIndex(self.log_zip, "tool")
+            self.assertTrue(index.contains(LOG_NAME, "Value"))
+
+            with open(module_file, "w") as f:
+                f.write("# version 2\n")
+            os.utime(module_file, ns=(0, 0))
+            index = logindex.LogValueIndex(self.log_zip, "tool")
+            self.assertFalse(index.contains(LOG_NAME, "Value"))
+
+    def test_outdated_index(self):
+        index = logindex.LogValueIndex(self.log_zip, "tool")
+        index.add(LOG_NAME, "Value", "1")
+        index.store()
+        with zipfile.ZipFile(self.log_zip, "a") as log_zip:
+            log_zip.writestr("test.logfiles/other.log", "")
+        index = logindex.LogValueIndex(self.log_zip, "tool")
+        self.assertFalse(index.contains(LOG_NAME, "Value"))
+
+
+class TestReadLines(unittest.TestCase):
+    def check_read_lines(self, content):
+        with tempfile.NamedTemporaryFile(prefix="BenchExec_test_") as log_file:
+            log_file.write(content)
+            log_file.flush()
+            with open(log_file.name, "rt") as f:
+                expected = f.readlines()
+            self.assertEqual(logindex.read_lines(log_file.name), expected)
+
+    def test_empty(self):
+        self.check_read_lines(b"")
+
+    def test_lines(self):
+        self.check_read_lines(b"a\nb\n\nc")
+
+    def test_line_endings(self):
+        self.check_read_lines(b"a\r\nb\rc\n\x0cd\n")
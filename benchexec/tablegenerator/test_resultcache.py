@@ -0,0 +1,104 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import tempfile
+import unittest
+from xml.etree import ElementTree
+
+from benchexec.tablegenerator import resultcache
+from benchexec.tablegenerator.util import RunXml
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+RESULT_XML = """<result tool="tool" name="test">
+  <columns><column title="status"/></columns>
+  <systeminfo hostname="host"><os name="Linux"/></systeminfo>
+  <run name="a" files="[a]">
+    <column title="status" value="true"/>
+    <column title="cputime" value="1.5s"/>
+    <column hidden="true" title="cputime" value="1.6s"/>
+  </run>
+  <run name="b" files="[b]" properties="unreach-call">
+    <column hidden="true" title="cputime" value="2.6s"/>
+    <column title="cputime" value="2.5s"/>
+    <column title="category" value="correct"/>
+  </run>
+  <sourcefile name="c"><column title="status" value="false"/></sourcefile>
+  <column title="cputime" value="4s"/>
+</result>"""
+
+
+def to_list(elem):
+    return (elem.tag, elem.attrib, [to_list(child) for child in elem])
+
+
+class TestResultCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.result_file = os.path.join(self.tmp_dir.name, "test.results.xml")
+        self.cache_file = resultcache.get_cache_file(self.result_file)
+        with open(self.result_file, "w") as f:
+            f.write(RESULT_XML)
+        self.header = ElementTree.fromstring(RESULT_XML)
+        self.runs = []
+        for tag in ["run", "sourcefile"]:
+            for run in self.header.findall(tag):
+                self.runs.append(RunXml.from_element(run))
+                self.header.remove(run)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def store(self):
+        key = resultcache.get_cache_key(self.result_file)
+        resultcache.store(self.result_file, key, self.header, self.runs)
+
+    def test_no_cache(self):
+        self.assertIsNone(resultcache.load(self.result_file))
+
+    def test_roundtrip(self):
+        self.store()
+        self.assertTrue(
+            os.path.basename(resultcache.get_cache_file(self.result_file)).startswith(
+                "."
+            )
+        )
+        self.assertCountEqual(
+            os.listdir(self.tmp_dir.name),
+            map(os.path.basename, [self.result_file, self.cache_file]),
+        )
+        cached_header, cached_runs = resultcache.load(self.result_file)
+
+        self.assertEqual(to_list(cached_header), to_list(self.header))
+        self.assertEqual(len(cached_runs), len(self.runs))
+        for cached_run, run in zip(cached_runs, self.runs):
+            self.assertEqual(cached_run.tag, run.tag)
+            self.assertEqual(cached_run.attrib, run.attrib)
+            # order of columns may differ, but first column of each title not
+            self.assertCountEqual(
+                map(sorted, map(dict.items, cached_run.columns)),
+                map(sorted, map(dict.items, run.columns)),
+            )
+            self.assertEqual(cached_run.get_column_values(), run.get_column_values())
+
+    def test_outdated_cache(self):
+        self.store()
+        with open(self.result_file, "a") as f:
+            f.write("\n")
+        self.assertIsNone(resultcache.load(self.result_file))
+
+    def test_unsupported_content(self):
+        self.runs[0].columns.append({"title": "novalue"})
+        self.store()
+        self.assertFalse(os.path.exists(resultcache.get_cache_file(self.result_file)))
@@ -0,0 +1,55 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import sys
+import unittest
+from xml.etree import ElementTree
+
+from benchexec.tablegenerator import samplesplot
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+SAMPLES = [
+    "walltime,cputime,memory\n",
+    "0.000000,0.000000,1000\n",
+    "1.000000,0.500000,\n",
+    "2.000000,1.500000,3000000\n",
+    "3.000000,2.0",  # incomplete line of aborted run
+]
+
+
+class TestSamplesPlot(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+
+    def test_parse_samples(self):
+        header, rows = samplesplot.parse_samples(SAMPLES)
+        self.assertListEqual(header, ["walltime", "cputime", "memory"])
+        self.assertListEqual(rows, [[0, 0, 1000], [1, 0.5, None], [2, 1.5, 3000000]])
+
+    def test_parse_empty(self):
+        self.assertEqual(samplesplot.parse_samples([]), ([], []))
+
+    def test_svg_plot(self):
+        header, rows = samplesplot.parse_samples(SAMPLES)
+        svg = ElementTree.fromstring(
+            samplesplot.create_svg_plot("task <1>", header, rows)
+        )
+        ns = "{http://www.w3.org/2000/svg}"
+        texts = [text.text for text in svg.iter(ns + "text")]
+        self.assertIn("task <1>", texts)
+        self.assertIn("cputime (max. 1.50 s)", texts)
+        self.assertIn("memory (max. 3.0 MB)", texts)
+
+        polylines = list(svg.iter(ns + "polyline"))
+        self.assertEqual(len(polylines), 2)
+        self.assertEqual(
+            polylines[0].get("points"), "20.0,150.0 400.0,116.7 780.0,50.0"
+        )
+        self.assertEqual(len(polylines[1].get("points").split()), 2)
@@ -0,0 +1,128 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import sys
+import types
+import unittest
+
+from benchexec import result
+from benchexec.tablegenerator import statistics
+from benchexec.tablegenerator.columns import Column
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+RUNS = [
+    # status, category, values of columns
+    ("true", result.CATEGORY_CORRECT, ["1.5s", "10", "1.50"]),
+    ("false", result.CATEGORY_CORRECT, ["2.25s", "20", None]),
+    ("true", result.CATEGORY_WRONG, ["0.125s", "30", "2"]),
+    ("TIMEOUT", result.CATEGORY_ERROR, ["900s", None, "3"]),
+    ("false", result.CATEGORY_CORRECT_UNCONFIRMED, ["7s", "-5", "4"]),
+    (None, "aborted", [None, None, None]),
+    ("true", result.CATEGORY_CORRECT, ["0.5s", "nan", "inf"]),
+]
+
+
+@unittest.skipIf(statistics.numpy is None, "NumPy is not available")
+class TestStatisticsEngines(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+
+    def create_run_results(self, runs):
+        columns = [Column("status")] + [
+            Column(title) for title in ["cputime", "count", "mixed"]
+        ]
+        run_results = [
+            types.SimpleNamespace(
+                status=status,
+                category=category,
+                columns=columns,
+                values=[status] + values,
+                score=None,
+            )
+            for status, category, values in runs
+        ]
+        for index, column in enumerate(columns):
+            column.set_column_type_from(run.values[index] for run in run_results)
+        return run_results
+
+    def assertEqualStats(self, expected_stats, actual_stats):
+        self.assertEqual(len(expected_stats), len(actual_stats))
+        for expected_column, actual_column in zip(expected_stats, actual_stats):
+            if expected_column is None:  # text column
+                self.assertIsNone(actual_column)
+                continue
+            for field in sorted(statistics.ColumnStatistics._fields):
+                expected = getattr(expected_column, field)
+                actual = getattr(actual_column, field)
+                if expected is None:
+                    self.assertIsNone(actual, field)
+                    continue
+                for attribute in ["sum", "min", "max", "avg", "median"]:
+                    self.assertEqual(
+                        str(getattr(expected, attribute)),
+                        str(getattr(actual, attribute)),
+                        f"{attribute} of {field}",
+                    )
+                if expected.stdev is not None and expected.stdev.is_finite():
+                    self.assertAlmostEqual(
+                        float(expected.stdev), float(actual.stdev), msg=field
+                    )
+                else:
+                    self.assertEqual(str(expected.stdev), str(actual.stdev), field)
+
+    def check_engines(self, runs, correct_only=False):
+        run_results = self.create_run_results(runs)
+        expected = statistics.get_stats_of_run_set(
+            run_results, correct_only, statistics.ENGINE_DECIMAL
+        )
+        actual = statistics.get_stats_of_run_set(
+            run_results, correct_only, statistics.ENGINE_NUMPY
+        )
+        self.assertEqualStats(expected, actual)
+
+    def test_engines_equal(self):
+        self.check_engines(RUNS)
+
+    def test_engines_equal_correct_only(self):
+        self.check_engines(RUNS, correct_only=True)
+
+    def test_engines_equal_without_special_values(self):
+        self.check_engines(RUNS[:-1])
+
+    def test_engines_equal_infinity(self):
+        runs = [
+            ("true", result.CATEGORY_CORRECT, ["1s", "-inf", "inf"]),
+            ("true", result.CATEGORY_CORRECT, ["2s", "5", "INF"]),
+            ("false", result.CATEGORY_CORRECT, ["3s", "inf", "1"]),
+            ("false", result.CATEGORY_WRONG, ["4s", "-inf", "1"]),
+        ]
+        self.check_engines(runs)
+
+    def test_parse_numbers(self):
+        values = ["1.50s", " 2 ", None, "", "-3.125", "NaN", "-inf", "5.", "10%"]
+        expected = statistics._parse_numbers(values)
+        actual = statistics._parse_numbers_vectorized(values)
+        self.assertEqual(
+            [str(v) for v in expected[0]], [str(v) for v in actual[0].tolist()]
+        )
+        self.assertEqual(expected[1], actual[1].tolist())
+        self.assertEqual(expected[2], actual[2].tolist())
+
+    def test_parse_numbers_unsupported(self):
+        self.assertIsNone(statistics._parse_numbers_vectorized(["1e3"]))
+        self.assertIsNone(statistics._parse_numbers_vectorized(["1,5"]))
+
+    def test_validate(self):
+        run_results = self.create_run_results(RUNS[:-1])
+        with self.assertRaises(AssertionError):
+            with self.assertLogs(level="WARNING"):
+                statistics.get_stats_of_run_set(
+                    run_results, False, statistics.ENGINE_VALIDATE
+                )
@@ -114,6 +114,33 @@ class TestUnit(unittest.TestCase):
             [1, 2, 3, 4, 5, 6], util.merge_lists([[1, 2, 4, 6], [1, 2, 3, 4, 5]])
         )
 
+    def check_merge_lists_shape(self, lists, common):
+        """
+        Check merging and intersecting the given lists, whose shape is typical
+        for task lists of large tables. Quadratic implementations take minutes here.
+        """
+        merged = util.merge_lists(lists)
+        self.assertCountEqual(set().union(*lists), merged)
+        # existing elements are never moved, so the first list keeps its order
+        first_list = set(lists[0])
+        self.assertTrue(
+            [elem for elem in merged if elem in first_list] == lists[0],
+            "order of first list was not kept",
+        )
+        self.assertListEqual(common, util.find_common_elements(lists))
+
+    def test_merge_lists_identical(self):
+        lists = [list(range(100000))] * 30
+        self.check_merge_lists_shape(lists, lists[0])
+
+    def test_merge_lists_shifted(self):
+        lists = [list(range(i * 1000, i * 1000 + 100000)) for i in range(30)]
+        self.check_merge_lists_shape(lists, list(range(29000, 100000)))
+
+    def test_merge_lists_sparse(self):
+        lists = [list(range(i, 300000, 3 + i)) for i in range(30)]
+        self.check_merge_lists_shape(lists, [])
+
     def test_find_common_elements(self):
         self.assertListEqual([], util.find_common_elements([[]]))
         self.assertListEqual([], util.find_common_elements([[], [1, 2, 3]]))
@@ -55,6 +55,37 @@ class TaskId(
         return "'" + ", ".join(str(s) for s in self if s) + "'"
 
 
+class RunXml(collections.namedtuple("RunXml", "tag attrib columns")):
+    """
+    Compact representation of a <run> tag (or <sourcefile> tag) of a result file,
+    consisting of its attributes and the attributes of its <column> tags.
+    This needs much less memory than the respective ElementTree elements.
+    """
+
+    __slots__ = ()  # reduce per-instance memory consumption
+
+    @staticmethod
+    def from_element(elem):
+        return RunXml(
+            elem.tag,
+            elem.attrib,
+            [column.attrib for column in elem if column.tag == "column"],
+        )
+
+    def get(self, key, default=None):
+        return self.attrib.get(key, default)
+
+    def set(self, key, value):
+        self.attrib[key] = value
+
+    def get_column_values(self):
+        """Return a dict with the value of the first column with each title."""
+        return {
+            column.get("title"): column.get("value")
+            for column in reversed(self.columns)
+        }
+
+
 def get_file_list(shortFile):
     """
     The function get_file_list expands a short filename to a sorted list
@@ -185,13 +216,6 @@ def collapse_equal_values(values, counts):
     yield (previousValue, previousCount)
 
 
-def get_column_value(sourcefileTag, columnTitle, default=None):
-    for column in sourcefileTag.findall("column"):
-        if column.get("title") == columnTitle:
-            return column.get("value")
-    return default
-
-
 def flatten(list_):
     return [value for sublist in list_ for value in sublist]
 
@@ -252,33 +276,27 @@ def merge_lists(list_of_lists: Iterable[Iterable[_T]]) -> List[_T]:
     This function merges several sequences, e.g. [A,C] + [A,B] --> [A,B,C].
     It keeps the order of elements.
     """
-    result_list = []
-    elem_set = set()
+    # The result is built as a circular linked list (a mapping from each element
+    # to its successor) such that inserting after a known element takes constant
+    # time and the merge is linear in the total number of elements.
+    # A new element is inserted right after the element that preceded it
+    # in the current sequence (or at the beginning if it is the first one),
+    # e.g., if we see [a,b] where a already exists at some place and b does not.
+    sentinel = object()  # marks beginning and end of the list
+    successors = {sentinel: sentinel}
     for current_list in list_of_lists:
-        # prev_index is for optimizing inserting consecutive sequences of new elems,
-        # e.g., in the first outer loop iteration.
-        prev_index = None
-        # In later iterations of the outer loop, it can happen that we see [a,b] where
-        # a already exists at some place in result_list and b does not.
-        # Then we want to insert b right after a, so we need to remember a and find it.
-        prev_elem = None
+        prev_elem = sentinel
         for elem in current_list:
-            if elem not in elem_set:
-                elem_set.add(elem)
-                # calculate where to insert in result_list
-                if prev_index is not None:
-                    index = prev_index + 1
-                elif prev_elem is not None:
-                    index = result_list.index(prev_elem) + 1
-                else:
-                    index = 0
-                result_list.insert(index, elem)
-                prev_index = index
-                prev_elem = elem
-            else:
-                prev_index = None
-                prev_elem = elem
+            if elem not in successors:
+                successors[elem] = successors[prev_elem]
+                successors[prev_elem] = elem
+            prev_elem = elem
 
+    result_list = []
+    elem = successors[sentinel]
+    while elem is not sentinel:
+        result_list.append(elem)
+        elem = successors[elem]
     return result_list
 
 
@@ -18,7 +18,9 @@ from benchexec.result import (
     RESULT_UNKNOWN,
     RESULT_TRUE_PROP,
 )
-from benchexec.tools.template import BaseTool
+from benchexec import containerized_tool
+from benchexec.tooladapter import CURRENT_BASETOOL
+from benchexec.tools.template import BaseTool, BaseTool2
 
 sys.dont_write_bytecode = True  # prevent creation of .pyc files
 
@@ -74,6 +76,14 @@ class TestResult(unittest.TestCase):
             RESULT_FALSE_REACH, run._analyze_result(normal_result, "", None)
         )
 
+    def test_analyze_run_of_tool_info_module(self):
+        # only ContainerizedTool.analyze_run() is used instead of the usual methods
+        run = self.create_run(info_result=RESULT_TRUE_PROP)
+        run.runSet.benchmark.tool.analyze_run = lambda *args: self.fail(
+            "analyze_run() of tool-info module called"
+        )
+        self.assertEqual(RESULT_TRUE_PROP, run._analyze_result(normal_result, "", None))
+
     def test_timeout(self):
         run = self.create_run(info_result=RESULT_UNKNOWN)
         self.assertEqual("TIMEOUT", run._analyze_result(normal_result, "", "cputime"))
@@ -219,3 +229,52 @@ class TestResult(unittest.TestCase):
 
         run = self.create_run(info_result=RESULT_UNKNOWN)
         self.assertEqual(RESULT_UNKNOWN, run._analyze_result(returnvalue(1), "", None))
+
+
+class LineCountingTool(BaseTool2):
+    def executable(self, tool_locator):
+        return "tool"
+
+    def name(self):
+        return "Test"
+
+    def determine_result(self, run):
+        return f"{len(run.output)} lines, last: {run.output[-1]}"
+
+    def get_value_from_output(self, output, identifier):
+        for line in output:
+            if line.startswith(identifier):
+                return line[len(identifier) :].strip()
+        return None
+
+
+class TestAnalyzeRunInContainer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def setUp(self):
+        self.tool = containerized_tool.tool = LineCountingTool()
+
+    def tearDown(self):
+        containerized_tool.tool = None
+
+    def check_analyze_run(self, lines, identifiers, with_run=True):
+        output = CURRENT_BASETOOL.RunOutput(lines)
+        run = CURRENT_BASETOOL.Run(["tool"], normal_result, output, None)
+        expected = (
+            self.tool.determine_result(run) if with_run else None,
+            [self.tool.get_value_from_output(output, i) for i in identifiers],
+        )
+        # this is what ContainerizedTool.analyze_run() passes into the container
+        actual = containerized_tool._analyze_run(
+            run._replace(output=None) if with_run else None, output.text, identifiers
+        )
+        self.assertEqual(expected, actual)
+
+    def test_analyze_run(self):
+        lines = ["a: 1\n", "\n", "b: 2 \n", "c\r\n", "last line"]
+        self.check_analyze_run(lines, ["a:", "b:", "c:"])
+        self.check_analyze_run(lines, [])
+        self.check_analyze_run(lines, ["a:"], with_run=False)
+        self.check_analyze_run(["a: 1\n"], ["a:"])
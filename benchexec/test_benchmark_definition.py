@@ -7,12 +7,16 @@
 
 import collections
 import os
+import shutil
 import tempfile
+import types
 import unittest
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 import yaml
 
-from benchexec.model import Benchmark
+from benchexec import BenchExecException
+import benchexec.model
+from benchexec.model import Benchmark, TaskDefinitionLoader
 import benchexec.result
 import benchexec.util as util
 
@@ -77,7 +81,7 @@ class TestBenchmarkDefinition(unittest.TestCase):
     @patch("benchexec.result.Property.create", new=mock_property_create)
     @patch("benchexec.util.expand_filename_pattern", new=mock_expand_filename_pattern)
     @patch("os.path.samefile", new=lambda a, b: a == b)
-    def parse_benchmark_definition(self, content):
+    def parse_benchmark_definition(self, content, config=DummyConfig):
         with tempfile.NamedTemporaryFile(
             prefix="BenchExec_test_benchmark_definition_", suffix=".xml", mode="w+"
         ) as temp:
@@ -86,7 +90,7 @@ class TestBenchmarkDefinition(unittest.TestCase):
 
             # Because we mocked everything that accesses the file system,
             # we can parse the benchmark definition although task files do not exist.
-            return Benchmark(temp.name, DummyConfig, util.read_local_time())
+            return Benchmark(temp.name, config, util.read_local_time())
 
     def check_task_filter(self, filter_attr, expected):
         # The following three benchmark definitions are equivalent, we check each.
@@ -157,3 +161,170 @@ class TestBenchmarkDefinition(unittest.TestCase):
         benchmark = self.parse_benchmark_definition(benchmark_definition)
         run_ids = [run.identifier for run in benchmark.run_sets[0].runs]
         self.assertListEqual(run_ids, ["false_sub_task.yml", "false_sub2_task.yml"])
+
+    def test_task_definitions_loaded_once(self):
+        benchmark_definition = """
+            <benchmark tool="dummy">
+              <propertyfile>test.prp</propertyfile>
+              <tasks><include>*.yml</include></tasks>
+              <rundefinition name="a"/>
+              <rundefinition name="b"/>
+            </benchmark>
+            """
+        load = Mock(wraps=benchexec.model._load_task_definition_file_or_error)
+        with patch("benchexec.model._load_task_definition_file_or_error", new=load):
+            benchmark = self.parse_benchmark_definition(benchmark_definition)
+
+        for run_set in benchmark.run_sets:
+            run_ids = [run.identifier for run in run_set.runs]
+            self.assertListEqual(run_ids, sorted(ALL_TEST_TASKS.keys()))
+        loaded_files = sorted(call.args[0] for call in load.call_args_list)
+        self.assertListEqual(
+            loaded_files, sorted(list(ALL_TEST_TASKS.keys()) + ["other_task.yml"])
+        )
+
+    @patch("benchexec.model.load_task_definition_file", new=mock_load_task_def_file)
+    @patch("benchexec.result.Property.create", new=mock_property_create)
+    @patch("benchexec.util.expand_filename_pattern", new=mock_expand_filename_pattern)
+    @patch("os.path.samefile", new=lambda a, b: a == b)
+    def test_lazy_runs(self):
+        benchmark_definition = """
+            <benchmark tool="dummy">
+              <propertyfile>test.prp</propertyfile>
+              <tasks name="yml"><include>*.yml</include></tasks>
+              <tasks name="other"><withoutfile>foo</withoutfile></tasks>
+              <rundefinition/>
+            </benchmark>
+            """
+        config = types.SimpleNamespace(**DummyConfig._asdict(), stream_runs=True)
+        benchmark = self.parse_benchmark_definition(benchmark_definition, config)
+        run_set = benchmark.run_sets[0]
+        self.assertTrue(run_set.lazy_runs)
+        self.assertListEqual(run_set.runs, [])
+        self.assertEqual(run_set.run_count, len(ALL_TEST_TASKS) + 2)
+        self.assertListEqual(
+            run_set.get_run_identifiers(),
+            sorted(list(ALL_TEST_TASKS.keys()) + ["other_task.yml"]) + ["foo"],
+        )
+
+        with patch.object(benchmark.task_definitions, "store") as store:
+            runs = list(run_set.create_runs())
+        # lazily loaded task definitions are cached as well
+        store.assert_called()
+        self.assertListEqual(run_set.runs, runs)
+        self.assertListEqual(
+            [run.identifier for run in runs], sorted(ALL_TEST_TASKS.keys()) + ["foo"]
+        )
+        self.assertListEqual(run_set.blocks[1].runs, runs[-1:])
+        self.assertEqual(run_set.run_count, len(ALL_TEST_TASKS) + 1)
+
+        eager_benchmark = self.parse_benchmark_definition(benchmark_definition)
+        self.assertFalse(eager_benchmark.run_sets[0].lazy_runs)
+        self.assertListEqual(
+            [run.identifier for run in eager_benchmark.run_sets[0].runs],
+            [run.identifier for run in runs],
+        )
+
+
+class TestTaskDefinitionLoader(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.task_files = []
+        for name in ALL_TEST_TASKS:
+            task_file = os.path.join(self.tmp_dir.name, name)
+            shutil.copy(os.path.join(test_dir, name), task_file)
+            self.task_files.append(task_file)
+        self.cache_file = os.path.join(self.tmp_dir.name, "taskdefs.cache")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def expected_task_definitions(self):
+        return [benchexec.model.load_task_definition_file(f) for f in self.task_files]
+
+    def test_load(self):
+        loader = TaskDefinitionLoader()
+        loader.preload(self.task_files)
+        self.assertListEqual(
+            [loader.load(f) for f in self.task_files], self.expected_task_definitions()
+        )
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_load_error(self):
+        missing_file = os.path.join(self.tmp_dir.name, "missing.yml")
+        loader = TaskDefinitionLoader(self.cache_file)
+        loader.preload([missing_file])
+        self.assertRaises(BenchExecException, loader.load, missing_file)
+        loader.store()
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_load_parallel(self):
+        with patch.object(benchexec.model, "_PARALLEL_LOADING_THRESHOLD", 2), patch(
+            "os.cpu_count", return_value=2
+        ):
+            loader = TaskDefinitionLoader()
+            loader.preload(self.task_files)
+        with patch(
+            "benchexec.model.load_task_definition_file",
+            side_effect=AssertionError("file loaded twice"),
+        ):
+            task_defs = [loader.load(f) for f in self.task_files]
+        self.assertListEqual(task_defs, self.expected_task_definitions())
+
+    def test_cache(self):
+        loader = TaskDefinitionLoader(self.cache_file)
+        loader.preload(self.task_files)
+        loader.store()
+        self.assertCountEqual(
+            os.listdir(self.tmp_dir.name),
+            [os.path.basename(f) for f in self.task_files + [self.cache_file]],
+        )
+
+        with patch(
+            "benchexec.model.load_task_definition_file",
+            side_effect=AssertionError("cache not used"),
+        ):
+            loader = TaskDefinitionLoader(self.cache_file)
+            task_defs = [loader.load(f) for f in self.task_files]
+        self.assertListEqual(task_defs, self.expected_task_definitions())
+
+    def test_cache_outdated(self):
+        loader = TaskDefinitionLoader(self.cache_file)
+        loader.preload(self.task_files)
+        loader.store()
+
+        content = util.read_file(self.task_files[0])
+        content = content.replace('format_version: "1.0"', 'format_version: "2.0"')
+        with open(self.task_files[0], "w") as f:
+            f.write(content + "\noptions:\n  language: C\n")
+
+        loader = TaskDefinitionLoader(self.cache_file)
+        self.assertDictEqual(
+            loader.load(self.task_files[0])["options"], {"language": "C"}
+        )
+
+    def test_cache_invalid(self):
+        with open(self.cache_file, "w") as f:
+            f.write("invalid")
+        loader = TaskDefinitionLoader(self.cache_file)
+        self.assertListEqual(
+            [loader.load(f) for f in self.task_files], self.expected_task_definitions()
+        )
+
+    def test_samefile(self):
+        loader = TaskDefinitionLoader()
+        link = os.path.join(self.tmp_dir.name, "link.yml")
+        os.symlink(self.task_files[0], link)
+        self.assertTrue(loader.samefile(self.task_files[0], link))
+        self.assertFalse(loader.samefile(self.task_files[0], self.task_files[1]))
+        self.assertRaises(
+            FileNotFoundError,
+            loader.samefile,
+            self.task_files[0],
+            os.path.join(self.tmp_dir.name, "missing.yml"),
+        )
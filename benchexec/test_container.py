@@ -0,0 +1,90 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import collections
+import os
+import sys
+import tempfile
+import unittest
+
+from benchexec import container
+from benchexec.container import DIR_HIDDEN, DIR_OVERLAY, DIR_READ_ONLY
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+
+class TestMountPlan(unittest.TestCase):
+    dir_modes = collections.OrderedDict(
+        [
+            (b"/", DIR_OVERLAY),
+            (b"/tmp", DIR_HIDDEN),
+            (b"/sys/kernel", DIR_READ_ONLY),
+            (b"/sys", DIR_READ_ONLY),
+        ]
+    )
+    mount_points = [
+        (b"/dev/sda1", b"/", b"ext4", {b"rw"}),
+        (b"proc", b"/proc", b"proc", {b"rw"}),
+        (b"sysfs", b"/sys", b"sysfs", {b"rw"}),
+        (b"none", b"/tmp/does/not/exist", b"tmpfs", {b"rw"}),
+    ]
+
+    def test_special_dirs_to_bind(self):
+        plan = container.MountPlan(self.dir_modes, self.mount_points)
+        # /sys/kernel has the same mode as its parent
+        self.assertEqual(plan.special_dirs_to_bind, [b"/tmp", b"/sys"])
+
+    def test_mount_modes(self):
+        plan = container.MountPlan(self.dir_modes, self.mount_points)
+        self.assertEqual(plan.get_mount_mode(b"/", b"ext4"), (b"/", DIR_OVERLAY))
+        self.assertEqual(plan.get_mount_mode(b"/", b"vfat"), (b"/", DIR_READ_ONLY))
+        self.assertEqual(
+            plan.get_mount_mode(b"/proc", b"proc"), (b"/proc", DIR_READ_ONLY)
+        )
+        self.assertEqual(plan.get_mount_mode(b"/tmp", b"ext4"), (b"/tmp", DIR_HIDDEN))
+        self.assertEqual(
+            plan.get_mount_mode(b"/tmp/does/not/exist", b"tmpfs"),
+            (b"/tmp/does/not/exist", None),
+        )
+
+    def test_file_system_changes(self):
+        with tempfile.TemporaryDirectory(prefix="BenchExec_test_") as tmp_dir:
+            tmp_dir = tmp_dir.encode()
+            mountpoint = tmp_dir + b"/mount"
+            special_file = tmp_dir + b"/file"
+            os.mkdir(special_file)
+            dir_modes = collections.OrderedDict(
+                [
+                    (b"/", DIR_OVERLAY),
+                    (tmp_dir, DIR_READ_ONLY),
+                    (special_file, DIR_OVERLAY),
+                ]
+            )
+            plan = container.MountPlan(dir_modes, [(b"none", mountpoint, b"tmpfs", {})])
+            self.assertEqual(
+                plan.get_mount_mode(mountpoint, b"tmpfs"), (mountpoint, None)
+            )
+            self.assertEqual(plan.special_dirs_to_bind, [tmp_dir, special_file])
+
+            # changes of the file system after the plan was created are respected
+            os.mkdir(mountpoint)
+            os.rmdir(special_file)
+            with open(special_file, "w"):
+                pass
+            self.assertEqual(
+                plan.get_mount_mode(mountpoint, b"tmpfs"), (mountpoint, DIR_READ_ONLY)
+            )
+            # overlay mode is not possible for a file, so it inherits read-only mode
+            self.assertEqual(plan.special_dirs_to_bind, [tmp_dir])
+
+    def test_get_mount_plan_is_cached(self):
+        plan = container.get_mount_plan(self.dir_modes)
+        self.assertIs(container.get_mount_plan(self.dir_modes), plan)
+        self.assertIsNot(
+            container.get_mount_plan(collections.OrderedDict([(b"/", DIR_HIDDEN)])),
+            plan,
+        )
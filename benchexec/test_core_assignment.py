@@ -11,7 +11,12 @@ import sys
 import unittest
 import math
 
-from benchexec.resources import _get_cpu_cores_per_run0
+from benchexec.resources import (
+    _CpuTopology,
+    _get_cpu_cores_per_run0,
+    _get_cpu_cores_per_run_topology,
+    _is_symmetric_topology,
+)
 
 sys.dont_write_bytecode = True  # prevent creation of .pyc files
 
@@ -699,3 +704,73 @@ class TestCpuCoresPerRun_quadCPU_no_ht(TestCpuCoresPerRun):
 
 # prevent execution of base class as its own test
 del TestCpuCoresPerRun
+
+
+class TestCpuCoresPerRunTopology(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        logging.disable(logging.CRITICAL)
+
+    def topology(self, cores, node=0, l3=0, cpu_class=0, siblings=1):
+        """Create the topology for a set of physical cores with the given siblings."""
+        return {
+            core: _CpuTopology(0, node, l3, core - core % siblings, cpu_class)
+            for core in cores
+        }
+
+    def assertAssignment(self, topology, coreLimit, num_of_threads, expected, ht=True):
+        result = _get_cpu_cores_per_run_topology(
+            coreLimit, num_of_threads, ht, topology
+        )
+        self.assertEqual(
+            expected,
+            result,
+            f"Incorrect result for {coreLimit} cores and {num_of_threads} threads.",
+        )
+
+    def test_l3_split(self):
+        # one CPU with four L3 caches of four cores, like AMD EPYC
+        topology = {}
+        for l3 in range(4):
+            topology.update(self.topology(range(l3 * 4, l3 * 4 + 4), l3=l3 * 4))
+        self.assertFalse(
+            _is_symmetric_topology(False, {0: list(topology)}, {}, topology)
+        )
+        self.assertAssignment(topology, 1, 4, [[0], [4], [8], [12]])
+        self.assertAssignment(topology, 2, 4, [[0, 1], [4, 5], [8, 9], [12, 13]])
+        self.assertAssignment(
+            topology,
+            2,
+            8,
+            [[0, 1], [4, 5], [8, 9], [12, 13], [2, 3], [6, 7], [10, 11], [14, 15]],
+        )
+        self.assertAssignment(topology, 4, 2, [[0, 1, 2, 3], [4, 5, 6, 7]])
+        self.assertAssignment(topology, 8, 2, [lrange(0, 8), lrange(8, 16)])
+
+    def test_uneven_nodes(self):
+        # two NUMA nodes with 3 and 5 available cores
+        topology = self.topology([0, 1, 2], node=0, l3=0)
+        topology.update(self.topology([8, 9, 10, 11, 12], node=1, l3=8))
+        self.assertAssignment(topology, 2, 2, [[8, 9], [0, 1]])
+        self.assertAssignment(topology, 2, 3, [[8, 9], [0, 1], [10, 11]])
+        self.assertAssignment(topology, 4, 2, [[8, 9, 10, 11], [0, 1, 2, 12]])
+        with self.assertRaises(SystemExit):
+            _get_cpu_cores_per_run_topology(3, 3, True, topology)
+
+    def test_hybrid(self):
+        # 2 performance cores with hyper-threading and 4 efficiency cores
+        topology = self.topology(range(4), cpu_class=1, siblings=2)
+        topology.update(self.topology(range(4, 8)))
+        self.assertFalse(
+            _is_symmetric_topology(False, {0: list(topology)}, {}, topology)
+        )
+        self.assertAssignment(topology, 2, 2, [[0, 1], [2, 3]])
+        self.assertAssignment(topology, 1, 2, [[0], [2]], ht=False)
+        # not enough performance cores
+        self.assertAssignment(topology, 2, 3, [[0, 1], [2, 3], [4, 5]])
+
+    def test_shared_physical_cores(self):
+        topology = self.topology(range(4), siblings=2)
+        self.assertAssignment(topology, 1, 2, [[0], [2]])
+        self.assertAssignment(topology, 1, 4, [[0], [2], [1], [3]])
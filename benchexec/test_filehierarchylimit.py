@@ -0,0 +1,129 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchexec import libc
+from benchexec.filehierarchylimit import FileHierarchyLimitThread
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+
+class TestFileHierarchyLimit(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.path = self.tmp_dir.name
+        self.process = subprocess.Popen(["sleep", "10"])
+        self.reasons = []
+        self.thread = None
+
+    def tearDown(self):
+        if self.thread:
+            self.thread.cancel()
+            self.thread.join()
+        self.process.kill()
+        self.process.wait()
+        self.tmp_dir.cleanup()
+
+    def start_thread(self, files_count_limit=None, files_size_limit=None):
+        self.thread = FileHierarchyLimitThread(
+            self.path,
+            files_count_limit=files_count_limit,
+            files_size_limit=files_size_limit,
+            pid_to_kill=self.process.pid,
+            callbackFn=self.reasons.append,
+        )
+        self.thread.start()
+
+    def create_files(self, directory, count, size=0):
+        os.makedirs(os.path.join(self.path, directory), exist_ok=True)
+        for i in range(count):
+            with open(os.path.join(self.path, directory, str(i)), "wb") as f:
+                f.write(b"x" * size)
+
+    def test_files_count_limit(self):
+        self.create_files("a", 5)
+        self.start_thread(files_count_limit=10)
+        self.create_files("a/b/c", 5)
+        with self.assertRaises(subprocess.TimeoutExpired):
+            self.process.wait(1.5)
+        self.create_files("a/b/c/d", 1)
+        self.assertEqual(self.process.wait(3), -9)
+        self.assertEqual(self.reasons, ["files-count"])
+
+    def test_files_size_limit(self):
+        self.start_thread(files_size_limit=1000)
+        with open(os.path.join(self.path, "file"), "wb") as f:
+            f.write(b"x" * 1000)
+            f.flush()
+            with self.assertRaises(subprocess.TimeoutExpired):
+                self.process.wait(1.5)
+            f.write(b"x")
+            f.flush()
+            self.assertEqual(self.process.wait(3), -9)
+        self.assertEqual(self.reasons, ["files-size"])
+
+    def test_files_created_while_adding_directory(self):
+        thread = FileHierarchyLimitThread(
+            self.path,
+            files_count_limit=10,
+            files_size_limit=None,
+            pid_to_kill=self.process.pid,
+        )
+        thread._inotify_fd = libc.inotify_init1(libc.IN_NONBLOCK | libc.IN_CLOEXEC)
+        self.addCleanup(os.close, thread._inotify_fd)
+        thread._scan()
+
+        # files are created concurrently right before and after watch is added
+        watch_directory = thread._watch_directory
+
+        def watch_directory_and_create_files(path):
+            open(os.path.join(path, "before"), "wb").close()
+            watch_directory(path)
+            open(os.path.join(path, "after"), "wb").close()
+
+        self.create_files("a/b", 1)
+        with patch.object(thread, "_watch_directory", watch_directory_and_create_files):
+            thread._read_events()
+        thread._read_events()
+        for path in thread._changed_files:
+            thread._update_file(path)
+
+        self.assertCountEqual(
+            [os.path.relpath(path, self.path) for path in thread._files],
+            ["a/b/0", "a/before", "a/after", "a/b/before", "a/b/after"],
+        )
+
+    def test_deleted_and_moved_files(self):
+        self.start_thread(files_count_limit=10)
+        for i in range(5):
+            self.create_files("a", 10)
+            os.rename(os.path.join(self.path, "a"), os.path.join(self.path, "b"))
+            self.create_files("b", 5)  # overwrites existing files
+            subprocess.run(["rm", "-r", os.path.join(self.path, "b")], check=True)
+        self.create_files("c", 10)
+        with self.assertRaises(subprocess.TimeoutExpired):
+            self.process.wait(1.5)
+        self.assertEqual(self.reasons, [])
+
+    def test_without_inotify(self):
+        self.create_files("a", 11)
+        thread = FileHierarchyLimitThread(
+            self.path,
+            files_count_limit=10,
+            files_size_limit=None,
+            pid_to_kill=self.process.pid,
+            callbackFn=self.reasons.append,
+        )
+        thread._run()  # without inotify, only scans are done
+        self.assertEqual(self.process.wait(3), -9)
+        self.assertEqual(self.reasons, ["files-count"])
@@ -0,0 +1,139 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import logging
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest.mock import patch
+
+from benchexec import intel_cpu_energy, util
+from benchexec.intel_cpu_energy import (
+    RaplEnergyMeasurement,
+    RaplEnergyMeter,
+    format_energy_results,
+)
+
+MAX_RANGE = 1000000
+
+
+class TestRaplEnergyMeter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+        logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.powercap_dir = self.tmp_dir.name
+        self.create_zone("intel-rapl:0", "package-0", 1000)
+        self.create_zone("intel-rapl:0/intel-rapl:0:0", "core", 500)
+        self.create_zone("intel-rapl:0/intel-rapl:0:1", "dram", 0)
+        self.create_zone("intel-rapl:1", "package-1", 2000)
+        self.create_zone("intel-rapl:2", "psys", 0)
+        self.create_zone("intel-rapl-mmio:0", "package-0", 0)
+        self.meters = []
+
+    def tearDown(self):
+        for meter in self.meters:
+            meter.close()
+        self.tmp_dir.cleanup()
+
+    def create_zone(self, zone, name, energy):
+        zone_dir = os.path.join(self.powercap_dir, zone)
+        os.makedirs(zone_dir)
+        util.write_file(name + "\n", zone_dir, "name")
+        util.write_file(str(MAX_RANGE) + "\n", zone_dir, "max_energy_range_uj")
+        self.set_energy(zone, energy)
+
+    def set_energy(self, zone, energy):
+        util.write_file(str(energy) + "\n", self.powercap_dir, zone, "energy_uj")
+
+    def create_meter(self):
+        # large interval such that only explicit reads sample the counters
+        meter = RaplEnergyMeter(self.powercap_dir, interval=3600)
+        self.meters.append(meter)
+        return meter
+
+    def test_domains(self):
+        self.assertDictEqual(
+            self.create_meter().read(),
+            {
+                0: {"package": Decimal(0), "core": Decimal(0), "dram": Decimal(0)},
+                1: {"package": Decimal(0)},
+            },
+        )
+
+    def test_no_packages(self):
+        with tempfile.TemporaryDirectory(prefix="BenchExec_test_") as empty_dir:
+            self.assertRaises(OSError, RaplEnergyMeter, empty_dir)
+
+    def test_measurement(self):
+        measurement = RaplEnergyMeasurement(self.create_meter())
+        self.assertFalse(measurement.is_running())
+        self.assertIsNone(measurement.stop())
+
+        measurement.start()
+        self.assertTrue(measurement.is_running())
+        self.set_energy("intel-rapl:0", 501000)
+        self.set_energy("intel-rapl:0/intel-rapl:0:0", 250500)
+        self.set_energy("intel-rapl:1", 3500)
+        energy = measurement.stop()
+        self.assertFalse(measurement.is_running())
+
+        self.assertDictEqual(
+            energy,
+            {
+                0: {
+                    "package": Decimal("0.5"),
+                    "core": Decimal("0.25"),
+                    "dram": Decimal(0),
+                },
+                1: {"package": Decimal("0.0015")},
+            },
+        )
+        self.assertEqual(format_energy_results(energy)["cpuenergy"], Decimal("0.5015"))
+
+    def test_wraparound(self):
+        meter = self.create_meter()
+        measurement = RaplEnergyMeasurement(meter)
+        measurement.start()
+        self.set_energy("intel-rapl:0", 900000)
+        meter.read()  # periodic sample
+        self.set_energy("intel-rapl:0", 100000)
+        meter.read()  # periodic sample after counter wrapped around
+        self.set_energy("intel-rapl:0", 400000)
+        energy = measurement.stop()
+        # counter wraps around from MAX_RANGE to 0, so this is one more microjoule
+        self.assertEqual(energy[0]["package"], Decimal("1.399001"))
+
+    def test_shared_meter_interval(self):
+        powercap_dir = self.powercap_dir
+
+        class TestMeter(RaplEnergyMeter):
+            def __init__(self, interval):
+                super().__init__(powercap_dir, interval=interval)
+
+        with patch.object(intel_cpu_energy, "_shared_rapl_meter", None):
+            meter = TestMeter.get_shared(interval=3600)
+            self.meters.append(meter)
+            self.assertEqual(meter._interval, 3600)
+            self.assertIs(TestMeter.get_shared(interval=1), meter)
+
+    def test_concurrent_measurements(self):
+        meter = self.create_meter()
+        measurement1 = RaplEnergyMeasurement(meter)
+        measurement2 = RaplEnergyMeasurement(meter)
+        measurement1.start()
+        self.set_energy("intel-rapl:1", 4000)
+        measurement2.start()
+        self.set_energy("intel-rapl:1", 10000)
+        self.assertEqual(measurement1.stop()[1]["package"], Decimal("0.008"))
+        self.set_energy("intel-rapl:1", 11000)
+        self.assertEqual(measurement2.stop()[1]["package"], Decimal("0.007"))
@@ -0,0 +1,93 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+from benchexec.limitsupervisor import LimitSupervisor, TimeLimit, MIN_CHECK_INTERVAL
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+
+class _FakeCgroups(object):
+    """Cgroups with a CPU time that increases like the wall time on one core."""
+
+    CPU = "cpu"
+
+    def __init__(self):
+        self._start = time.monotonic()
+
+    def __contains__(self, subsystem):
+        return subsystem == self.CPU
+
+    def read_cputime(self):
+        return time.monotonic() - self._start
+
+
+class TestTimeLimit(unittest.TestCase):
+    def setUp(self):
+        self.supervisor = LimitSupervisor()
+        self.supervisor.start()
+        self.process = subprocess.Popen(["sleep", "10"])
+        self.reasons = []
+        self.killed = threading.Event()
+
+    def tearDown(self):
+        self.process.kill()
+        self.process.wait()
+
+    def create_time_limit(self, **kwargs):
+        def callback(reason):
+            self.reasons.append(reason)
+            self.killed.set()
+
+        return TimeLimit(
+            cgroups=_FakeCgroups(),
+            pid_to_kill=self.process.pid,
+            cores=[0],
+            callbackFn=callback,
+            supervisor=self.supervisor,
+            **kwargs,
+        )
+
+    def test_cputime_limit(self):
+        timelimit = self.create_time_limit(
+            hardtimelimit=0.5, softtimelimit=None, walltimelimit=10
+        )
+        self.assertEqual(self.process.wait(5), -9)
+        self.assertEqual(self.reasons, ["cputime"])
+        self.assertGreaterEqual(timelimit.overshoot, 0)
+        self.assertLess(timelimit.overshoot, 2 * MIN_CHECK_INTERVAL)
+
+    def test_walltime_limit(self):
+        timelimit = self.create_time_limit(
+            hardtimelimit=None, softtimelimit=None, walltimelimit=0.3
+        )
+        self.assertEqual(self.process.wait(5), -9)
+        self.assertEqual(self.reasons, ["walltime"])
+        self.assertLess(timelimit.overshoot, 2 * MIN_CHECK_INTERVAL)
+
+    def test_softtime_limit(self):
+        self.create_time_limit(hardtimelimit=10, softtimelimit=0.2, walltimelimit=10)
+        self.assertEqual(self.process.wait(5), -15)
+        self.assertEqual(self.reasons, ["cputime-soft"])
+
+    def test_cancel(self):
+        timelimits = [
+            self.create_time_limit(
+                hardtimelimit=0.3, softtimelimit=None, walltimelimit=10
+            )
+            for _ in range(3)
+        ]
+        for timelimit in timelimits:
+            timelimit.cancel()
+        self.assertFalse(self.killed.wait(0.6))
+        self.assertIsNone(self.process.poll())
+        self.assertTrue(all(timelimit.overshoot is None for timelimit in timelimits))
@@ -0,0 +1,303 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import bz2
+import logging
+import os
+import sys
+import tempfile
+import threading
+import types
+import unittest
+
+from benchexec import localexecution
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+
+class Namespace(types.SimpleNamespace):
+    # identity semantics like the real classes for use as keys
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+
+class RunSet(Namespace):
+    lazy_runs = False
+
+    def should_be_executed(self):
+        return self.executed
+
+    @property
+    def run_count(self):
+        return len(self.runs)
+
+    def create_runs(self):
+        return iter(self.runs)
+
+
+class LazyRunSet(RunSet):
+    lazy_runs = True
+
+    def create_runs(self):
+        for run in self.runs:
+            self.created_runs.append(run)
+            yield run
+
+
+def create_run_set(benchmark, name, run_names, executed=True, cls=RunSet):
+    run_set = cls(benchmark=benchmark, name=name, index=name, executed=executed)
+    run_set.runs = [
+        Namespace(
+            identifier=os.path.join(benchmark.base_dir, run_name),
+            sourcefiles=[run_name],
+            properties=[],
+            runSet=run_set,
+        )
+        for run_name in run_names
+    ]
+    return run_set
+
+
+class OutputHandler(object):
+    def __init__(self):
+        self.events = []
+
+    def output_before_run_set(self, runSet):
+        self.events.append(("start", runSet.name))
+
+    def output_for_skipping_run_set(self, runSet, reason=None):
+        self.events.append(("skip", runSet.name))
+
+    def output_for_new_run(self, run):
+        self.events.append(("new", os.path.basename(run.identifier)))
+
+
+class TestRunScheduler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+        logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.benchmark = types.SimpleNamespace(
+            name="test",
+            base_dir=self.tmp_dir.name,
+            config=types.SimpleNamespace(output_path=self.tmp_dir.name + os.sep),
+            output_base_name=os.path.join(self.tmp_dir.name, "test.current"),
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_result_file(self, name, walltimes):
+        runs = "".join(
+            f'<run name="{run}" files="[{run}]">'
+            f'<column title="walltime" value="{walltime}s"/></run>'
+            for run, walltime in walltimes.items()
+        )
+        with bz2.BZ2File(os.path.join(self.tmp_dir.name, name), "wb") as f:
+            f.write(f"<result>{runs}</result>".encode())
+
+    def test_previous_durations(self):
+        run_set = create_run_set(self.benchmark, "rs", ["a", "b", "c"])
+        self.assertEqual(
+            localexecution._get_previous_durations(self.benchmark, run_set), {}
+        )
+
+        self.write_result_file("test.old.results.rs.xml.bz2", {"a": 1, "b": 2.5})
+        self.write_result_file("test.old.results.other.xml.bz2", {"c": 5})
+        durations = localexecution._get_previous_durations(self.benchmark, run_set)
+        self.assertEqual(durations, {run_set.runs[0]: 1, run_set.runs[1]: 2.5})
+
+    def test_sort_runs_by_duration(self):
+        runs = ["a", "b", "c", "d"]
+        self.assertEqual(localexecution._sort_runs_by_duration(runs, {}), runs)
+        self.assertEqual(
+            localexecution._sort_runs_by_duration(runs, {"a": 1, "b": 5, "d": 2}),
+            ["b", "c", "d", "a"],
+        )
+
+    def test_longest_first(self):
+        run_set = create_run_set(self.benchmark, "rs", ["a", "b", "c"])
+        self.write_result_file("test.old.results.rs.xml.bz2", {"a": 1, "b": 3, "c": 2})
+        scheduler = localexecution._RunScheduler(
+            [run_set], OutputHandler(), 1, sort_by_duration=True
+        )
+        runs = iter(scheduler.next_run, None)
+        self.assertEqual([run.sourcefiles[0] for run in runs], ["b", "c", "a"])
+
+    def test_overlap(self):
+        output_handler = OutputHandler()
+        run_sets = [
+            create_run_set(self.benchmark, "rs1", ["a"]),
+            create_run_set(self.benchmark, "skipped", ["a"], executed=False),
+            create_run_set(self.benchmark, "rs2", ["a", "b"]),
+        ]
+        scheduler = localexecution._RunScheduler(
+            run_sets, output_handler, 2, sort_by_duration=False
+        )
+        self.assertEqual(scheduler.run_sets, [run_sets[0], run_sets[2]])
+        scheduler.worker_started()
+
+        run1 = scheduler.next_run()
+        self.assertEqual(output_handler.events, [("start", "rs1")])
+        # next run set is started while run of first one is still executed
+        run2 = scheduler.next_run()
+        self.assertIs(run2.runSet, run_sets[2])
+        self.assertEqual(
+            output_handler.events,
+            [("start", "rs1"), ("skip", "skipped"), ("start", "rs2")],
+        )
+
+        finished = []
+
+        def collect_finished_run_sets():
+            finished.extend(scheduler.finished_run_sets())
+
+        collector = threading.Thread(target=collect_finished_run_sets)
+        collector.start()
+        # run set 2 is executed for 3s, and slot 2 is idle for 1s and slot 1 for 1s
+        start = scheduler._start_times[run_sets[2]]
+        scheduler.run_finished(run2, start, start + 1)
+        scheduler.run_finished(run1, start - 1, start + 2)
+        run3 = scheduler.next_run()
+        scheduler.run_finished(run3, start + 2, start + 3)
+        self.assertIsNone(scheduler.next_run())
+        scheduler.worker_finished()
+        collector.join(10)
+        self.assertEqual(finished, [run_sets[0], run_sets[2]])
+
+        makespan, idle_time = scheduler.get_run_set_times(run_sets[2])
+        self.assertAlmostEqual(makespan, 3)
+        self.assertAlmostEqual(idle_time, 2)
+
+    def test_lazy_runs(self):
+        output_handler = OutputHandler()
+        run_set = create_run_set(
+            self.benchmark, "rs", ["a", "b", "c", "d"], cls=LazyRunSet
+        )
+        run_set.created_runs = []
+        scheduler = localexecution._RunScheduler(
+            [run_set], output_handler, 1, sort_by_duration=True
+        )
+        scheduler.worker_started()
+
+        run1 = scheduler.next_run()
+        self.assertIs(run1, run_set.runs[0])
+        # lookahead of 2 runs for 1 slot
+        self.assertEqual(run_set.created_runs, run_set.runs[:3])
+        self.assertEqual(
+            output_handler.events,
+            [("start", "rs"), ("new", "a"), ("new", "b"), ("new", "c")],
+        )
+
+        start = scheduler._start_times[run_set]
+        scheduler.run_finished(run1, start, start + 1)
+        remaining_runs = list(iter(scheduler.next_run, None))
+        self.assertEqual(remaining_runs, run_set.runs[1:])
+        for i, run in enumerate(remaining_runs, start=1):
+            scheduler.run_finished(run, start + i, start + i + 1)
+        scheduler.worker_finished()
+
+        self.assertEqual(list(scheduler.finished_run_sets()), [run_set])
+        makespan, idle_time = scheduler.get_run_set_times(run_set)
+        self.assertAlmostEqual(makespan, 4)
+        self.assertAlmostEqual(idle_time, 0)
+
+
+class TestResultHandler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+
+    def setUp(self):
+        self.benchmark = Namespace(base_dir="/")
+        self.run_set = create_run_set(self.benchmark, "rs", ["a", "b", "c"])
+        self.scheduler = localexecution._RunScheduler(
+            [self.run_set], OutputHandler(), 2, sort_by_duration=False
+        )
+        self.scheduler.start_next_run_set()
+
+    def test_order_and_termination(self):
+        scheduler = self.scheduler
+        result_handler = localexecution._ResultHandler(scheduler, 3)
+        result_handler.worker_started()
+        result_handler.close()
+
+        handled = []
+        blocker = threading.Event()
+
+        def handle(run):
+            blocker.wait(10)
+            handled.append(run.sourcefiles[0])
+            scheduler.run_finished(run, 0, 1)
+
+        # worker continues while results are still pending
+        for run in iter(scheduler.next_run, None):
+            result_handler.submit(lambda run=run: handle(run))
+        self.assertEqual(handled, [])
+
+        finished = []
+        collector = threading.Thread(
+            target=lambda: finished.extend(scheduler.finished_run_sets())
+        )
+        collector.start()
+        result_handler.worker_finished()
+        # run set is not finished while results are pending
+        collector.join(0.1)
+        self.assertTrue(collector.is_alive())
+        self.assertEqual(finished, [])
+
+        blocker.set()
+        result_handler.join(10)
+        self.assertFalse(result_handler.is_alive())
+        collector.join(10)
+        self.assertEqual(handled, ["a", "b", "c"])
+        self.assertEqual(finished, [self.run_set])
+
+    def test_bounded_queue(self):
+        scheduler = self.scheduler
+        result_handler = localexecution._ResultHandler(scheduler, 1)
+        result_handler.worker_started()
+        result_handler.close()
+
+        blocker = threading.Event()
+        submitted = []
+
+        def handle(run):
+            blocker.wait(10)
+            scheduler.run_finished(run, 0, 1)
+
+        def work():
+            for run in iter(scheduler.next_run, None):
+                result_handler.submit(lambda run=run: handle(run))
+                submitted.append(run)
+            result_handler.worker_finished()
+
+        worker = threading.Thread(target=work)
+        worker.start()
+        # worker is blocked because too many results are pending
+        worker.join(0.1)
+        self.assertTrue(worker.is_alive())
+        self.assertLess(len(submitted), 3)
+
+        blocker.set()
+        worker.join(10)
+        result_handler.join(10)
+        self.assertFalse(result_handler.is_alive())
+        self.assertEqual(len(submitted), 3)
+        self.assertEqual(list(scheduler.finished_run_sets()), [self.run_set])
+
+    def test_termination_without_workers(self):
+        result_handler = localexecution._ResultHandler(self.scheduler, 1)
+        result_handler.close()
+        result_handler.join(10)
+        self.assertFalse(result_handler.is_alive())
+        self.assertEqual(list(self.scheduler.finished_run_sets()), [self.run_set])
@@ -0,0 +1,110 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import zipfile
+
+from benchexec import logarchive
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+
+class TestLogArchiveWriter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.archive = os.path.join(self.tmp_dir.name, "test.logfiles.zip")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def create_file(self, name, content):
+        filename = os.path.join(self.tmp_dir.name, name)
+        with open(filename, "wb") as f:
+            f.write(content)
+        return filename
+
+    def assertArchiveContent(self, expected):
+        with zipfile.ZipFile(self.archive) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertCountEqual(archive.namelist(), expected.keys())
+            for name, content in expected.items():
+                self.assertEqual(archive.read(name), content, name)
+                self.assertEqual(archive.getinfo(name).compress_type, 8, name)
+
+    def test_empty(self):
+        writer = logarchive.LogArchiveWriter(self.archive)
+        self.assertEqual(writer.namelist(), [])
+        writer.close()
+        self.assertEqual(writer.get_statistics(), (0, 0, 0, 0))
+        self.assertArchiveContent({})
+
+    def test_files(self):
+        contents = {
+            "test.logfiles/empty.log": b"",
+            "test.logfiles/run.log": b"output\n" * 1000,
+            "test.logfiles/rän.log": os.urandom(3 * 1024 * 1024),
+        }
+        writer = logarchive.LogArchiveWriter(self.archive)
+        for i, (name, content) in enumerate(contents.items()):
+            writer.write(self.create_file(str(i), content), name)
+        self.assertEqual(writer.namelist(), list(contents))
+        writer.close()
+        writer.close()
+        self.assertEqual(writer.get_statistics()[0], 3)
+        self.assertArchiveContent(contents)
+        # no temporary files are left for compressed data of large files
+        self.assertCountEqual(
+            os.listdir(self.tmp_dir.name),
+            ["0", "1", "2", os.path.basename(self.archive)],
+        )
+
+    def test_missing_file(self):
+        writer = logarchive.LogArchiveWriter(self.archive)
+        with self.assertRaises(FileNotFoundError):
+            writer.write(os.path.join(self.tmp_dir.name, "missing"), "missing.log")
+        writer.write(self.create_file("run.log", b"output"), "run.log")
+        writer.close()
+        self.assertArchiveContent({"run.log": b"output"})
+
+    def test_concurrent_writers(self):
+        writer = logarchive.LogArchiveWriter(self.archive)
+        contents = {
+            f"test.logfiles/{i}.log": f"output of run {i}\n".encode() * i
+            for i in range(200)
+        }
+        files = list(contents.items())
+
+        def write_files(offset):
+            for name, content in files[offset::8]:
+                writer.write(self.create_file(name.replace("/", "_"), content), name)
+
+        threads = [threading.Thread(target=write_files, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+        self.assertArchiveContent(contents)
+
+    def test_zip64_file_count(self):
+        filename = self.create_file("run.log", b"output")
+        writer = logarchive.LogArchiveWriter(self.archive)
+        for i in range(0x10001):
+            writer.write(filename, f"test.logfiles/{i}.log")
+        writer.close()
+        with zipfile.ZipFile(self.archive) as archive:
+            self.assertEqual(len(archive.infolist()), 0x10001)
+            self.assertEqual(archive.read("test.logfiles/65536.log"), b"output")
@@ -0,0 +1,101 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import tempfile
+import unittest
+
+from benchexec import outputcapture
+from benchexec import util
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+MARKER = "\n\nSOME LINES WERE REMOVED\n\n"
+HEADER = b"command\n\n\n" + b"-" * 80 + b"\n\n\n"
+
+
+class TestOutputCapture(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+
+    def capture(self, chunks, max_size):
+        read_fd, write_fd = os.pipe()
+        capture = outputcapture.OutputCaptureThread(read_fd, HEADER, max_size)
+        capture.start()
+        with open(write_fd, "wb") as pipe:
+            for chunk in chunks:
+                pipe.write(chunk)
+        capture.finish()
+        self.assertEqual(capture.size, len(HEADER) + sum(map(len, chunks)))
+        return capture.get_output(MARKER)
+
+    def shrink_file(self, content, max_size):
+        """Result of writing the output to a file and shrinking it afterwards."""
+        with tempfile.NamedTemporaryFile(prefix="BenchExec_test_") as tmp:
+            tmp.write(content)
+            tmp.flush()
+            if max_size <= len(content) - 500:
+                util.shrink_text_file(tmp.name, max_size, MARKER)
+            with open(tmp.name, "rb") as f:
+                return f.read()
+
+    def check_capture(self, output, max_size, chunk_size=1000):
+        chunks = [output[i : i + chunk_size] for i in range(0, len(output), chunk_size)]
+        self.assertEqual(
+            self.capture(chunks, max_size),
+            self.shrink_file(HEADER + output, max_size),
+        )
+
+    def test_empty(self):
+        self.check_capture(b"", 1000)
+
+    def test_small(self):
+        self.check_capture(b"line\n" * 100, 1000)
+
+    def test_within_tolerance(self):
+        self.check_capture(b"line\n" * 299, 1000)
+        self.check_capture(b"line\n" * 300, 1000)
+
+    def test_shrink_complete(self):
+        # small enough that nothing had to be dropped while reading
+        self.check_capture(b"".join(b"line %d\n" % i for i in range(300)), 1000)
+
+    def test_shrink(self):
+        output = b"".join(b"line %d\n" % i for i in range(100000))
+        for max_size in [0, 1, 1000, 1001, 100000]:
+            self.check_capture(output, max_size)
+            self.check_capture(output, max_size, chunk_size=7)
+
+    def test_shrink_long_lines(self):
+        output = b"".join(b"%d\n" % i * (i % 50) for i in range(10000))
+        self.check_capture(output, 10000, chunk_size=100000)
+
+    def test_no_trailing_newline(self):
+        self.check_capture(b"line\n" * 1000 + b"x" * 1000, 1000)
+
+    def test_long_line_at_end(self):
+        self.check_capture(b"line\n" * 1000 + b"x" * 100000, 1000)
+
+    def test_long_line_not_truncated(self):
+        self.check_capture(b"Long line " * 200, 1000)
+
+    def test_long_line_in_middle(self):
+        # the long line is cut instead of being retained completely
+        output = b"x" * 100000 + b"\n" + b"b\n" * 1000
+        retained = self.capture([output], 1000)
+        self.assertEqual(
+            retained, (HEADER + output)[:500] + MARKER.encode() + b"b\n" * 249
+        )
+
+    def test_decode_output_lines(self):
+        self.assertEqual(
+            outputcapture.decode_output_lines(b"a\r\nb\rc\n\nd"),
+            ["a\n", "b\n", "c\n", "\n", "d"],
+        )
@@ -0,0 +1,124 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import logging
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchexec import util
+from benchexec.resctrl import ResctrlMonitor
+
+DOMAINS = ["mon_L3_00", "mon_L3_01"]
+
+
+class TestResctrlMonitor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+        logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.resctrl_dir = self.tmp_dir.name
+        os.makedirs(os.path.join(self.resctrl_dir, "info", "L3_MON"))
+        util.write_file(
+            "llc_occupancy\nmbm_total_bytes\nmbm_local_bytes\n",
+            self.resctrl_dir,
+            "info",
+            "L3_MON",
+            "mon_features",
+        )
+        for domain in DOMAINS:
+            os.makedirs(os.path.join(self.resctrl_dir, "mon_data", domain))
+        os.makedirs(os.path.join(self.resctrl_dir, "mon_groups"))
+
+        self.monitor = ResctrlMonitor(self.resctrl_dir, [[0, 1], [2, 3]], 3600)
+
+    def tearDown(self):
+        self.monitor.close()
+        self.tmp_dir.cleanup()
+
+    def group_dir(self, index):
+        return os.path.join(
+            self.resctrl_dir, "mon_groups", f"benchexec_{os.getpid()}_{index}"
+        )
+
+    def set_values(self, index, **values):
+        for event, value in values.items():
+            for domain, domain_value in zip(DOMAINS, value):
+                path = os.path.join(self.group_dir(index), "mon_data", domain)
+                os.makedirs(path, exist_ok=True)
+                util.write_file(str(domain_value), path, event)
+
+    def test_groups(self):
+        self.assertEqual(util.read_file(self.group_dir(0), "cpus_list"), "0,1")
+        self.assertEqual(util.read_file(self.group_dir(1), "cpus_list"), "2,3")
+
+    def test_remove_groups(self):
+        # resctrl allows removing the directories despite the files in them
+        for index in range(2):
+            os.remove(os.path.join(self.group_dir(index), "cpus_list"))
+        self.monitor.close()
+        self.assertListEqual(
+            os.listdir(os.path.join(self.resctrl_dir, "mon_groups")), []
+        )
+
+    def test_run(self):
+        self.set_values(
+            0,
+            llc_occupancy=[1000, 1000],
+            mbm_total_bytes=[0, 1000],
+            mbm_local_bytes=["Unavailable", 0],
+        )
+        self.set_values(1, llc_occupancy=[50, 50], mbm_total_bytes=[0, 0])
+        with patch("time.monotonic", return_value=10):
+            self.monitor.start_run([0, 1])
+
+        self.set_values(0, llc_occupancy=[1000, 2000], mbm_total_bytes=[1000, 1000])
+        with patch("time.monotonic", return_value=11):
+            self.monitor._sample()
+
+        self.set_values(0, llc_occupancy=[3000, 2000], mbm_total_bytes=[2000, 3000])
+        with patch("time.monotonic", return_value=12):
+            result = self.monitor.stop_run([0, 1])
+
+        self.assertDictEqual(
+            result,
+            {
+                "llc_avg": 4000,
+                "llc_max": 5000,
+                "mbm_total_avg": 2000,
+                "mbm_total_max": 3000,
+            },
+        )
+        self.assertDictEqual(self.monitor.stop_run([0, 1]), {})
+        self.assertDictEqual(self.monitor.stop_run([2, 3]), {})
+
+    def test_short_run(self):
+        self.set_values(1, llc_occupancy=[100, 100], mbm_total_bytes=[0, 0])
+        with patch("time.monotonic", return_value=10):
+            self.monitor.start_run([2, 3])
+        self.set_values(1, llc_occupancy=[100, 200], mbm_total_bytes=[10, 0])
+        with patch("time.monotonic", return_value=10.01):
+            result = self.monitor.stop_run([2, 3])
+
+        self.assertDictEqual(
+            result,
+            {
+                "llc_avg": 300,
+                "llc_max": 300,
+                "mbm_total_avg": 1000,
+                "mbm_total_max": 1000,
+            },
+        )
+
+    @patch("benchexec.resctrl.find_resctrl_mount", return_value=None)
+    def test_not_supported(self, mock_find_resctrl_mount):
+        self.assertIsNone(ResctrlMonitor.create_if_supported([[0, 1]]))
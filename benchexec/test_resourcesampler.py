@@ -0,0 +1,131 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest.mock import patch
+
+from benchexec import resourcesampler
+from benchexec.resourcesampler import ResourceSampler
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+
+class _FakeSupervisor(object):
+    """Supervisor that does not execute checks, tests call check() directly."""
+
+    def __init__(self):
+        self.checks = []
+
+    def add(self, check):
+        self.checks.append(check)
+
+    def cancel(self, check):
+        if check in self.checks:
+            self.checks.remove(check)
+
+
+class _FakeCgroups(object):
+    """Cgroups that return a fixed sequence of usage values."""
+
+    def __init__(self, *usages):
+        self.usages = list(usages)
+
+    def read_current_usage(self):
+        usage = self.usages.pop(0)
+        if isinstance(usage, Exception):
+            raise usage
+        return usage
+
+
+class TestResourceSampler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.samples_file = os.path.join(self.tmp_dir.name, "samples.csv")
+        self.supervisor = _FakeSupervisor()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def create_sampler(self, *usages, interval=1):
+        return ResourceSampler(
+            _FakeCgroups(*usages), self.samples_file, interval, self.supervisor
+        )
+
+    def read_samples(self):
+        with open(self.samples_file) as f:
+            return f.read().splitlines()
+
+    def test_samples(self):
+        sampler = self.create_sampler(
+            {"cputime": 0.0, "memory": 1000, "pressure-cpu-some": None},
+            {"cputime": 0.5, "memory": 2000, "pressure-cpu-some": None},
+            {"cputime": 1.25, "memory": None, "pressure-cpu-some": Decimal("0.1")},
+        )
+        self.assertIn(sampler, self.supervisor.checks)
+        start = sampler._start_time
+        self.assertEqual(sampler.check(start), start + 1)
+        self.assertEqual(sampler.check(start + 1), start + 2)
+        with patch("time.monotonic", return_value=start + 1.5):
+            sampler.cancel()
+        self.assertNotIn(sampler, self.supervisor.checks)
+        sampler.cancel()  # no effect
+
+        self.assertListEqual(
+            self.read_samples(),
+            [
+                "walltime,cputime,memory",
+                "0.000000,0.000000,1000",
+                "1.000000,0.500000,2000",
+                "1.500000,1.250000,",
+            ],
+        )
+        self.assertEqual(sampler.sample_count, 3)
+        self.assertGreater(sampler.sampling_time, 0)
+
+    def test_failed_sample(self):
+        sampler = self.create_sampler(
+            OSError("cgroup vanished"), {"memory": 1000}, ValueError()
+        )
+        start = sampler._start_time
+        sampler.check(start)
+        sampler.check(start + 1)
+        sampler.cancel()
+
+        self.assertListEqual(self.read_samples(), ["walltime,memory", "1.000000,1000"])
+        self.assertEqual(sampler.sample_count, 1)
+
+    @patch.object(resourcesampler, "SAMPLES_PER_INTERVAL_DOUBLING", 2)
+    def test_interval_doubling(self):
+        sampler = self.create_sampler(*[{"memory": 1}] * 5)
+        start = sampler._start_time
+        self.assertEqual(sampler.check(start), start + 1)
+        self.assertEqual(sampler.check(start + 1), start + 3)
+        self.assertEqual(sampler.check(start + 3), start + 5)
+        self.assertEqual(sampler.check(start + 5), start + 9)
+        sampler.cancel()
+
+    def test_overhead_bounded(self):
+        sampler = self.create_sampler(*[{"memory": 1}] * 3, interval=0.1)
+        start = sampler._start_time
+        sampler.sampling_time = 0.1  # as if sampling would have been slow
+        next_time = sampler.check(start + 1)
+        self.assertGreaterEqual(sampler.interval, 8)
+        self.assertEqual(next_time, start + 1 + sampler.interval)
+        self.assertLessEqual(
+            sampler.sampling_time,
+            resourcesampler.MAX_OVERHEAD * (1 + sampler.interval),
+        )
+        sampler.cancel()
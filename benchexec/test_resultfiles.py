@@ -0,0 +1,151 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import errno
+import logging
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from benchexec import resultfiles
+from benchexec.resultfiles import ResultFilesTransfer
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+
+def _fail_with(error_number):
+    def fail(*args):
+        raise OSError(error_number, os.strerror(error_number))
+
+    return fail
+
+
+class TestResultFiles(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+        logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.source_dir = os.path.join(self.tmp_dir.name, "source")
+        self.output_dir = os.path.join(self.tmp_dir.name, "output")
+        self.files = {
+            "a.txt": b"a",
+            os.path.join("dir", "b.txt"): b"b" * 100000,
+            os.path.join("dir", "sub", "c.txt"): b"",
+        }
+        for name, content in self.files.items():
+            path = os.path.join(self.source_dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(content)
+        os.chmod(os.path.join(self.source_dir, "a.txt"), 0o700)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def source_files(self):
+        return [(os.path.join(self.source_dir, name), name) for name in self.files]
+
+    def assert_output_files(self):
+        for name, content in self.files.items():
+            with open(os.path.join(self.output_dir, name), "rb") as f:
+                self.assertEqual(content, f.read(), name)
+        mode = os.stat(os.path.join(self.output_dir, "a.txt")).st_mode
+        self.assertEqual(0o700, mode & 0o777)
+
+    def test_find_regular_files(self):
+        os.symlink("a.txt", os.path.join(self.source_dir, "link"))
+        os.mkfifo(os.path.join(self.source_dir, "dir", "fifo"))
+        os.mkdir(os.path.join(self.source_dir, "empty"))
+
+        self.assertCountEqual(
+            [path for path, _ in self.source_files()],
+            resultfiles.find_regular_files(self.source_dir),
+        )
+        a_file = os.path.join(self.source_dir, "a.txt")
+        self.assertEqual([a_file], resultfiles.find_regular_files(a_file))
+        for path in ["link", "empty", "missing"]:
+            self.assertEqual(
+                [], resultfiles.find_regular_files(os.path.join(self.source_dir, path))
+            )
+
+    def test_move(self):
+        ResultFilesTransfer(self.output_dir).transfer(self.source_files())
+        self.assert_output_files()
+        self.assertFalse(os.path.exists(os.path.join(self.source_dir, "a.txt")))
+
+    def test_clone(self):
+        source = os.path.join(self.source_dir, "a.txt")
+        target = os.path.join(self.tmp_dir.name, "clone")
+        with open(source, "rb") as source_file, open(target, "wb") as target_file:
+            try:
+                resultfiles._clone(source_file.fileno(), target_file.fileno())
+            except OSError as e:
+                self.skipTest(f"reflinks not supported: {e}")
+        with open(target, "rb") as f:
+            self.assertEqual(b"a", f.read())
+
+    def test_copy(self):
+        # reflinks are tested separately because they are often not supported
+        for method in resultfiles._COPY_METHODS[1:]:
+            unsupported = [m for m in resultfiles._COPY_METHODS if m is not method]
+            with self.subTest(method.__name__), patch.object(
+                os, "rename", _fail_with(errno.EXDEV)
+            ):
+                transfer = ResultFilesTransfer(self.output_dir)
+                transfer._unsupported_methods.update(unsupported)
+                transfer.transfer(self.source_files())
+                self.assert_output_files()
+                self.assertTrue(os.path.exists(os.path.join(self.source_dir, "a.txt")))
+
+    def test_unsupported_copy_methods(self):
+        transfer = ResultFilesTransfer(self.output_dir)
+        with patch.object(os, "rename", _fail_with(errno.EXDEV)), patch.object(
+            resultfiles.fcntl, "ioctl", _fail_with(errno.EOPNOTSUPP)
+        ), patch.object(os, "copy_file_range", _fail_with(errno.EXDEV), create=True):
+            transfer.transfer(self.source_files())
+        self.assert_output_files()
+        self.assertIn(resultfiles._clone, transfer._unsupported_methods)
+        self.assertIn(
+            resultfiles._copy_with_copy_file_range, transfer._unsupported_methods
+        )
+
+    def test_parallel(self):
+        with patch.object(os, "rename", _fail_with(errno.EXDEV)):
+            ResultFilesTransfer(self.output_dir, threads=4).transfer(
+                self.source_files()
+            )
+        self.assert_output_files()
+
+    def test_archive(self):
+        transfer = ResultFilesTransfer(self.output_dir + "/", archive=True, threads=2)
+        self.assertEqual(self.output_dir + ".zip", transfer.archive_file)
+        transfer.transfer(self.source_files())
+        self.assertFalse(os.path.exists(self.output_dir))
+        with zipfile.ZipFile(transfer.archive_file) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertCountEqual(self.files, archive.namelist())
+            for name, content in self.files.items():
+                self.assertEqual(content, archive.read(name), name)
+
+    def test_archive_missing_parent_directory(self):
+        self.output_dir = os.path.join(self.tmp_dir.name, "out", "runset", "task.yml")
+        transfer = ResultFilesTransfer(self.output_dir, archive=True)
+        transfer.transfer(self.source_files())
+        with zipfile.ZipFile(transfer.archive_file) as archive:
+            self.assertCountEqual(self.files, archive.namelist())
+
+    def test_no_files(self):
+        ResultFilesTransfer(self.output_dir, archive=True).transfer([])
+        self.assertFalse(os.path.exists(self.output_dir + ".zip"))
+        self.assertFalse(os.path.exists(self.output_dir))
@@ -0,0 +1,88 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+from xml.etree import ElementTree
+
+from benchexec.resultxmlwriter import ResultXmlWriter, element_to_string
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+
+class _Run(object):
+    def __init__(self, name):
+        self.xml = ElementTree.Element("run", name=name)
+
+
+class TestResultXmlWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.filename = os.path.join(self.tmp_dir.name, "results.xml")
+        self.header = ElementTree.Element("result", tool="dummy")
+        ElementTree.SubElement(self.header, "columns")
+        self.runs = [_Run(f"task{i}") for i in range(4)]
+        self.writer = ResultXmlWriter(self.filename, self.header, "public", "system")
+
+    def tearDown(self):
+        self.writer.close()
+        self.tmp_dir.cleanup()
+
+    def finish_run(self, run, status):
+        ElementTree.SubElement(run.xml, "column", title="status", value=status)
+        self.writer.add_run(run, run.xml)
+        run.xml = None
+
+    def test_element_to_string(self):
+        elem = ElementTree.Element("a", x='"<&>"\n')
+        ElementTree.SubElement(elem, "b").text = 'text & "quotes"'
+        ElementTree.SubElement(elem, "c")
+        self.assertEqual(
+            element_to_string(elem),
+            '<a x="&quot;&lt;&amp;&gt;&quot;&#10;">\n'
+            "  <b>text &amp; &quot;quotes&quot;</b>\n"
+            "  <c/>\n"
+            "</a>\n",
+        )
+        self.assertEqual(
+            ElementTree.fromstring(element_to_string(elem)).attrib, elem.attrib
+        )
+
+    def test_intermediate_file_is_recoverable(self):
+        self.finish_run(self.runs[2], "done")
+        with open(self.filename) as f:
+            content = f.read()
+        self.assertNotIn("</result>", content)
+        result = ElementTree.fromstring(content + "</result>")
+        self.assertEqual(result.get("error"), "incomplete")
+        self.assertEqual([run.get("name") for run in result.findall("run")], ["task2"])
+
+    def test_final_result_in_order_of_runs(self):
+        for run, status in zip(reversed(self.runs[1:]), ["a", "b", "c"]):
+            self.finish_run(run, status)
+        ElementTree.SubElement(self.header, "column", title="cputime", value="1s")
+
+        output = io.BytesIO()
+        self.writer.write_final_result(output, self.header, self.runs)
+        result = ElementTree.fromstring(output.getvalue())
+
+        self.assertIsNone(result.get("error"))
+        self.assertEqual(
+            [child.tag for child in result],
+            ["columns", "run", "run", "run", "run", "column"],
+        )
+        runs = result.findall("run")
+        self.assertEqual(
+            [run.get("name") for run in runs], ["task0", "task1", "task2", "task3"]
+        )
+        self.assertIsNone(runs[0].find("column"))
+        self.assertEqual(
+            [run.find("column").get("value") for run in runs[1:]], ["c", "b", "a"]
+        )
@@ -0,0 +1,248 @@
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import datetime
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from decimal import Decimal
+
+from benchexec import runexecserver
+from benchexec import util
+from benchexec.runexecserver import RunExecServer
+
+sys.dont_write_bytecode = True  # prevent creation of .pyc files
+
+
+class _FakeExecutor(object):
+    """Executor that records its runs and blocks until the run is released."""
+
+    def __init__(self, release):
+        self.release = release
+        self.started = threading.Event()
+        self.stopped = False
+        self.closed = False
+        self.runs = []
+
+    def execute_run(self, **kwargs):
+        self.runs.append(kwargs)
+        self.started.set()
+        self.release.wait(10)
+        result = {
+            "walltime": Decimal("1.5"),
+            "exitcode": util.ProcessExitCode.from_raw(0),
+        }
+        if self.stopped:
+            result["terminationreason"] = "killed"
+        return result
+
+    def stop(self):
+        self.stopped = True
+        self.release.set()
+
+    def close(self):
+        self.closed = True
+
+
+class TestParseRunRequest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+
+    def test_defaults(self):
+        kwargs, input_file = runexecserver.parse_run_request({"args": ["true"]})
+        self.assertEqual({"args": ["true"], "output_filename": "output.log"}, kwargs)
+        self.assertIsNone(input_file)
+
+    def test_values(self):
+        kwargs, input_file = runexecserver.parse_run_request(
+            {
+                "args": ["tool", "input"],
+                "timelimit": "1min",
+                "walltimelimit": 90,
+                "memlimit": "1MB",
+                "cores": "0-2,5",
+                "memoryNodes": [0],
+                "output": "tool.log",
+                "input": "stdin.txt",
+                "output-directory": "tool.files",
+            }
+        )
+        self.assertEqual(
+            {
+                "args": ["tool", "input"],
+                "hardtimelimit": 60,
+                "walltimelimit": 90,
+                "memlimit": 1000 * 1000,
+                "cores": [0, 1, 2, 5],
+                "memory_nodes": [0],
+                "output_filename": "tool.log",
+                "output_dir": "tool.files",
+                "result_files_patterns": ["."],
+            },
+            kwargs,
+        )
+        self.assertEqual("stdin.txt", input_file)
+
+    def test_invalid(self):
+        for request in [
+            ["true"],
+            {},
+            {"args": []},
+            {"args": "true"},
+            {"args": ["true"], "unknown": 1},
+            {"args": ["true"], "timelimit": "1 apple"},
+            {"args": ["true"], "cores": [0, "1"]},
+            {"args": ["true"], "memlimit": [1]},
+            {"args": ["true"], "result-files": ["*"]},
+            {"args": ["true"], "output-directory": "d", "result-files": ["../*"]},
+            {"args": ["true"], "input": "output.log"},
+        ]:
+            with self.assertRaises(ValueError, msg=request):
+                runexecserver.parse_run_request(request)
+
+
+class TestResultToJson(unittest.TestCase):
+    def test_result(self):
+        result = runexecserver.result_to_json(
+            {
+                "starttime": datetime.datetime(
+                    2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc
+                ),
+                "walltime": Decimal("1.25"),
+                "memory": 4096,
+                "exitcode": util.ProcessExitCode.from_raw(9),
+                "cpuenergy": {0: {"package": Decimal(2), "core": Decimal(1)}},
+            }
+        )
+        self.assertEqual(
+            {
+                "starttime": "2020-01-02T03:04:05+00:00",
+                "walltime": 1.25,
+                "memory": 4096,
+                "exitsignal": 9,
+                "cpuenergy": 2.0,
+                "cpuenergy-pkg0-core": 1.0,
+                "cpuenergy-pkg0-package": 2.0,
+            },
+            result,
+        )
+        json.dumps(result)
+
+
+class TestRunExecServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.maxDiff = None
+        logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="BenchExec_test_")
+        self.socket_path = os.path.join(self.tmp_dir.name, "socket")
+        self.release = threading.Event()
+        self.executors = []
+        self.server = RunExecServer(self.socket_path, self.create_executor)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.connections = []
+
+    def tearDown(self):
+        self.release.set()
+        self.server.stop()
+        self.thread.join()
+        self.server.server_close()
+        for connection in self.connections:
+            connection.close()
+        self.tmp_dir.cleanup()
+
+    def create_executor(self):
+        executor = _FakeExecutor(self.release)
+        self.executors.append(executor)
+        return executor
+
+    def connect(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(self.socket_path)
+        self.connections.append(connection)
+        return connection.makefile("rwb", buffering=0)
+
+    def wait_for_runs(self, count):
+        deadline = time.monotonic() + 10
+        while len(self.executors) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        for executor in self.executors:
+            self.assertTrue(executor.started.wait(10))
+
+    def send(self, stream, request):
+        stream.write(json.dumps(request).encode() + b"\n")
+
+    def receive(self, stream):
+        return json.loads(stream.readline())
+
+    def test_run(self):
+        self.release.set()
+        stream = self.connect()
+        self.send(stream, {"id": 1, "args": ["true"], "timelimit": 10})
+        self.send(stream, {"id": 2, "args": ["false"]})
+        self.assertEqual(
+            {"id": 1, "result": {"walltime": 1.5, "returnvalue": 0}},
+            self.receive(stream),
+        )
+        self.assertEqual(2, self.receive(stream)["id"])
+        self.assertEqual(1, len(self.executors), "executor should be reused")
+        self.assertEqual(10, self.executors[0].runs[0]["hardtimelimit"])
+        self.assertEqual(["false"], self.executors[0].runs[1]["args"])
+
+    def test_invalid_request(self):
+        stream = self.connect()
+        stream.write(b"no json\n")
+        self.assertIn("error", self.receive(stream))
+        self.send(stream, {"id": "a", "args": []})
+        response = self.receive(stream)
+        self.assertEqual("a", response["id"])
+        self.assertIn("args", response["error"])
+        self.assertEqual([], self.executors)
+
+    def test_parallel_runs_on_disjoint_cores(self):
+        stream1 = self.connect()
+        stream2 = self.connect()
+        self.send(stream1, {"args": ["true"], "cores": [0, 1]})
+        self.send(stream2, {"args": ["true"], "cores": "2-3"})
+        self.wait_for_runs(2)
+
+        stream3 = self.connect()
+        for cores in [[1, 2], None]:
+            self.send(stream3, {"args": ["true"], "cores": cores})
+            self.assertIn("requested cores", self.receive(stream3)["error"])
+
+        self.release.set()
+        self.assertIn("result", self.receive(stream1))
+        self.assertIn("result", self.receive(stream2))
+        self.assertEqual(2, len(self.executors))
+
+    def test_stop(self):
+        stream = self.connect()
+        self.send(stream, {"args": ["sleep", "100"]})
+        self.wait_for_runs(1)
+        self.server.stop()
+        response = self.receive(stream)
+        self.assertEqual("killed", response["result"]["terminationreason"])
+        self.send(stream, {"args": ["true"]})
+        self.assertIn("shutting down", self.receive(stream)["error"])
+
+        self.thread.join()
+        self.server.server_close()
+        self.assertTrue(self.executors[0].closed)
+        self.assertFalse(os.path.exists(self.socket_path))
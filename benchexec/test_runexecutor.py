@@ -16,6 +16,7 @@ import threading
 import time
 import unittest
 import shutil
+from unittest.mock import patch
 
 from benchexec import container
 from benchexec import containerexecutor
@@ -82,7 +83,9 @@ class TestRunExecutor(unittest.TestCase):
             os.close(output_fd)
             os.remove(output_filename)
 
-        self.check_result_keys(result, "terminationreason")
+        self.check_result_keys(
+            result, "terminationreason", "timelimit-overshoot", "output", "samplingtime"
+        )
         if isinstance(expect_terminationreason, list):
             self.assertIn(
                 result.get("terminationreason"),
@@ -129,7 +132,9 @@ class TestRunExecutor(unittest.TestCase):
                 line.partition("=") for line in runexec_output.splitlines()
             )
         }
-        self.check_result_keys(result, "terminationreason", "returnvalue")
+        self.check_result_keys(
+            result, "terminationreason", "returnvalue", "timelimit-overshoot"
+        )
         if isinstance(expect_terminationreason, list):
             self.assertIn(
                 result.get("terminationreason"),
@@ -151,6 +156,8 @@ class TestRunExecutor(unittest.TestCase):
         expected_keys = {
             "cputime",
             "walltime",
+            "setuptime",
+            "measurementtime",
             "memory",
             "exitcode",
             "cpuenergy",
@@ -201,6 +208,66 @@ class TestRunExecutor(unittest.TestCase):
         for line in output[1:-1]:
             self.assertRegex(line, "^-*$", "unexpected text in run output")
 
+    def test_command_output_captured(self):
+        if not os.path.exists(self.echo):
+            self.skipTest("missing echo")
+        (result, output) = self.execute_run(
+            self.echo, "TEST_TOKEN", maxLogfileSize=2000, capture_output=True
+        )
+        self.check_command_in_output(output, f"{self.echo} TEST_TOKEN")
+        self.assertEqual(output[-1], "TEST_TOKEN", "run output misses command output")
+        for line in output[1:-1]:
+            self.assertRegex(line, "^-*$", "unexpected text in run output")
+        self.assertEqual(result["output"], ["TEST_TOKEN\n"])
+
+    def test_command_output_not_captured_without_size_limit(self):
+        if not os.path.exists(self.echo):
+            self.skipTest("missing echo")
+        (result, output) = self.execute_run(
+            self.echo, "TEST_TOKEN", capture_output=True
+        )
+        self.check_command_in_output(output, f"{self.echo} TEST_TOKEN")
+        self.assertEqual(output[-1], "TEST_TOKEN", "run output misses command output")
+        self.assertNotIn("output", result)
+
+    def test_command_output_captured_and_shrunk(self):
+        if not os.path.exists("/bin/sh"):
+            self.skipTest("missing /bin/sh")
+        args = ["/bin/sh", "-c", "for i in $(seq 1000); do echo line $i; done"]
+        (_, expected_output) = self.execute_run(*args, maxLogfileSize=2000)
+        (result, output) = self.execute_run(
+            *args, maxLogfileSize=2000, capture_output=True
+        )
+        self.assertEqual(output, expected_output)
+        self.assertIn(self.REDUCE_WARNING_MSG, output)
+        self.assertEqual([line.rstrip("\n") for line in result["output"]], output[6:])
+
+    def test_resource_samples(self):
+        if not os.path.exists("/bin/sh"):
+            self.skipTest("missing /bin/sh")
+        (samples_fd, samples_filename) = tempfile.mkstemp(".csv", "samples_")
+        try:
+            (result, _) = self.execute_run(
+                "/bin/sh",
+                "-c",
+                "sleep 0.5",
+                samples_filename=samples_filename,
+                sample_interval=0.1,
+            )
+            with open(samples_filename) as samples_file:
+                samples = samples_file.read().splitlines()
+        finally:
+            os.close(samples_fd)
+            os.remove(samples_filename)
+
+        self.assertIn("samplingtime", result)
+        header = samples[0].split(",")
+        self.assertEqual(header[0], "walltime")
+        self.assertIn("cputime", header)
+        self.assertGreaterEqual(len(samples), 3, "too few samples")
+        for sample in samples[1:]:
+            self.assertEqual(len(sample.split(",")), len(header))
+
     def test_command_error_output(self):
         if not os.path.exists(self.echo):
             self.skipTest("missing echo")
@@ -261,6 +328,22 @@ class TestRunExecutor(unittest.TestCase):
             )
         self.check_result_keys(result)
 
+    def test_prepare_runs(self):
+        self.setUp(prepare_runs=True)
+        try:
+            for _ in range(3):
+                (result, output) = self.execute_run(self.echo, "TEST_TOKEN")
+                self.check_exitcode(result, 0, "exit code of echo is not zero")
+                self.assertEqual(output[-1], "TEST_TOKEN", "run output misses text")
+                self.assertGreaterEqual(result["setuptime"], 0)
+                self.assertIsNotNone(self.runexecutor._prepared_run)
+            prepared_temp_dir = self.runexecutor._prepared_run[2]
+            self.assertTrue(os.path.isdir(prepared_temp_dir))
+        finally:
+            self.runexecutor.close()
+        self.assertIsNone(self.runexecutor._prepared_run)
+        self.assertFalse(os.path.exists(prepared_temp_dir))
+
     def test_wrong_command(self):
         (result, _) = self.execute_run(
             "/does/not/exist", expect_terminationreason="failed"
@@ -295,6 +378,11 @@ class TestRunExecutor(unittest.TestCase):
             delta=0.5,
             msg="cputime is not approximately the time after which the process should have been killed",
         )
+        self.assertLess(
+            result["timelimit-overshoot"],
+            0.5,
+            msg="process was not killed soon enough after reaching the time limit",
+        )
 
         for line in output[1:]:
             self.assertRegex(line, "^-*$", "unexpected text in run output")
@@ -329,6 +417,36 @@ class TestRunExecutor(unittest.TestCase):
         for line in output[1:]:
             self.assertRegex(line, "^-*$", "unexpected text in run output")
 
+    def test_cputime_softlimit_with_oom_kill(self):
+        # The termination reason of the soft limit must not be overwritten
+        # if memory measurements look like an OOM kill.
+        if not os.path.exists("/bin/sh"):
+            self.skipTest("missing /bin/sh")
+        memlimit = 100 * 1000 * 1000
+        get_cgroup_measurements = self.runexecutor._get_cgroup_measurements
+
+        def get_cgroup_measurements_with_oom(cgroups, ru_child, result):
+            get_cgroup_measurements(cgroups, ru_child, result)
+            result["oom_kill_count"] = 1
+            result["memory"] = memlimit
+
+        with self.skip_if_logs(
+            "Soft time limit cannot be specified without cpuacct cgroup"
+        ), patch.object(
+            self.runexecutor,
+            "_get_cgroup_measurements",
+            get_cgroup_measurements_with_oom,
+        ):
+            (result, _) = self.execute_run(
+                "/bin/sh",
+                "-c",
+                "while true; do true; done",
+                softtimelimit=1,
+                memlimit=memlimit,
+                expect_terminationreason="cputime-soft",
+            )
+        self.assertNotIn("oom_kill_count", result)
+
     def test_walltime_limit(self):
         if not os.path.exists(self.sleep):
             self.skipTest("missing sleep")
@@ -877,7 +995,7 @@ wait $child_pid
         self.check_exitcode(result, 9, "exit code of killed process is not 9")
         self.assertAlmostEqual(
             result["walltime"],
-            2,
+            1,
             delta=0.5,
             msg="walltime is not approximately the time after which the process should have been killed",
         )
@@ -6,12 +6,14 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from decimal import Decimal
+import io
 import sys
 import unittest
 from benchexec.util import ProcessExitCode
 import tempfile
 import os
 import stat
+from unittest import mock
 
 from benchexec import util
 
@@ -189,3 +191,93 @@ class TestRmtree(unittest.TestCase):
 
     def test_dir_without_any_permissions(self):
         self.create_and_delete_directory(0)
+
+
+class TestReadFilesInDirectory(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="BenchExec_test_util_read_files")
+
+    def tearDown(self):
+        util.rmtree(self.base_dir)
+
+    def test_read_files(self):
+        util.write_file("some avg10=0.00 total=42\n", self.base_dir, "cpu.pressure")
+        util.write_file("", self.base_dir, "empty")
+        util.write_file("x" * 100000, self.base_dir, "large")
+        self.assertEqual(
+            util.read_files_in_directory(
+                self.base_dir, ["cpu.pressure", "empty", "large", "missing"]
+            ),
+            {
+                "cpu.pressure": "some avg10=0.00 total=42\n",
+                "empty": "",
+                "large": "x" * 100000,
+            },
+        )
+
+
+class TestShrinkTextFile(unittest.TestCase):
+    MARKER = "\n\nSOME LINES WERE REMOVED\n\n"
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="BenchExec_test_util_shrink")
+        self.filename = os.path.join(self.base_dir, "output.log")
+
+    def tearDown(self):
+        util.rmtree(self.base_dir)
+
+    def expected_content(self, content, max_size, marker):
+        """Result of the original line-based algorithm of shrink_text_file."""
+        marker = marker.encode() if marker else b""
+        with io.BytesIO(content) as f:
+            f.seek(max_size // 2)
+            f.readline()
+            start = f.tell()
+            if start == len(content):
+                return content
+            f.seek(-max_size // 2, os.SEEK_END)
+            f.readline()
+            if start + len(marker) > f.tell():
+                # marker would overwrite kept part
+                return content
+            return content[:start] + marker + f.read()
+
+    def check_shrink(self, content, max_size, marker=MARKER):
+        with open(self.filename, "wb") as f:
+            f.write(content)
+        util.shrink_text_file(self.filename, max_size, marker)
+        with open(self.filename, "rb") as f:
+            actual = f.read()
+        self.assertEqual(actual, self.expected_content(content, max_size, marker))
+
+    def test_short_lines(self):
+        content = b"".join(b"line %d\n" % i for i in range(100000))
+        self.check_shrink(content, 10001)
+        self.check_shrink(content, 200000, None)
+
+    def test_large_file(self):
+        content = b"".join(b"%d\n" % i * (i % 100) for i in range(100000))
+        self.check_shrink(content, 1000000)
+
+    def test_no_trailing_newline(self):
+        self.check_shrink(b"a\n" * 10000 + b"b" * 10000, 5000)
+
+    def test_long_line(self):
+        content = b"a\n" + b"b" * 100000 + b"\nc\n"
+        self.check_shrink(content, 1000)
+        self.check_shrink(b"x" * 10000, 1000)
+
+    def test_long_line_at_end(self):
+        self.check_shrink(b"a\n" * 10000 + b"b" * 3000000, 1000)
+
+    def test_small_distance(self):
+        self.check_shrink(b"line\n" * 1000, 4500)
+
+    def test_without_kernel_copy(self):
+        def fail(*args):
+            raise OSError("not supported")
+
+        content = b"".join(b"line %d\n" % i for i in range(1000000))
+        with mock.patch.object(util, "_copy_file_range_within", fail):
+            with mock.patch.object(util, "_sendfile_within", fail):
+                self.check_shrink(content, 2000000)
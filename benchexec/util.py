@@ -28,7 +28,6 @@ import ctypes
 from xml.etree import ElementTree
 from shlex import quote as escape_string_shell  # noqa: F401 @UnusedImport
 
-
 _BYTE_FACTOR = 1000  # byte in kilobyte
 _FREQUENCY_FACTOR = 1000  # Hz in kHz
 
@@ -487,36 +486,108 @@ def shrink_text_file(filename, max_size, removal_marker=None):
     # A) start: maxSize/2 bytes we want to keep
     # B) middle: part we want to remove
     # C) end: maxSize/2 bytes we want to keep
+    # Then we copy the content of C into B, overwriting what is there,
+    # and afterwards we truncate the file after A+C.
+    # All cuts are at line boundaries.
+    # The copy is done by the kernel if possible (copy_file_range or sendfile),
+    # such that the data need not be transferred into this process.
+    # Removing B with fallocate(FALLOC_FL_COLLAPSE_RANGE) instead is not possible
+    # because this only supports removing whole file-system blocks,
+    # and cuts at line boundaries are not block-aligned.
+
+    fd = os.open(filename, os.O_RDWR)
+    try:
+        # end of A: jump to end of current line so that we truncate at line boundaries
+        output_pos = _find_next_line_start(fd, max_size // 2, file_size)
+        if output_pos == file_size:
+            # we jumped to end of file because of a long line
+            return
+
+        # start of C: jump to end of current line from position in second half
+        input_pos = _find_next_line_start(fd, file_size + (-max_size // 2), file_size)
+
+        marker = removal_marker.encode() if removal_marker else b""
+        if output_pos + len(marker) > input_pos:
+            # nothing worth removing (and C would be overwritten by the marker)
+            return
+        os.pwrite(fd, marker, output_pos)
+        output_pos += len(marker)
+
+        # Copy C over B
+        length = file_size - input_pos
+        _copy_within_file(fd, input_pos, output_pos, length)
 
-    # Trick taken from StackOverflow:
-    # https://stackoverflow.com/questions/2329417/fastest-way-to-delete-a-line-from-large-file-in-python
-    # We open the file twice at the same time, once for reading (input_file) and once for writing (output_file).
-    # We position output_file at the beginning of part B
-    # and input_file at the beginning of part C.
-    # Then we copy the content of C into B, overwriting what is there.
-    # Afterwards we truncate the file after A+C.
+        os.truncate(fd, output_pos + length)
+    finally:
+        os.close(fd)
 
-    with open(filename, "r+b") as output_file:
-        with open(filename, "rb") as input_file:
-            # Position outputFile between A and B
-            output_file.seek(max_size // 2)
-            output_file.readline()  # jump to end of current line so that we truncate at line boundaries
-            if output_file.tell() == file_size:
-                # readline jumped to end of file because of a long line
-                return
 
-            if removal_marker:
-                output_file.write(removal_marker.encode())
+_SHRINK_CHUNK_SIZE = 1024 * 1024
 
-            # Position inputFile between B and C
-            # jump to beginning of second part we want to keep from end of file
-            input_file.seek(-max_size // 2, os.SEEK_END)
-            input_file.readline()  # jump to end of current line so that we truncate at line boundaries
 
-            # Copy C over B
-            copy_all_lines_from_to(input_file, output_file)
+def _find_next_line_start(fd, offset, file_size):
+    """
+    Return the position after the first line break at or after the given offset
+    (like calling readline() on a binary file positioned at offset),
+    or file_size if there is no such line break.
+    """
+    while offset < file_size:
+        chunk = os.pread(fd, _SHRINK_CHUNK_SIZE, offset)
+        if not chunk:
+            break
+        index = chunk.find(b"\n")
+        if index >= 0:
+            return offset + index + 1
+        offset += len(chunk)
+    return file_size
 
-            output_file.truncate()
+
+def _copy_within_file(fd, src, dst, length):
+    """
+    Copy length bytes inside a file from position src to position dst < src.
+    This uses copy_file_range (Python 3.8+) or sendfile if they are supported,
+    and falls back to copying in user space otherwise.
+    """
+    assert dst < src
+    # The kernel does not support overlapping ranges within the same file,
+    # so we copy in pieces that are not larger than the distance of src and dst.
+    # Copying front-to-back is safe because dst < src.
+    piece_size = min(src - dst, 64 * _SHRINK_CHUNK_SIZE)
+    if piece_size >= _SHRINK_CHUNK_SIZE:
+        for copy in [_copy_file_range_within, _sendfile_within]:
+            try:
+                while length > 0:
+                    count = copy(fd, src, dst, min(length, piece_size))
+                    if count <= 0:
+                        break
+                    src += count
+                    dst += count
+                    length -= count
+                else:
+                    return
+            except OSError as e:
+                logging.debug("In-kernel copy not possible, falling back: %s", e)
+
+    while length > 0:
+        chunk = os.pread(fd, min(length, _SHRINK_CHUNK_SIZE), src)
+        if not chunk:
+            break
+        os.pwrite(fd, chunk, dst)
+        src += len(chunk)
+        dst += len(chunk)
+        length -= len(chunk)
+
+
+def _copy_file_range_within(fd, src, dst, count):
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "copy_file_range is not available")
+    return os.copy_file_range(fd, fd, count, src, dst)
+
+
+def _sendfile_within(fd, src, dst, count):
+    # sendfile writes at the current position of the output file descriptor
+    os.lseek(fd, dst, os.SEEK_SET)
+    return os.sendfile(fd, fd, src, count)
 
 
 def read_file(*path):
@@ -535,6 +606,37 @@ def try_read_file(*path):
         return None
 
 
+def read_files_in_directory(directory, names):
+    """
+    Read the full content of several small files in the same directory,
+    e.g., kernel interface files, without the overhead of file objects
+    and of looking up the directory again for each file.
+    @return a dict with the (unstripped) content of each file,
+        missing files are not present in the dict
+    """
+    result = {}
+    dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        for name in names:
+            try:
+                fd = os.open(name, os.O_RDONLY, dir_fd=dir_fd)
+            except FileNotFoundError:
+                continue
+            chunks = []
+            try:
+                while True:
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+            finally:
+                os.close(fd)
+            result[name] = b"".join(chunks).decode()
+    finally:
+        os.close(dir_fd)
+    return result
+
+
 def read_key_value_pairs_from_file(*path):
     """
     Read key value pairs from a file (each pair on a separate line).
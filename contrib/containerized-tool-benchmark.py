@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+# This file is part of BenchExec, a framework for reliable benchmarking:
+# https://github.com/sosy-lab/benchexec
+#
+# SPDX-FileCopyrightText: 2007-2020 Dirk Beyer <https://www.sosy-lab.org>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Micro-benchmark for the overhead of analyzing the result of a run
+with a tool-info module that is loaded in a container.
+It compares calling determine_result() and get_value_from_output()
+individually (one round trip into the container per call)
+with a single call of ContainerizedTool.analyze_run(),
+which is what BenchExec uses.
+"""
+
+import argparse
+import sys
+import time
+
+from benchexec import containerexecutor
+from benchexec import tooladapter
+from benchexec import util
+from benchexec.containerized_tool import ContainerizedTool
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--tool",
+        default="benchexec.tools.dummy",
+        help="tool-info module to use (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=100,
+        help="number of analyzed runs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--columns",
+        type=int,
+        default=10,
+        help="number of columns extracted from the output (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--lines",
+        type=int,
+        default=10000,
+        help="number of lines of output of each run (default: %(default)s)",
+    )
+    containerexecutor.add_basic_container_args(parser)
+    options = parser.parse_args(argv)
+
+    tool = ContainerizedTool(options.tool, options)
+    try:
+        lines = [f"line {i}: some output of the tool\n" for i in range(options.lines)]
+        identifiers = [f"Value {i}:" for i in range(options.columns)]
+        exit_code = util.ProcessExitCode.from_raw(0)
+
+        def create_run():
+            # a new instance for each run, such that nothing is cached
+            output = tooladapter.CURRENT_BASETOOL.RunOutput(lines)
+            run = tooladapter.CURRENT_BASETOOL.Run(
+                ["tool", "input"], exit_code, output, None
+            )
+            return run, output
+
+        def analyze_individually():
+            run, output = create_run()
+            tool.determine_result(run)
+            for identifier in identifiers:
+                tool.get_value_from_output(output, identifier)
+
+        def analyze_batched():
+            run, output = create_run()
+            tool.analyze_run(run, output, identifiers)
+
+        for name, analyze in [
+            ("individual calls", analyze_individually),
+            ("single call", analyze_batched),
+        ]:
+            start = time.monotonic()
+            for _ in range(options.runs):
+                analyze()
+            duration = time.monotonic() - start
+            print(f"{name}: {duration / options.runs * 1000:.2f} ms per run")
+    finally:
+        tool.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        sys.exit("Script was interrupted by user.")